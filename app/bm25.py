@@ -0,0 +1,174 @@
+# Shared BM25 engine over content.jsonl rows.
+# Postings (term -> doc ids + term frequencies) and doc lengths are built once per
+# corpus load; a query only walks the postings of its own terms and keeps the top-k
+# with a heap, so per-request cost tracks the query, not the corpus size.
+import json, math, re, heapq, logging, threading, unicodedata
+from array import array
+from itertools import islice
+from pathlib import Path
+
+_log = logging.getLogger("bm25")
+
+K1 = 1.2
+B  = 0.75
+MIN_TOKEN = 3
+_WORD = re.compile(r"[a-z0-9]+")
+
+TULLMAN_BOOST = 5.0   # the +5 the substring scorer gave Tullman material; every caller's prior adds this
+
+def tullman_prior(r: dict) -> float:
+    """Prior for BM25Index(prior=...): TULLMAN_BOOST for rows that mention Tullman."""
+    return TULLMAN_BOOST if "tullman" in ((r.get("source_name") or "") + " " + (r.get("text") or "")).lower() else 0.0
+
+def normalize(s: str) -> str:
+    if not s: return ""
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if ord(ch) < 0x0300).lower()
+
+def terms(s: str) -> list[str]:
+    return [t for t in _WORD.findall(normalize(s)) if len(t) >= MIN_TOKEN]
+
+def row_text(r: dict) -> str:
+    return r.get("text") or ""
+
+class BM25Index:
+    def __init__(self, rows=None, text_of=row_text, prior=None, k1=K1, b=B):
+        """rows: list of dicts (copied), or a corpus_store.CorpusStore / Chain, which is
+        kept as the row sequence and grows with add()."""
+        self.k1, self.b = k1, b
+        self.text_of = text_of
+        self.prior_of = prior          # optional row -> float added to matching docs
+        self.rows: list[dict] = []
+        self.post: dict[str, tuple[array, array]] = {}   # term -> (doc ids, tfs)
+        self.more: dict[str, tuple[array, array]] = {}   # postings added onto a mapped index
+        self.dl = array("I")
+        self.prior = array("f")
+        self.total_len = 0
+        self._norm = None              # per-doc k1*(1-b+b*dl/avgdl); rebuilt when N changes
+        self._lock = threading.Lock()
+        if rows is not None and not isinstance(rows, list): self.rows = rows
+        if rows: self.add(rows)
+
+    @classmethod
+    def mapped(cls, rows, post, dl, total_len: int, text_of=row_text, prior=None, k1=K1, b=B):
+        """Read-only index over prebuilt postings (app/segments.py): `post.get(term)` ->
+        (doc ids, tfs), `dl` doc lengths of the first len(dl) rows. Only the priors are
+        computed here; add() indexes rows appended after them."""
+        ix = cls(None, text_of=text_of, prior=prior, k1=k1, b=b)
+        ix.rows, ix.post, ix.dl, ix.total_len = rows, post, dl, total_len
+        if prior: ix.prior = array("f", (float(prior(r)) for r in islice(rows, len(dl))))
+        return ix
+
+    def __len__(self): return len(self.rows)
+
+    def add(self, rows) -> None:
+        """Append rows (ids continue from the current size). Rows already appended to a
+        shared row sequence (corpus_store) are indexed without being added twice."""
+        with self._lock:
+            base = len(self.dl)
+            post = self.post if isinstance(self.post, dict) else self.more
+            if not isinstance(self.dl, array): self.dl = array("I", self.dl)   # mapped lengths
+            own = len(self.rows) <= base      # list-backed: rows are appended here, not by the store
+            for d, r in enumerate(rows, start=base):
+                tf: dict[str, int] = {}
+                toks = terms(self.text_of(r))
+                for t in toks: tf[t] = tf.get(t, 0) + 1
+                for t, c in tf.items():
+                    p = post.get(t)
+                    if p is None: p = post[t] = (array("I"), array("H"))
+                    p[0].append(d); p[1].append(min(c, 65535))
+                # dl goes last: scores() only reads ids below len(dl), so a concurrent
+                # query never reaches a doc whose prior or row is not there yet
+                self.prior.append(float(self.prior_of(r)) if self.prior_of else 0.0)
+                if own: self.rows.append(r)
+                self.dl.append(len(toks)); self.total_len += len(toks)
+            self._norm = None
+
+    def _norms(self):
+        norm = self._norm
+        if norm is None or len(norm) != len(self.dl):
+            n = len(self.dl) or 1
+            avgdl = (self.total_len / n) or 1.0
+            k1, b = self.k1, self.b
+            norm = array("f", (k1 * (1 - b + b * dl / avgdl) for dl in self.dl))
+            self._norm = norm
+        return norm
+
+    def scores(self, query: str) -> dict[int, float]:
+        n = len(self.rows)
+        if not n: return {}
+        norm = self._norms(); k1 = self.k1
+        acc: dict[int, float] = {}
+        more = self.more
+        for t in set(terms(query)):
+            p = self.post.get(t); q = more.get(t) if more else None
+            if not p and not q: continue
+            parts = (p, q) if p and q else (p or q,)
+            df = sum(len(x[0]) for x in parts)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            w = idf * (k1 + 1)
+            for ids, tfs in parts:
+                for d, tf in zip(ids, tfs):
+                    if d < len(norm):
+                        acc[d] = acc.get(d, 0.0) + w * tf / (tf + norm[d])
+        if self.prior_of:
+            pr = self.prior
+            for d in acc: acc[d] += pr[d]
+        return acc
+
+    def search(self, query: str, k: int = 8, accept=None) -> list[tuple[float, dict]]:
+        """Top-k (score, row), best first; `accept(row)` filters lazily while popping."""
+        acc = self.scores(query)
+        if not acc: return []
+        rows = self.rows
+        if accept is None:
+            top = heapq.nlargest(k, acc.items(), key=lambda x: (x[1], -x[0]))
+            return [(s, rows[d]) for d, s in top]
+        heap = [(-s, d) for d, s in acc.items()]
+        heapq.heapify(heap)
+        out = []
+        while heap and len(out) < k:
+            s, d = heapq.heappop(heap)
+            if accept(rows[d]): out.append((-s, rows[d]))
+        return out
+
+    def stats(self) -> dict:
+        return {"docs": len(self.rows), "terms": len(self.post),
+                "avgdl": round(self.total_len / max(1, len(self.rows)), 1)}
+
+# ---- shared corpus indexes (one per path+limit per worker, rebuilt when the file changes)
+def read_rows(path: Path, limit: int | None = None) -> list[dict]:
+    out = []
+    if not path.exists(): return out
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try: out.append(json.loads(line))
+            except Exception: continue
+            if limit and len(out) >= limit: break
+    return out
+
+def _sig(path: Path):
+    try:
+        st = path.stat(); return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+_SHARED: dict = {}
+_SLOCK = threading.Lock()
+
+def corpus(path: Path, limit: int | None = None, prior=None, load=read_rows) -> BM25Index:
+    """Cached BM25Index over the first `limit` rows of a JSONL corpus; `load(path, limit)`
+    reads them (corpus_store.load keeps them compact)."""
+    key = (str(path), limit, prior, load)
+    sig = _sig(path)
+    hit = _SHARED.get(key)
+    if hit and hit[0] == sig: return hit[1]
+    with _SLOCK:
+        hit = _SHARED.get(key)
+        if hit and hit[0] == sig: return hit[1]
+        ix = BM25Index(load(path, limit), prior=prior)
+        _SHARED[key] = (sig, ix)
+        _log.info("bm25 %s docs=%d terms=%d", path, len(ix), len(ix.post))
+        return ix
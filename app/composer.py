@@ -8,22 +8,15 @@ import re
 from collections import OrderedDict
 import os, re, json, unicodedata, requests, logging
 from bs4 import BeautifulSoup
+from app import bm25, corpus_store, llm, public_flags, rule_engine, segments, sentences
 BASE= Path.home() / "tullman"
 DATA     = BASE / "data"
 CONTENT  = DATA / "content" / "content.jsonl"
 UA       = "Mozilla/5.0 (TullmanAI/1.0)"
 WIKI_URL = "https://en.wikipedia.org/wiki/Howard_A._Tullman"
 
-# Public JSON filter: exclude email/"Just Ken"/ceremony/speech content
-BAD_TERMS  = {
-  'gmail','my thoughts','kmages','ken mages','avatarbuddy','trincity','eyelevel','just ken','newsletter','on infinity',
-  'graduation','commencement','committee','illinois tech','illinois institute of technology','ceremony','speech',
-  'i want to thank','honored to','team at 1871','board','applause','faculty and staff'
-}
-GOOD_HINTS = {
-  'tullman','howard tullman','hat ',' 1871 ','kendall college','tribeca flashpoint','chicagoland entrepreneurial center',
-  'ccc information services','tunes.com','cobalt'
-}
+# Public JSON filter lives in app/public_flags.py (flags are stored on rows at ingest)
+BAD_TERMS, GOOD_HINTS = public_flags.BAD_TERMS, public_flags.GOOD_HINTS
 
 # Public links should come from Howard's properties or solid bios
 SAFE_DOMAINS = ('howardtullman.com','tullman.blogspot.com','blogspot.com','inc.com','northwestern.edu','wikipedia.org',
@@ -45,16 +38,8 @@ def _is_strategy_prompt(prompt:str)->bool:
     q=(prompt or '').lower()
     return ('ai' in q and 'strategy' in q) or 'need an ai' in q or 'ai plan' in q
 
-def _load_corpus(limit:int|None=None)->list[dict]:
-    out=[]
-    if not CONTENT.exists(): return out
-    with open(CONTENT,"r",encoding="utf-8") as f:
-        for i,line in enumerate(f):
-            try:
-                out.append(json.loads(line))
-                if limit and len(out)>=limit: break
-            except: pass
-    return out
+def _load_corpus(limit:int|None=None)->corpus_store.CorpusStore:
+    return corpus_store.load(CONTENT, limit)
 
 def _domain_ok(u:str)->bool:
     try:
@@ -63,13 +48,7 @@ def _domain_ok(u:str)->bool:
     except: return False
 
 def _ok_public(rec:dict)->bool:
-    name=_norm(rec.get("source_name"))
-    text=_norm(rec.get("text"))
-    if _looks_email(rec.get("text","")): return False
-    if any(b in name or b in text for b in BAD_TERMS): return False
-    if any(g in name for g in GOOD_HINTS): return True
-    if any(g in text for g in GOOD_HINTS): return True
-    return False
+    return public_flags.public_ok(rec)
 
 def _clean_title(t:str|None)->str:
     if not t: return "Source"
@@ -78,18 +57,14 @@ def _clean_title(t:str|None)->str:
     if t and t.upper()==t: t = t.title()
     return t or "Source"
 
+def _corpus_index():
+    # postings shared across workers through an mmap'd segment; priors computed per worker
+    return segments.index(CONTENT, 80000, prior=bm25.tullman_prior)
+
 def _select_chunks(prompt:str, public:bool, k:int=8)->tuple[list[dict],list[dict]]:
-    rows=_load_corpus(limit=80000)
-    q=_norm(prompt); terms=set(re.findall(r"[a-zA-Z]{3,}", q))
-    scored=[]
-    for r in rows:
-        if public and not _ok_public(r): continue
-        txt=(r.get("text") or ""); low=txt.lower()
-        boost=5 if ("tullman" in ((r.get("source_name") or "") + " " + low)) else 0
-        sc=boost + sum(low.count(t) for t in terms)
-        if sc>0: scored.append((sc, r))
-    scored.sort(key=lambda x:x[0], reverse=True)
-    top=[r for _,r in scored[:k]]
+    # BM25 over the cached corpus; the public filter only runs on rows popped off the heap
+    hits=_corpus_index().search(prompt, k, accept=_ok_public if public else None)
+    top=[r for _,r in hits]
 
     url_sources=[]; seen=set()
     for r in top:
@@ -105,9 +80,8 @@ def _facts_from(chunks:list[dict], max_facts:int=8)->str:
     facts=[]; seen=set()
     for r in chunks:
         t=(r.get("text") or "")
-        for s in re.split(r'(?<=[.!?])\s+', t)[:2]:
-            s=s.strip()
-            if not s: continue
+        for a,b,_ in sentences.spans(r)[:2]:     # offsets precomputed at ingest
+            s=t[a:b]
             low=s.lower()
             if low.startswith(("by ","photo:","copyright")): continue
             if any(b in low for b in BAD_TERMS): continue
@@ -184,9 +158,7 @@ def _curated_fallback(prompt:str)->str:
 
 def _gpt_rewrite(question:str, facts:str, prior:str, links:list[dict])->str:
     try:
-        import openai
-        openai.api_key = os.environ.get("OPENAI_API_KEY","")
-        if not openai.api_key:
+        if not os.environ.get("OPENAI_API_KEY",""):
             raise RuntimeError("OPENAI_API_KEY missing")
         sysmsg = ("You are Howard Tullman. Answer the user’s question in the very first sentence — directly, specifically, and in first person (I, my). Use prior context if present. Do not greet or preface. Return clean Markdown. Do not add '# Answer'. "
                   "Fix subject-verb agreement; avoid repeating article titles; no third-person self-reference. "
@@ -199,16 +171,10 @@ def _gpt_rewrite(question:str, facts:str, prior:str, links:list[dict])->str:
         models += ["gpt-5-thinking","gpt-4o","gpt-4o-mini"]
 
         body=None
-        for m in models:
+        for m in llm.chain(models):
             try:
                 _log.info(f"kenifier model={m} remote=True")
-                resp = openai.ChatCompletion.create(
-                    model=m,
-                    messages=[{"role":"system","content":sysmsg},
-                              {"role":"user","content":user}],
-                    temperature=0.2,
-                )
-                body = (resp["choices"][0]["message"]["content"] or "").strip()
+                body = llm.chat(llm.messages(sysmsg, user), model=m, temperature=0.2)
                 if body: break
             except Exception as e:
                 _log.warning(f"kenifier remote failed on {m}: {e}")
@@ -314,7 +280,7 @@ def compose(prompt:str, public:bool=True, prior:str="")->tuple[str,list[dict]]:
     return md, links
 
 def _strategy_links_from_corpus(max_links:int=2)->list[dict]:
-    rows = _load_corpus(limit=80000)
+    rows = _corpus_index().rows
     picks=[]; seen=set()
     for r in rows:
         u = r.get("url") or ""
@@ -344,11 +310,10 @@ def _gpt_rewrite(question:str, facts:str, prior:str, links:list[dict])->str:
     never begin with a salutation.
     """
     try:
-        import os, openai
+        import os
         key = os.environ.get("OPENAI_API_KEY","")
         if not key:
             raise RuntimeError("OPENAI_API_KEY missing")
-        openai.api_key = key
 
         # prefer env model; then gpt-5 -> 4o -> 4o-mini
         models = []
@@ -374,16 +339,10 @@ def _gpt_rewrite(question:str, facts:str, prior:str, links:list[dict])->str:
         )
 
         body = None
-        for m in models:
+        for m in llm.chain(models):
             try:
                 _log.info(f"kenifier model={m} remote=True")
-                resp = openai.ChatCompletion.create(
-                    model=m,
-                    messages=[{"role":"system","content":sysmsg},
-                              {"role":"user","content":user}],
-                    temperature=0.2,
-                )
-                body = (resp["choices"][0]["message"]["content"] or "").strip()
+                body = llm.chat(llm.messages(sysmsg, user), model=m, temperature=0.2)
                 if body: break
             except Exception as e:
                 _log.warning(f"kenifier remote failed on {m}: {e.__class__.__name__}")
@@ -419,9 +378,14 @@ REFLECTIVE_TOPICS = {
     "goals_forget": ("forget when chasing goals",)
 }
 
+rule_engine.register({f"reflective.{t}": ks for t, ks in REFLECTIVE_TOPICS.items()})
+
+def _reflective_tag(q:str):
+    hit = rule_engine.ordered(q, "reflective.")
+    return hit[0].split(".", 1)[1] if hit else None
+
 def _is_reflective_prompt(q:str)->bool:
-    q=(q or "").lower()
-    return any(any(k in q for k in ks) for ks in REFLECTIVE_TOPICS.values())
+    return _reflective_tag(q) is not None
 
 SKELETON = {
   "success":      "Success is sustained impact: useful outcomes shipped on time, with integrity, that compound over years.",
@@ -446,10 +410,7 @@ SKELETON = {
 }
 
 def _compose_reflective(prompt:str, prior:str)->tuple[str,list[dict]]:
-    tag = None
-    q=(prompt or "").lower()
-    for t, keys in REFLECTIVE_TOPICS.items():
-        if any(k in q for k in keys): tag = t; break
+    tag = _reflective_tag(prompt)
     body = SKELETON.get(tag, "Here\'s my view - short, specific, and useful:\n- ...")
     # Prefer GPT polish with PRIOR; otherwise return the skeleton.
     try:
@@ -464,12 +425,7 @@ def _compose_reflective(prompt: str, prior: str) -> tuple[str, list[dict]]:
     Question-first reflective answer using a concise skeleton; GPT polish if available.
     Always returns first-person, no greeting, and normalized phrasing.
     """
-    tag = None
-    q = (prompt or "").lower()
-    for t, keys in REFLECTIVE_TOPICS.items():
-        if any(k in q for k in keys):
-            tag = t
-            break
+    tag = _reflective_tag(prompt)
 
     body = SKELETON.get(tag, "Here\'s my view - short, specific, and useful:\n- ...")
 
@@ -0,0 +1,393 @@
+# Compact in-memory form of content.jsonl for the per-worker corpora (server.load_rows,
+# howard._load_rows, the bm25.corpus() indexes behind composer and clean_canary).
+# A row is an integer id into column arrays instead of a Python dict:
+#   text, title, id, hash        UTF-8 in one contiguous buffer per column, sliced by an
+#                                offset array (n+1 entries)
+#   source_name, source_type,    interned: one string table per column, array('I') of
+#   source_path, part, url       table indexes per row (chunks of a source share one copy)
+#   public flags + flags_v       2 bits per flag (present, value) in a bytearray; versions
+#                                are array('b'), -1 = absent
+#   sents / sent_h / sents_v     flat array('i') offsets and array('q') hashes with a
+#                                per-row start index (see app/sentences.py)
+#   anything else (tags, dates)  the remaining keys as compact JSON, interned too
+# A value that doesn't fit its column (non-str text, non-bool flag, ...) goes to the JSON
+# remainder, so rows read back as parsed (a None value reads as absent).
+# store[i] returns a Row view (__slots__, dict-style get/[]/in/items) so callers written for
+# dicts keep working. A view decodes "text" once and keeps it: snippet, flag and sentence
+# code each read it from the same view, and the decode is most of a read's cost. Writes to flags/versions land in the arrays; other writes (e.g.
+# sentences.annotate on an old row) go to a small per-row overlay.
+# blocks()/mapped() export the columns and rebuild a read-only store over buffers (e.g.
+# memoryviews of an mmap'd segment file, see app/segments.py) without copying them.
+# Chain(base, tail) puts rows appended to content.jsonl after a mapped base (tail-following
+# reload in app/segments.py) behind it as one sequence.
+# This file is also loaded by path (releases/clean_canary), so it only uses the stdlib.
+import json
+from array import array
+from pathlib import Path
+
+STR_COLS = ("text", "title", "id", "hash")
+CAT_COLS = ("source_name", "source_type", "source_path", "part", "url")
+FLAG_COLS = ("is_email", "bad_term_hit", "good_hint_hit", "public_ok")
+VER_COLS = ("flags_v", "sents_v")
+SENT_COLS = ("sents", "sent_h")
+KEYS = STR_COLS[2:] + ("title",) + CAT_COLS + ("text",) + FLAG_COLS + VER_COLS + SENT_COLS
+_OWN = frozenset(KEYS)
+_MISSING = object()
+_JSON = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode
+
+class Row:
+    """Read view of one stored row."""
+    __slots__ = ("_s", "_i", "_text")
+
+    def __init__(self, store, i):
+        self._s, self._i, self._text = store, i, None
+
+    def _get(self, key):
+        if key != "text": return self._s._value(self._i, key)
+        v = self._text
+        if v is None: v = self._text = self._s._value(self._i, key)
+        return v
+
+    def get(self, key, default=None):
+        v = self._get(key)
+        return default if v is _MISSING else v
+
+    def __getitem__(self, key):
+        v = self._get(key)
+        if v is _MISSING: raise KeyError(key)
+        return v
+
+    def __setitem__(self, key, value):
+        self._s._set(self._i, key, value); self._text = None
+
+    def update(self, other=(), **kw):
+        for k, v in dict(other, **kw).items():
+            self._s._set(self._i, k, v)
+        self._text = None
+
+    def __contains__(self, key):
+        return self._get(key) is not _MISSING
+
+    def keys(self):
+        return [k for k, _ in self.items()]
+
+    def items(self):
+        s, i = self._s, self._i
+        out = [(k, v) for k in KEYS if (v := s._value(i, k, overlay=False)) is not _MISSING]
+        extra = s._extra(i)
+        if extra: out += extra.items()
+        over = s._over.get(i)
+        if over:
+            d = dict(out); d.update(over); out = list(d.items())
+        return out
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.items())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    @property
+    def rowid(self):
+        return self._i
+
+    def __eq__(self, other):
+        return isinstance(other, Row) and other._s is self._s and other._i == self._i
+
+    def __hash__(self):
+        return hash((id(self._s), self._i))
+
+    def __repr__(self):
+        return f"Row({self._i}, {self.to_dict()!r})"
+
+class CorpusStore:
+    def __init__(self):
+        self.n = 0
+        self._buf = {c: bytearray() for c in STR_COLS}
+        self._off = {c: array("I", [0]) for c in STR_COLS}
+        self._tab = {c: [None] for c in CAT_COLS + ("_extra",)}     # index 0 = absent
+        self._tix = {c: {} for c in CAT_COLS + ("_extra",)}
+        self._cat = {c: array("I") for c in CAT_COLS + ("_extra",)}
+        self._flags = bytearray()
+        self._ver = {c: array("b") for c in VER_COLS}
+        self._sent_at = array("I", [0])
+        self._sent_o = array("i")
+        self._sent_h = array("q")
+        self._over = {}                # row -> {key: value} written after load
+        self._xown = {}                # interned remainder -> holds a column key (see _value)
+        self._frozen = False
+        self._ro = False               # columns are borrowed buffers (mapped segment)
+        self.end = 0                   # byte offset in the source after the last line read
+
+    # ---- build
+    def append(self, rec: dict) -> int:
+        if self._ro: raise TypeError("mapped corpus store is read-only")
+        if self._frozen: self._thaw()
+        rest = {k: v for k, v in rec.items() if k not in _OWN and v is not None}
+        for c in STR_COLS:
+            v = rec.get(c)
+            if v is not None and (not isinstance(v, str) or not v):
+                rest[c] = v; v = None          # "" too: an empty slice reads as absent
+            b, off = self._buf[c], self._off[c]
+            if v: b += v.encode("utf-8", "surrogatepass")
+            if len(b) > 0xFFFFFFFF and off.typecode == "I":
+                off = self._off[c] = array("Q", off)
+            off.append(len(b))
+        for c in CAT_COLS:
+            v = rec.get(c)
+            if v is not None and not isinstance(v, str):
+                rest[c] = v; v = None
+            self._cat[c].append(self._intern(c, v))
+        bits = 0
+        for j, c in enumerate(FLAG_COLS):
+            v = rec.get(c)
+            if v is None: continue
+            if isinstance(v, bool): bits |= (2 | v) << (2 * j)
+            else: rest[c] = v
+        self._flags.append(bits)
+        for c in VER_COLS:
+            v = rec.get(c)
+            if v is None: v = -1
+            elif type(v) is not int or not 0 <= v <= 127: rest[c] = v; v = -1
+            self._ver[c].append(v)
+        self._append_sents(rec, rest)
+        self._cat["_extra"].append(self._intern("_extra", _JSON(rest) if rest else None))
+        self.n += 1
+        return self.n - 1
+
+    def _append_sents(self, rec, rest):
+        o, h = rec.get("sents"), rec.get("sent_h")
+        if o is None and h is None:
+            self._sent_at.append(len(self._sent_h)); return
+        try:
+            if len(o) != 2 * len(h): raise ValueError
+            no, nh = len(self._sent_o), len(self._sent_h)
+            try:
+                self._sent_o.extend(o); self._sent_h.extend(h)
+            except (TypeError, OverflowError):
+                del self._sent_o[no:], self._sent_h[nh:]; raise
+        except (TypeError, ValueError, OverflowError):
+            if o is not None: rest["sents"] = o
+            if h is not None: rest["sent_h"] = h
+        self._sent_at.append(len(self._sent_h))
+
+    def _intern(self, col, v):
+        if v is None: return 0
+        ix = self._tix[col]
+        k = ix.get(v)
+        if k is None:
+            k = ix[v] = len(self._tab[col]); self._tab[col].append(v)
+        return k
+
+    def extend(self, rows) -> list:
+        """Append rows; returns their views."""
+        return [Row(self, self.append(r.to_dict() if isinstance(r, Row) else r)) for r in rows]
+
+    def freeze(self) -> "CorpusStore":
+        """Drop build-time slack: buffers become bytes, intern dicts are released."""
+        if not self._frozen:
+            self._buf = {c: bytes(b) for c, b in self._buf.items()}
+            self._tix = None
+            self._frozen = True
+        return self
+
+    def _thaw(self):
+        self._buf = {c: bytearray(b) for c, b in self._buf.items()}
+        self._tix = {c: {v: k for k, v in enumerate(t) if k} for c, t in self._tab.items()}
+        self._frozen = False
+
+    # ---- read
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Row(self, j) for j in range(*i.indices(self.n))]
+        if i < 0: i += self.n
+        if not 0 <= i < self.n: raise IndexError(i)
+        return Row(self, i)
+
+    def __iter__(self):
+        for i in range(self.n): yield Row(self, i)
+
+    def _extra(self, i):
+        k = self._cat["_extra"][i]
+        return json.loads(self._tab["_extra"][k]) if k else None
+
+    def _value(self, i, key, overlay=True):
+        if overlay and self._over:
+            over = self._over.get(i)
+            if over and key in over: return over[key]
+        if key in self._off:
+            off = self._off[key]
+            a, b = off[i], off[i + 1]
+            if a != b: return str(self._buf[key][a:b], "utf-8", "surrogatepass")
+        elif key in self._cat:
+            k = self._cat[key][i]
+            if k: return self._tab[key][k]
+        elif key in FLAG_COLS:
+            bits = self._flags[i] >> (2 * FLAG_COLS.index(key))
+            if bits & 2: return bool(bits & 1)
+        elif key in self._ver:
+            v = self._ver[key][i]
+            if v >= 0: return v
+        elif key in SENT_COLS:
+            a, b = self._sent_at[i], self._sent_at[i + 1]
+            if a != b or self._ver["sents_v"][i] >= 0:
+                return self._sent_o[2 * a:2 * b] if key == "sents" else self._sent_h[a:b]
+        if key in _OWN:
+            # an absent column only lives in the remainder if the value did not fit the
+            # column; most remainders (tags, dates) hold none, and knowing that per interned
+            # string saves parsing the JSON on every miss (url on non-blog rows)
+            k = self._cat["_extra"][i]
+            if not k: return _MISSING
+            own = self._xown.get(k)
+            if own is None:
+                own = self._xown[k] = not _OWN.isdisjoint(json.loads(self._tab["_extra"][k]))
+            if not own: return _MISSING
+        extra = self._extra(i)
+        return extra.get(key, _MISSING) if extra else _MISSING
+
+    def _set(self, i, key, value):
+        if self._ro:
+            self._over.setdefault(i, {})[key] = value
+        elif key in FLAG_COLS and isinstance(value, bool) and key not in self._over.get(i, ()):
+            j = 2 * FLAG_COLS.index(key)
+            self._flags[i] = (self._flags[i] & ~(3 << j)) | ((2 | value) << j)
+        elif key in VER_COLS and type(value) is int and 0 <= value <= 127 and key not in self._over.get(i, ()):
+            self._ver[key][i] = value
+        else:
+            self._over.setdefault(i, {})[key] = value
+
+    def count(self, key, default=None) -> dict:
+        """{value: rows} for an interned column (no per-row views)."""
+        if key not in self._cat:
+            out = {}
+            for r in self:
+                v = r.get(key, default); out[v] = out.get(v, 0) + 1
+            return out
+        tab, hits = self._tab[key], {}
+        for k in self._cat[key][:self.n]: hits[k] = hits.get(k, 0) + 1
+        return {(tab[k] if k else default): c for k, c in hits.items()}
+
+    def head(self, n: int) -> "CorpusStore":
+        """The first n rows as a store sharing these columns (and overlay)."""
+        if n >= self.n: return self
+        st = object.__new__(CorpusStore)
+        st.__dict__.update(self.__dict__)
+        st.n = n; st._ro = True
+        return st
+
+    # ---- export
+    def blocks(self) -> tuple[dict, dict]:
+        """({block name: (typecode, buffer)}, {interned column: string table})."""
+        self.freeze()
+        out = {}
+        for c in STR_COLS:
+            out[f"buf.{c}"] = ("B", self._buf[c]); out[f"off.{c}"] = (self._off[c].typecode, self._off[c])
+        for c in self._cat:
+            out[f"cat.{c}"] = ("I", self._cat[c])
+        out["flags"] = ("B", self._flags)
+        for c in VER_COLS:
+            out[f"ver.{c}"] = ("b", self._ver[c])
+        out["sent_at"], out["sent_o"], out["sent_h"] = ("I", self._sent_at), ("i", self._sent_o), ("q", self._sent_h)
+        return out, {c: t for c, t in self._tab.items()}
+
+    @classmethod
+    def mapped(cls, n: int, blocks: dict, tables: dict) -> "CorpusStore":
+        """Read-only store over blocks() buffers (anything indexable: array, memoryview)."""
+        st = cls()
+        st.n = n
+        st._buf = {c: blocks[f"buf.{c}"] for c in STR_COLS}
+        st._off = {c: blocks[f"off.{c}"] for c in STR_COLS}
+        st._cat = {c: blocks[f"cat.{c}"] for c in st._cat}
+        st._tab = {c: list(t) for c, t in tables.items()}
+        st._tix = None
+        st._flags = blocks["flags"]
+        st._ver = {c: blocks[f"ver.{c}"] for c in VER_COLS}
+        st._sent_at, st._sent_o, st._sent_h = blocks["sent_at"], blocks["sent_o"], blocks["sent_h"]
+        st._frozen = st._ro = True
+        return st
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (buffers, arrays, string tables)."""
+        import sys
+        n = sum(len(b) for b in self._buf.values()) + len(self._flags)
+        for a in list(self._off.values()) + list(self._cat.values()) + list(self._ver.values()) + \
+                 [self._sent_at, self._sent_o, self._sent_h]:
+            n += a.itemsize * len(a)
+        n += sum(sys.getsizeof(s) for t in self._tab.values() for s in t if s is not None)
+        return n
+
+    def stats(self) -> dict:
+        return {"rows": self.n, "bytes": self.nbytes(), "bytes_per_row": round(self.nbytes() / max(1, self.n)),
+                "interned": {c: len(t) - 1 for c, t in self._tab.items()}, "overlay": len(self._over)}
+
+class Chain:
+    """A read-only base store followed by an appendable tail, as one row sequence."""
+
+    def __init__(self, base: CorpusStore, tail: CorpusStore | None = None):
+        self.base, self.tail = base, tail or CorpusStore()
+
+    @property
+    def n(self):
+        return self.base.n + self.tail.n
+
+    def __len__(self):
+        return self.base.n + self.tail.n
+
+    def __getitem__(self, i):
+        nb = self.base.n
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        return self.base[i] if i < nb else self.tail[i - nb]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.tail
+
+    def extend(self, rows) -> list:
+        return self.tail.extend(rows)
+
+    def count(self, key, default=None) -> dict:
+        out = self.base.count(key, default)
+        for k, c in self.tail.count(key, default).items(): out[k] = out.get(k, 0) + c
+        return out
+
+    def nbytes(self) -> int:
+        return self.base.nbytes() + self.tail.nbytes()
+
+    def stats(self) -> dict:
+        return {"rows": len(self), "base_rows": self.base.n, "tail_rows": self.tail.n,
+                "tail_bytes": self.tail.nbytes(), "overlay": len(self.base._over) + len(self.tail._over)}
+
+def records(path: Path, off: int = 0, limit: int | None = None):
+    """(row, end offset) per complete line from byte `off`, row None for blank/bad lines,
+    stopping after `limit` rows; a partial last line (a writer mid-append) is left for the
+    next read."""
+    with Path(path).open("rb") as f:
+        f.seek(off)
+        for raw in f:
+            if not raw.endswith(b"\n") or limit == 0: break
+            off += len(raw)
+            try: rec = json.loads(raw)
+            except Exception: rec = None
+            if not isinstance(rec, dict):
+                yield None, off; continue
+            yield rec, off
+            if limit: limit -= 1
+
+def load(path: Path, limit: int | None = None) -> CorpusStore:
+    """First `limit` JSON-object rows of a JSONL file (blank/bad lines skipped); .end is
+    the byte offset after the last line read."""
+    st = CorpusStore()
+    path = Path(path)
+    if not path.exists(): return st.freeze()
+    for rec, end in records(path, 0, limit):
+        if rec is not None: st.append(rec)
+        st.end = end
+    return st.freeze()
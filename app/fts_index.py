@@ -0,0 +1,200 @@
+# SQLite FTS5 index over data/content/content.jsonl (the content.db server_stable queries).
+#
+# Layout (external content: the text is stored once, in `docs`):
+#   docs(rowid, id, hash, title, source_name, source_type, part, text, url, off,
+#        is_email, bad_term_hit, good_hint_hit, public_ok, flags_v,    -- see public_flags.py
+#        sents, sent_h, sents_v)                                       -- see sentences.py
+#   content  = fts5(title, source_name, source_type, part, text, url UNINDEXED,
+#                   content='docs', content_rowid='rowid')
+#   meta(key, value)  -- watermark: byte offset + inode + hash of the bytes just before it
+#
+# content.jsonl is append-only, so update() only parses the lines past the watermark and
+# inserts them into docs + content in one transaction. If the file was rewritten (inode
+# change, shrank, or the bytes under the watermark differ) it falls back to rebuild().
+# Everything runs inside a transaction on a WAL database, so readers keep answering from
+# the previous snapshot while the index is being written.
+#
+#   python -m app.fts_index [update|rebuild|optimize|stats]
+import hashlib, json, sqlite3, sys, time, logging
+from pathlib import Path
+from app import public_flags, sentences
+
+_log = logging.getLogger("fts_index")
+
+BASE = Path.home() / "tullman"
+CONTENT_JSONL = BASE / "data" / "content" / "content.jsonl"
+FTS_DB = BASE / "data" / "content" / "content.db"
+
+COLS = ("title", "source_name", "source_type", "part", "text", "url")
+TAIL = 4096        # bytes hashed just before the watermark
+BATCH = 2000
+SCHEMA_VERSION = 3  # 2: public-safety flag columns on docs; 3: sentence offsets/hashes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs(
+  rowid INTEGER PRIMARY KEY, id TEXT, hash TEXT, title TEXT, source_name TEXT,
+  source_type TEXT, part TEXT, text TEXT, url TEXT, off INTEGER,
+  is_email INTEGER, bad_term_hit INTEGER, good_hint_hit INTEGER, public_ok INTEGER, flags_v INTEGER,
+  sents TEXT, sent_h TEXT, sents_v INTEGER);
+CREATE INDEX IF NOT EXISTS docs_hash ON docs(hash);
+CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(
+  title, source_name, source_type, part, text, url UNINDEXED,
+  content='docs', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2');
+CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def connect(db: Path = FTS_DB, write: bool = True) -> sqlite3.Connection:
+    db.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(db), timeout=30, isolation_level=None)
+    if not write: return con
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    if con.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        # older layout: drop it; update() then finds no watermark and rebuilds
+        con.executescript("DROP TABLE IF EXISTS content; DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS meta;")
+        con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    con.executescript(SCHEMA)
+    return con
+
+def _meta(con) -> dict:
+    return dict(con.execute("SELECT key, value FROM meta"))
+
+def _tail_hash(path: Path, off: int) -> str:
+    if off <= 0: return ""
+    with path.open("rb") as f:
+        f.seek(max(0, off - TAIL))
+        return hashlib.sha1(f.read(min(off, TAIL))).hexdigest()
+
+def _rows(path: Path, off: int):
+    """(start, end, row) for each complete line from `off`; a trailing partial line is left."""
+    with path.open("rb") as f:
+        f.seek(off)
+        for raw in f:
+            if not raw.endswith(b"\n"): break
+            at = off; off += len(raw)
+            try: r = json.loads(raw)
+            except Exception: continue
+            if isinstance(r, dict): yield at, off, r
+
+def _insert(con, path: Path, off: int) -> tuple[int, int]:
+    """Append docs from `off`, index them, move the watermark. Returns (rows, end offset)."""
+    first = con.execute("SELECT coalesce(max(rowid), 0) FROM docs").fetchone()[0]
+    n = 0; end = off; batch = []
+    sql = ("INSERT INTO docs(id, hash, title, source_name, source_type, part, text, url, off, "
+           "is_email, bad_term_hit, good_hint_hit, public_ok, flags_v, sents, sent_h, sents_v) "
+           "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)")
+    for at, end, r in _rows(path, off):
+        public_flags.annotate(r)   # rows written before the flags existed get them here
+        batch.append((r.get("id"), r.get("hash"), *[r.get(c) for c in COLS], at,
+                      *[int(r[f]) for f in public_flags.FLAGS], r["flags_v"], *sentences.columns(r)))
+        if len(batch) >= BATCH:
+            con.executemany(sql, batch); n += len(batch); batch.clear()
+    if batch: con.executemany(sql, batch); n += len(batch)
+    if n:
+        con.execute(f"INSERT INTO content(rowid, {', '.join(COLS)}) "
+                    f"SELECT rowid, {', '.join(COLS)} FROM docs WHERE rowid > ?", (first,))
+    st = path.stat()
+    con.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", [
+        ("source", str(path)), ("offset", str(end)), ("inode", str(st.st_ino)),
+        ("tail_hash", _tail_hash(path, end)), ("updated", str(int(time.time())))])
+    return n, end
+
+def _report(op: str, n: int, nbytes: int, dt: float) -> dict:
+    out = {"op": op, "rows": n, "bytes": nbytes, "secs": round(dt, 3),
+           "rows_per_s": round(n / dt) if dt > 0 else n,
+           "mb_per_s": round(nbytes / dt / 1e6, 2) if dt > 0 else 0.0}
+    _log.info("fts %s", out)
+    return out
+
+def rebuild(path: Path = CONTENT_JSONL, db: Path = FTS_DB) -> dict:
+    """Re-index content.jsonl from scratch in one transaction."""
+    t0 = time.perf_counter()
+    con = connect(db)
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        con.execute("INSERT INTO content(content) VALUES('delete-all')")
+        con.execute("DELETE FROM docs")
+        con.execute("DELETE FROM meta")
+        n, end = _insert(con, path, 0) if path.exists() else (0, 0)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK"); raise
+    finally:
+        con.close()
+    return _report("rebuild", n, end, time.perf_counter() - t0)
+
+def update(path: Path = CONTENT_JSONL, db: Path = FTS_DB) -> dict:
+    """Index rows appended since the watermark (rebuilds if the file was rewritten)."""
+    if not path.exists(): return _report("update", 0, 0, 0.0)
+    t0 = time.perf_counter()
+    con = connect(db)
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        m = _meta(con); st = path.stat()
+        off = int(m.get("offset") or 0)
+        same = (m.get("source") == str(path) and m.get("inode") == str(st.st_ino)
+                and st.st_size >= off and m.get("tail_hash", "") == _tail_hash(path, off))
+        if not same:
+            con.execute("ROLLBACK"); con.close(); con = None
+            return rebuild(path, db)
+        n, end = _insert(con, path, off)
+        con.execute("COMMIT")
+    except Exception:
+        if con is not None: con.execute("ROLLBACK")
+        raise
+    finally:
+        if con is not None: con.close()
+    return _report("update", n, end - off, time.perf_counter() - t0)
+
+def try_update(path: Path = CONTENT_JSONL, db: Path = FTS_DB) -> dict | None:
+    """update() for ingest hooks: a failed index write must not fail the ingest."""
+    try:
+        return update(path, db)
+    except Exception as e:
+        _log.warning("fts update failed: %s", e)
+        return None
+
+def optimize(db: Path = FTS_DB) -> dict:
+    """Merge FTS5 segments and compact the file."""
+    t0 = time.perf_counter()
+    con = connect(db)
+    try:
+        con.execute("INSERT INTO content(content) VALUES('optimize')")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        con.execute("VACUUM")
+    finally:
+        con.close()
+    out = stats(db); out["secs"] = round(time.perf_counter() - t0, 3)
+    return out
+
+def stats(db: Path = FTS_DB) -> dict:
+    if not db.exists(): return {"db": str(db), "exists": False}
+    con = connect(db, write=False)
+    try:
+        m = _meta(con)
+        docs = con.execute("SELECT count(*) FROM docs").fetchone()[0]
+        text = con.execute("SELECT coalesce(sum(length(text)), 0) FROM docs").fetchone()[0]
+        fts = con.execute("SELECT coalesce(sum(length(block)), 0) FROM content_data").fetchone()[0]
+        segs = con.execute("SELECT count(*) FROM content_data").fetchone()[0]
+        page = con.execute("PRAGMA page_size").fetchone()[0] * con.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        con.close()
+    wal = Path(str(db) + "-wal")
+    return {"db": str(db), "exists": True, "docs": docs, "offset": int(m.get("offset") or 0),
+            "updated": int(m.get("updated") or 0), "db_bytes": page,
+            "wal_bytes": wal.stat().st_size if wal.exists() else 0,
+            "text_bytes": text, "fts_index_bytes": fts, "fts_blocks": segs,
+            "bytes_per_doc": round(page / docs) if docs else 0}
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    cmd = (argv or sys.argv[1:] or ["update"])[0]
+    ops = {"update": update, "rebuild": rebuild, "optimize": optimize, "stats": stats}
+    if cmd not in ops:
+        print("usage: python -m app.fts_index [update|rebuild|optimize|stats]"); return 2
+    print(json.dumps(ops[cmd](), indent=2))
+    if cmd != "stats": print(json.dumps(stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 # ASCII-only: JSON → GPT-5 (Howard) → Kenifier
 import os, json, re, logging
+from app import llm, segments
 _log = logging.getLogger("howard")
 
 BASE     = Path.home() / "tullman"
@@ -12,48 +13,20 @@ VOICEPRINT = (
 "You are Howard Tullman. Write in first person (I, my). No greetings. The FIRST sentence must directly answer the question. If the question implies an audience (e.g., a 10-year-old), match that level. Use prior context and JSON WEAVE only if they improve accuracy and clarity—otherwise ignore them. Be direct, practical, operator-minded. Prefer \"founded and ran\" (never \"founded or ran\"). If you cite, use short chips (Title - URL). Return clean Markdown."
 )
 
-_cache = None
-def _load_rows(limit=20000):
-    global _cache
-    if _cache is not None:
-        return _cache
-    rows = []
-    if CONTENT.exists():
-        with CONTENT.open("r", encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rows.append(json.loads(line))
-                except:
-                    pass
-                if i >= limit:
-                    break
-    _cache = rows
-    _log.info("howard.jsonl rows=%d", len(rows))
-    return _cache
+ROWS_LIMIT = 20000
+def _load_rows(limit=ROWS_LIMIT):
+    """content.jsonl rows of the shared segment (app/segments.py; same one server.py maps)."""
+    return segments.corpus(CONTENT, limit + 1)
 
-def _score(q, text):
-    ql = (q or "").lower()
-    tl = (text or "").lower()
-    if not tl:
-        return 0
-    terms = set(re.findall(r"[a-z0-9]{4,}", ql))
-    return sum(tl.count(t) for t in terms)
+def _index():
+    """BM25 postings over the segment rows (see app/bm25.py)."""
+    return segments.index(CONTENT, ROWS_LIMIT + 1)
 
 def weave_from_json(prompt, k=6, max_chars=1800):
-    rows = _load_rows()
-    scored = []
-    for r in rows:
-        t = r.get("text") or ""
-        s = _score(prompt, t)
-        if s > 0:
-            scored.append((s, r))
-    scored.sort(key=lambda x: x[0], reverse=True)
+    scored = _index().search(prompt, k)
     parts, links = [], []
     total = 0
-    for _, r in scored[:k]:
+    for _, r in scored:
         txt = (r.get("text") or "").strip()
         if not txt:
             continue
@@ -70,8 +43,7 @@ def weave_from_json(prompt, k=6, max_chars=1800):
 
 def _gpt(prompt, prior, weave, links):
     try:
-        import openai
-        openai.api_key = os.environ.get("OPENAI_API_KEY", "")
+        if not llm.api_key(): raise llm.LLMUnavailable("OPENAI_API_KEY missing")
         models = []
         envm = os.environ.get("OPENAI_MODEL", "").strip()
         if envm:
@@ -86,16 +58,10 @@ def _gpt(prompt, prior, weave, links):
             + ("\n\nWEAVE:\n" + weave if weave else "")
             + ("\n\nLINKS:\n" + link_md if link_md else "")
         )
-        for m in models:
+        for m in llm.chain(models):
             try:
                 _log.info("howard.gpt model=%s", m)
-                resp = openai.ChatCompletion.create(
-                    model=m,
-                    messages=[{"role": "system", "content": sysmsg},
-                              {"role": "user",   "content": user}],
-                    temperature=0.2,
-                )
-                text = (resp["choices"][0]["message"]["content"] or "").strip()
+                text = llm.chat(llm.messages(sysmsg, user), model=m, temperature=0.2)
                 if text:
                     return text
             except Exception as e:
@@ -1,39 +1,46 @@
+from app import rule_engine
+
+# keyword tables; matching is done by app/rule_engine.py in one pass per prompt
+BIO_KEYS       = ("who is","about","bio","profile","background")
+AI_KEYS        = ("ai","artificial intelligence")
+PLAN_KEYS      = ("strategy","roadmap","plan","playbook","table stakes","table-stakes")
+STRATEGY_KEYS  = ("need an ai strategy","why do i need an ai")
+KENDALL_KEYS   = ("kendall",)
+REFLECTIVE_KEYS = (
+  "define success","success",
+  "forget when chasing goals","chasing goals",
+  "kindness","boldest opinion","bold opinion",
+  "fear of death","fear death","afterlife",
+  "free will","misunderstood about you","misunderstand about you",
+  "irrational belief","stay grounded","secret fuel",
+  "unshakable belief","core trait","need to hear more often","solitude",
+  "true love","chemistry"
+)
+ISRAEL_KEYS    = ("israel","gaza","hamas","idf","west bank","antisemitism","two-state","two state")
+
+rule_engine.register({
+    "intent.bio": BIO_KEYS, "intent.ai": AI_KEYS, "intent.plan": PLAN_KEYS,
+    "intent.strategy": STRATEGY_KEYS, "intent.kendall": KENDALL_KEYS,
+    "intent.reflective": REFLECTIVE_KEYS, "intent.opinion_israel": ISRAEL_KEYS,
+})
+
 def is_strategy(q: str) -> bool:
-    q=(q or "").lower()
-    if any(k in q for k in ("who is","about","bio","profile","background")): return False
-    has_ai = ("ai" in q) or ("artificial intelligence" in q)
-    has_plan = any(k in q for k in ("strategy","roadmap","plan","playbook","table stakes","table-stakes"))
-    explicit = any(k in q for k in ("need an ai strategy","why do i need an ai"))
-    return (has_ai and has_plan) or explicit
+    m=rule_engine.match(q)
+    if "intent.bio" in m: return False
+    return ("intent.ai" in m and "intent.plan" in m) or "intent.strategy" in m
 
 def is_bio(q: str) -> bool:
-    q=(q or "").lower()
-    return any(k in q for k in ("who is","about","bio","profile","background"))
+    return "intent.bio" in rule_engine.match(q)
 
 def is_kendall(q: str) -> bool:
-    q=(q or "").lower()
-    # match any mention of Kendall plus 
-    # allow specific signals to keep precision if needed
-    return "kendall" in q
+    # match any mention of Kendall
+    return "intent.kendall" in rule_engine.match(q)
 
 def is_reflective(q: str) -> bool:
-    q=(q or "").lower()
-    keys=(
-      "define success","success",
-      "forget when chasing goals","chasing goals",
-      "kindness","boldest opinion","bold opinion",
-      "fear of death","fear death","afterlife",
-      "free will","misunderstood about you","misunderstand about you",
-      "irrational belief","stay grounded","secret fuel",
-      "unshakable belief","core trait","need to hear more often","solitude",
-      "true love","chemistry"
-    )
-    return any(k in q for k in keys)
+    return "intent.reflective" in rule_engine.match(q)
 
 def is_opinion_israel(q: str) -> bool:
-    q=(q or "").lower()
-    keys=("israel","gaza","hamas","idf","west bank","antisemitism","two-state","two state")
-    return any(k in q for k in keys)
+    return "intent.opinion_israel" in rule_engine.match(q)
 
 ROUTES = [
     (is_strategy,       "strategy"),
@@ -0,0 +1,551 @@
+# One gateway for every chat-completion call: server.call_gpt, howard._gpt,
+# composer._gpt_rewrite and, loaded by path, backend/app.py, _retrieve_hotfix.py,
+# retrieve_route.py and log_review_backend.py.
+#   client       one openai.OpenAI per process over a pooled keep-alive httpx client
+#                (LLM_POOL connections kept LLM_KEEPALIVE_S when idle), so requests reuse
+#                TLS connections instead of opening new ones per call; re-created after a
+#                fork (pid check) so workers never share sockets with the master
+#   async        achat(): openai.AsyncOpenAI + httpx.AsyncClient, one per event loop
+#   embed()      embeddings (LLM_EMBED_MODEL) over the same pooled client and slots
+#   stream()     chat() that yields the text as the model produces it (SSE endpoints); it
+#                holds its slot until the last chunk or until the consumer closes it
+#   concurrency  at most LLM_CONCURRENCY calls in flight per process (sync) and per event
+#                loop (async); a call that gets no slot within its timeout raises LLMBusy
+#   timeouts     per call (default LLM_TIMEOUT_S, connect LLM_CONNECT_S), on the HTTP
+#                request itself; LLM_RETRIES retries on connection errors / 429 / 5xx
+#   cache        content-addressed responses: sha256 of (model, messages, parameters) ->
+#                text, in an LRU of LLM_CACHE_MEM entries in front of a SQLite WAL table
+#                (LLM_CACHE_DB) that every worker and both backends share. Rows older than
+#                LLM_CACHE_TTL_S go, and past LLM_CACHE_ROWS the least recently used go.
+#                Each row carries the epoch of the watched files (LLM_CACHE_WATCH:
+#                voiceprint_staging.txt, kenifier_prompt.txt, style_rules.json); an edit
+#                to one of them starts a new epoch, and the first lookup after it drops
+#                the old epoch's rows
+#   breakers     per-model circuit breaker in a SQLite WAL table (LLM_BREAKER_DB) that all
+#                workers share: every chat/stream/achat call records success (latency
+#                EWMA) or failure; LLM_BREAKER_FAILS failures in a row open the model's
+#                circuit for LLM_BREAKER_OPEN_S, doubling per repeated trip up to
+#                LLM_BREAKER_MAX_OPEN_S. After that one worker claims a half-open probe;
+#                its success closes the circuit, its failure re-opens it. chain(models)
+#                yields only models that may be called now, so a fallback list skips dead
+#                models and is empty (curated fallback at once) when every circuit is open.
+#                Only model-health errors count (connection/timeout, 429, 5xx, 404 for a
+#                missing model); a 400 for an over-long prompt or a bad parameter is about
+#                the request, and LLMBusy / LLMUnavailable are local conditions
+# chat()/achat() raise on failure (callers keep their own fallbacks and logging).
+# openai/httpx are imported on first use, so this file imports with the stdlib only.
+#   python -m app.llm [stats|purge|breakers|reset-breakers]
+import asyncio, hashlib, json, os, sqlite3, sys, threading, time, weakref, logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+_log = logging.getLogger("llm")
+
+MODEL        = os.getenv("OPENAI_MODEL", "").strip() or "gpt-4o-mini"
+TIMEOUT_S    = float(os.getenv("LLM_TIMEOUT_S", "60"))
+CONNECT_S    = float(os.getenv("LLM_CONNECT_S", "5"))
+CONCURRENCY  = int(os.getenv("LLM_CONCURRENCY", "8"))
+POOL         = int(os.getenv("LLM_POOL", str(max(8, CONCURRENCY))))
+KEEPALIVE_S  = float(os.getenv("LLM_KEEPALIVE_S", "90"))
+RETRIES      = int(os.getenv("LLM_RETRIES", "1"))
+EMBED_MODEL  = os.getenv("LLM_EMBED_MODEL", "text-embedding-3-small")
+
+CACHE        = os.getenv("LLM_CACHE", "1") not in ("0", "false", "no", "off")
+CACHE_DB     = Path(os.getenv("LLM_CACHE_DB", str(Path.home() / "tullman" / "data" / "llm_cache.db")))
+CACHE_MEM    = int(os.getenv("LLM_CACHE_MEM", "512"))
+CACHE_ROWS   = int(os.getenv("LLM_CACHE_ROWS", "50000"))
+CACHE_TTL_S  = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 86400)))
+CACHE_WATCH  = [Path(p) for p in os.getenv("LLM_CACHE_WATCH", ":".join((
+    "/home/kmages/backend/voiceprint_staging.txt", "/home/kmages/backend/kenifier_prompt.txt",
+    str(Path.home() / "tullman" / "config" / "style_rules.json")))).split(":") if p]
+CACHE_CHECK_S = 2.0     # how often the watched files are stat()ed
+
+BREAKER          = os.getenv("LLM_BREAKER", "1") not in ("0", "false", "no", "off")
+BREAKER_DB       = Path(os.getenv("LLM_BREAKER_DB", str(Path.home() / "tullman" / "data" / "llm_breakers.db")))
+BREAKER_FAILS    = int(os.getenv("LLM_BREAKER_FAILS", "3"))
+BREAKER_OPEN_S   = float(os.getenv("LLM_BREAKER_OPEN_S", "30"))
+BREAKER_MAX_OPEN_S = float(os.getenv("LLM_BREAKER_MAX_OPEN_S", "600"))
+
+class LLMUnavailable(RuntimeError):
+    """No API key, or the openai package is missing."""
+
+class LLMBusy(RuntimeError):
+    """No concurrency slot freed up within the call's timeout."""
+
+def api_key() -> str:
+    return os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY") or ""
+
+def available() -> bool:
+    if not api_key(): return False
+    try:
+        import openai  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+def messages(system: str, user: str) -> list:
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+def _limits():
+    import httpx
+    return (httpx.Limits(max_connections=POOL, max_keepalive_connections=POOL, keepalive_expiry=KEEPALIVE_S),
+            httpx.Timeout(TIMEOUT_S, connect=CONNECT_S))
+
+def _openai():
+    key = api_key()
+    if not key: raise LLMUnavailable("OPENAI_API_KEY missing")
+    try:
+        import openai
+    except Exception as e:
+        raise LLMUnavailable(f"openai not installed: {e.__class__.__name__}")
+    return openai, key
+
+# ---- response cache
+def cache_key(model: str, msgs: list, params: dict) -> str:
+    blob = json.dumps([model, msgs, params], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, db=CACHE_DB, watch=CACHE_WATCH, mem=CACHE_MEM, rows=CACHE_ROWS, ttl_s=CACHE_TTL_S):
+        self.db, self.watch, self.mem_max, self.rows, self.ttl_s = Path(db), watch, mem, rows, ttl_s
+        self.mem = OrderedDict()       # key -> (epoch, text, ms, expires)
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._epoch, self._checked, self._puts = None, 0.0, 0
+        self.broken = None             # sqlite error that switched the table off
+        self.counts = {"mem_hits": 0, "db_hits": 0, "misses": 0, "stored": 0, "evicted": 0, "epochs": 0}
+        self.saved_ms = 0.0
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            self.db.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.db), timeout=2.0, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL"); con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("CREATE TABLE IF NOT EXISTS responses(key TEXT PRIMARY KEY, epoch TEXT, model TEXT,"
+                        " text TEXT, ms REAL, created REAL, used REAL, hits INTEGER DEFAULT 0)")
+            con.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def _sql(self, fn):
+        if self.broken: return None
+        try:
+            return fn(self._con())
+        except sqlite3.OperationalError as e:            # locked/busy: skip this once
+            _log.warning("llm cache: %s", e)
+        except (sqlite3.Error, OSError) as e:
+            self.broken = f"{e.__class__.__name__}: {e}"[:200]
+            _log.warning("llm cache table off (%s); memory only", self.broken)
+        return None
+
+    def epoch(self) -> str:
+        now = time.monotonic()
+        if self._epoch is not None and now - self._checked < CACHE_CHECK_S: return self._epoch
+        sigs = []
+        for p in self.watch:
+            try:
+                st = p.stat(); sigs.append([str(p), st.st_mtime_ns, st.st_size, st.st_ino])
+            except OSError:
+                sigs.append([str(p), None])
+        ep = hashlib.sha1(json.dumps(sigs).encode()).hexdigest()[:16]
+        self._checked = now
+        old = self._epoch
+        if ep != old:
+            with self.lock:
+                self._epoch = ep; self.mem.clear()
+            if old is not None:                           # seen changing: the old rows are wrong now
+                self.counts["epochs"] += 1
+                n = self._sql(lambda con: con.execute("DELETE FROM responses WHERE epoch=?", (old,)).rowcount)
+                _log.info("llm cache: watched files changed, dropped %s responses", n)
+        return ep
+
+    def get(self, key: str):
+        ep = self.epoch()
+        with self.lock:
+            e = self.mem.get(key)
+            if e is not None and e[0] == ep and e[3] > time.time():
+                self.mem.move_to_end(key)
+                self.counts["mem_hits"] += 1; self.saved_ms += e[2]
+                return e[1]
+        now = time.time()
+        row = self._sql(lambda con: con.execute(
+            "SELECT text, ms, created FROM responses WHERE key=? AND epoch=? AND created>?", (key, ep, now - self.ttl_s)).fetchone())
+        if row is None:
+            with self.lock: self.counts["misses"] += 1
+            return None
+        self._sql(lambda con: con.execute("UPDATE responses SET used=?, hits=hits+1 WHERE key=?", (now, key)))
+        with self.lock:
+            self._remember(key, ep, row[0], row[1], row[2] + self.ttl_s)
+            self.counts["db_hits"] += 1; self.saved_ms += row[1] or 0.0
+        return row[0]
+
+    def _remember(self, key, ep, text, ms, expires):
+        self.mem[key] = (ep, text, ms or 0.0, expires); self.mem.move_to_end(key)
+        while len(self.mem) > self.mem_max: self.mem.popitem(last=False)
+
+    def put(self, key: str, model: str, text: str, ms: float):
+        ep = self.epoch(); now = time.time()
+        with self.lock:
+            self._remember(key, ep, text, ms, now + self.ttl_s)
+            self.counts["stored"] += 1; self._puts += 1
+            sweep = self._puts % 200 == 1
+        self._sql(lambda con: con.execute(
+            "INSERT OR REPLACE INTO responses(key, epoch, model, text, ms, created, used, hits) VALUES(?,?,?,?,?,?,?,0)",
+            (key, ep, model, text, ms, now, now)))
+        if sweep: self._sql(self.evict)
+
+    def evict(self, con) -> int:
+        """Drop rows past the TTL, then the least recently used beyond the row cap."""
+        with con:
+            n = con.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_s,)).rowcount
+            n += con.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC"
+                             " LIMIT -1 OFFSET ?)", (self.rows,)).rowcount
+        with self.lock: self.counts["evicted"] += n
+        return n
+
+    def purge(self) -> int:
+        with self.lock: self.mem.clear()
+        return self._sql(lambda con: con.execute("DELETE FROM responses").rowcount) or 0
+
+    def stats(self) -> dict:
+        c = self.counts; hits = c["mem_hits"] + c["db_hits"]; looked = hits + c["misses"]
+        row = self._sql(lambda con: con.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM responses").fetchone())
+        return {**c, "hit_rate": round(hits / looked, 4) if looked else None, "saved_ms": round(self.saved_ms, 1),
+                "mem": len(self.mem), "rows": row[0] if row else None, "text_bytes": row[1] if row else None,
+                "db": str(self.db), "epoch": self._epoch, "broken": self.broken}
+
+_cache = ResponseCache() if CACHE else None
+
+# ---- circuit breakers
+class Breakers:
+    def __init__(self, db=BREAKER_DB, fails=BREAKER_FAILS, open_s=BREAKER_OPEN_S, max_open_s=BREAKER_MAX_OPEN_S,
+                 probe_s=TIMEOUT_S):
+        self.db, self.fails, self.open_s, self.max_open_s, self.probe_s = Path(db), fails, open_s, max_open_s, probe_s
+        self._local = threading.local()
+        self.broken = None             # sqlite error that switched the breakers off (everything allowed)
+        self.counts = {"skipped": 0, "probes": 0, "trips": 0, "recovered": 0, "all_open": 0}
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            self.db.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.db), timeout=2.0, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL"); con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("CREATE TABLE IF NOT EXISTS breakers(model TEXT PRIMARY KEY, state TEXT DEFAULT 'closed',"
+                        " fails INTEGER DEFAULT 0, trips INTEGER DEFAULT 0, opened REAL DEFAULT 0, probe REAL DEFAULT 0,"
+                        " ok INTEGER DEFAULT 0, err INTEGER DEFAULT 0, ms REAL, last_ms REAL, last_error TEXT, updated REAL)")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def _tx(self, fn):
+        """fn(con) inside BEGIN IMMEDIATE, so read-then-write is atomic across workers."""
+        if self.broken: return None
+        try:
+            con = self._con()
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(con)
+            except BaseException:
+                con.execute("ROLLBACK"); raise
+            con.execute("COMMIT")
+            return out
+        except sqlite3.OperationalError as e:            # locked/busy: skip this once
+            _log.warning("llm breakers: %s", e)
+        except (sqlite3.Error, OSError) as e:
+            self.broken = f"{e.__class__.__name__}: {e}"[:200]
+            _log.warning("llm breakers off (%s); every model allowed", self.broken)
+        return None
+
+    def wait_s(self, trips: int) -> float:
+        return min(self.open_s * 2 ** max(trips - 1, 0), self.max_open_s)
+
+    def _row(self, model):
+        if self.broken: return None
+        try:
+            return self._con().execute("SELECT state, trips, opened, probe FROM breakers WHERE model=?", (model,)).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            _log.warning("llm breakers: %s", e)
+            return None
+
+    def allow(self, model: str) -> bool:
+        """May model be called now? Claims the half-open probe when its wait is over."""
+        row = self._row(model)                           # plain read: the common closed case takes no lock
+        if row is None or row[0] == "closed": return True
+        def claim(con):
+            row = con.execute("SELECT state, trips, opened, probe FROM breakers WHERE model=?", (model,)).fetchone()
+            if row is None or row[0] == "closed": return True
+            now = time.time()
+            if now < row[2] + self.wait_s(row[1]) or row[3] > now: return False
+            con.execute("UPDATE breakers SET state='half_open', probe=?, updated=? WHERE model=?",
+                        (now + self.probe_s, now, model))
+            return "probe"
+        now = time.time()
+        ok = self._tx(claim) if now >= row[2] + self.wait_s(row[1]) and row[3] <= now else False
+        if ok is None: return True
+        if ok == "probe":
+            self.counts["probes"] += 1; _log.info("llm breaker %s: half-open, probing", model)
+        elif not ok:
+            self.counts["skipped"] += 1
+        return bool(ok)
+
+    def success(self, model: str, ms: float):
+        def fn(con):
+            row = con.execute("SELECT state FROM breakers WHERE model=?", (model,)).fetchone()
+            con.execute("INSERT INTO breakers(model, ok, ms, last_ms, updated) VALUES(?,1,?,?,?) ON CONFLICT(model) DO UPDATE"
+                        " SET state='closed', fails=0, trips=0, probe=0, ok=ok+1, ms=COALESCE(ms*0.8+excluded.ms*0.2, excluded.ms),"
+                        " last_ms=excluded.last_ms, updated=excluded.updated", (model, ms, ms, time.time()))
+            return row is not None and row[0] != "closed"
+        if self._tx(fn):
+            self.counts["recovered"] += 1; _log.info("llm breaker %s: closed", model)
+
+    def failure(self, model: str, err: BaseException):
+        def fn(con):
+            now = time.time()
+            row = con.execute("SELECT state, fails, trips FROM breakers WHERE model=?", (model,)).fetchone()
+            state, fails, trips = row or ("closed", 0, 0)
+            trip = state == "half_open" or (state == "closed" and fails + 1 >= self.fails)
+            con.execute("INSERT INTO breakers(model, state, fails, trips, opened, probe, err, last_error, updated)"
+                        " VALUES(?,?,?,?,?,0,1,?,?) ON CONFLICT(model) DO UPDATE SET state=excluded.state, fails=excluded.fails,"
+                        " trips=excluded.trips, opened=CASE WHEN ? THEN excluded.opened ELSE opened END, probe=0, err=err+1,"
+                        " last_error=excluded.last_error, updated=excluded.updated",
+                        (model, "open" if trip else state, fails + 1, trips + 1 if trip else trips, now,
+                         f"{err.__class__.__name__}: {err}"[:200], now, trip))
+            return self.wait_s(trips + 1) if trip else None
+        wait = self._tx(fn)
+        if wait is not None:
+            self.counts["trips"] += 1
+            _log.warning("llm breaker %s: open for %.0fs after %s", model, wait, err.__class__.__name__)
+
+    def reset(self) -> int:
+        return self._tx(lambda con: con.execute("DELETE FROM breakers").rowcount) or 0
+
+    def stats(self) -> dict:
+        models = {}
+        rows = self._tx(lambda con: con.execute("SELECT model, state, fails, trips, opened, ok, err, ms, last_ms, last_error"
+                                                " FROM breakers ORDER BY model").fetchall()) or []
+        now = time.time()
+        for m, state, fails, trips, opened, ok, err, ms, last_ms, last_error in rows:
+            models[m] = {"state": state, "fails": fails, "trips": trips, "ok": ok, "err": err,
+                         "ms": round(ms, 1) if ms is not None else None,
+                         "last_ms": round(last_ms, 1) if last_ms is not None else None, "last_error": last_error,
+                         "retry_in_s": round(max(opened + self.wait_s(trips) - now, 0), 1) if state == "open" else None}
+        return {**self.counts, "fails": self.fails, "open_s": self.open_s, "max_open_s": self.max_open_s,
+                "db": str(self.db), "broken": self.broken, "models": models}
+
+_breakers = Breakers() if BREAKER else None
+
+def chain(models: list):
+    """The models of a fallback list that may be called now, in order (deduplicated,
+    lazily: a half-open probe is claimed only when the caller gets that far)."""
+    seen, n = [], 0
+    for m in models:
+        if not m or m in seen: continue
+        seen.append(m)
+        if _breakers is None or _breakers.allow(m):
+            n += 1; yield m
+    if n == 0 and seen and _breakers is not None:
+        _breakers.counts["all_open"] += 1
+        _log.warning("llm breakers: every circuit open (%s)", ", ".join(seen))
+
+_HEALTH_ERRORS = None
+
+def _health_errors() -> tuple:
+    """Exception types that say the model (not the request) is in trouble."""
+    global _HEALTH_ERRORS
+    if _HEALTH_ERRORS is None:
+        kinds = [TimeoutError, ConnectionError]
+        try:
+            import openai
+            kinds += [getattr(openai, n) for n in ("APIConnectionError", "APITimeoutError", "RateLimitError",
+                                                   "InternalServerError", "NotFoundError") if hasattr(openai, n)]
+        except Exception:
+            pass
+        try:
+            import httpx                                  # raised raw while iterating a stream
+            kinds.append(httpx.TransportError)
+        except Exception:
+            pass
+        _HEALTH_ERRORS = tuple(kinds)
+    return _HEALTH_ERRORS
+
+@contextmanager
+def _record(model: str):
+    """Feeds the breaker with the outcome of one remote call."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except (LLMBusy, LLMUnavailable, GeneratorExit):
+        raise
+    except Exception as e:
+        if _breakers and isinstance(e, _health_errors()): _breakers.failure(model, e)
+        raise
+    if _breakers: _breakers.success(model, (time.perf_counter() - t0) * 1000)
+
+# ---- sync
+_client = None          # (pid, key, OpenAI)
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(CONCURRENCY)
+_counts = {"calls": 0, "errors": 0, "busy": 0, "async_calls": 0, "embeds": 0, "streams": 0}
+_inflight = 0
+_ms = 0.0
+
+def client():
+    """The process-wide pooled OpenAI client (created on first use / after fork)."""
+    global _client
+    c = _client
+    if c is not None and c[0] == os.getpid() and c[1] == api_key(): return c[2]
+    with _lock:
+        c = _client
+        if c is None or c[0] != os.getpid() or c[1] != api_key():
+            openai, key = _openai()
+            import httpx
+            limits, timeout = _limits()
+            cli = openai.OpenAI(api_key=key, max_retries=RETRIES, timeout=timeout,
+                                http_client=httpx.Client(limits=limits, timeout=timeout))
+            _client = c = (os.getpid(), key, cli)
+        return c[2]
+
+def _text(resp) -> str:
+    return (resp.choices[0].message.content or "").strip()
+
+def _done(t0, ok):
+    global _inflight, _ms
+    with _lock:
+        _inflight -= 1; _ms += (time.perf_counter() - t0) * 1000
+        if not ok: _counts["errors"] += 1
+
+@contextmanager
+def _slot(t: float, kind: str = "calls"):
+    """One of the LLM_CONCURRENCY sync slots for the duration of a request."""
+    global _inflight
+    if not _slots.acquire(timeout=t):
+        with _lock: _counts["busy"] += 1
+        raise LLMBusy(f"no LLM slot within {t:.0f}s")
+    with _lock: _inflight += 1; _counts[kind] += 1
+    t0, ok = time.perf_counter(), False
+    try:
+        yield
+        ok = True
+    except GeneratorExit:           # a stream() whose client went away: not a failure
+        ok = True; raise
+    finally:
+        _slots.release(); _done(t0, ok)
+
+def chat(msgs: list, model: str | None = None, timeout: float | None = None, cache: bool = True, **params) -> str:
+    """Text of the first choice ('' when the model returned none); identical calls are
+    answered from the response cache unless cache=False."""
+    model = model or MODEL
+    key = cache_key(model, msgs, params) if cache and _cache else None
+    if key:
+        hit = _cache.get(key)
+        if hit is not None: return hit
+    t = timeout or TIMEOUT_S
+    cli = client()
+    t0 = time.perf_counter()
+    with _slot(t), _record(model):
+        out = _text(cli.chat.completions.create(model=model, messages=msgs, timeout=t, **params))
+    if key and out: _cache.put(key, model, out, (time.perf_counter() - t0) * 1000)
+    return out
+
+def stream(msgs: list, model: str | None = None, timeout: float | None = None, cache: bool = True, **params):
+    """chat() as a generator of text chunks; a cached response comes as one chunk, and the
+    complete text of an uncached one is cached when the stream ends."""
+    model = model or MODEL
+    key = cache_key(model, msgs, params) if cache and _cache else None
+    if key:
+        hit = _cache.get(key)
+        if hit is not None:
+            yield hit; return
+    t = timeout or TIMEOUT_S
+    cli = client()
+    t0 = time.perf_counter()
+    parts = []
+    with _slot(t, "streams"), _record(model):
+        resp = cli.chat.completions.create(model=model, messages=msgs, timeout=t, stream=True, **params)
+        try:
+            for chunk in resp:
+                d = chunk.choices[0].delta.content if chunk.choices else None
+                if d:
+                    parts.append(d); yield d
+        finally:
+            close = getattr(resp, "close", None)
+            if close: close()
+    out = "".join(parts).strip()
+    if key and out: _cache.put(key, model, out, (time.perf_counter() - t0) * 1000)
+
+def embed(texts: list, model: str | None = None, timeout: float | None = None) -> list:
+    """One embedding (list of floats) per text, in order."""
+    t = timeout or TIMEOUT_S
+    cli = client()
+    with _slot(t, "embeds"):
+        r = cli.embeddings.create(model=model or EMBED_MODEL, input=list(texts), timeout=t)
+    return [d.embedding for d in sorted(r.data, key=lambda d: d.index)]
+
+# ---- asyncio
+_aclients = weakref.WeakKeyDictionary()      # event loop -> (pid, key, AsyncOpenAI, Semaphore)
+
+def aclient():
+    """(AsyncOpenAI, semaphore) for the running event loop."""
+    loop = asyncio.get_running_loop()
+    c = _aclients.get(loop)
+    if c is None or c[0] != os.getpid() or c[1] != api_key():
+        openai, key = _openai()
+        import httpx
+        limits, timeout = _limits()
+        cli = openai.AsyncOpenAI(api_key=key, max_retries=RETRIES, timeout=timeout,
+                                 http_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+        c = _aclients[loop] = (os.getpid(), key, cli, asyncio.Semaphore(CONCURRENCY))
+    return c[2], c[3]
+
+async def achat(msgs: list, model: str | None = None, timeout: float | None = None, cache: bool = True, **params) -> str:
+    """chat() for asyncio callers; the event loop is never blocked on the HTTP call."""
+    global _inflight
+    model = model or MODEL
+    key = cache_key(model, msgs, params) if cache and _cache else None
+    if key:
+        hit = _cache.get(key)                       # local SQLite read, sub-millisecond
+        if hit is not None: return hit
+    t = timeout or TIMEOUT_S
+    cli, sem = aclient()
+    try:
+        await asyncio.wait_for(sem.acquire(), t)
+    except asyncio.TimeoutError:
+        with _lock: _counts["busy"] += 1
+        raise LLMBusy(f"no LLM slot within {t:.0f}s")
+    with _lock: _inflight += 1; _counts["async_calls"] += 1
+    t0, ok = time.perf_counter(), False
+    try:
+        with _record(model):
+            out = _text(await cli.chat.completions.create(model=model, messages=msgs, timeout=t, **params))
+        ok = True
+    finally:
+        sem.release(); _done(t0, ok)
+    if key and out: _cache.put(key, model, out, (time.perf_counter() - t0) * 1000)
+    return out
+
+def stats() -> dict:
+    n = _counts["calls"] + _counts["async_calls"] + _counts["embeds"] + _counts["streams"]
+    return {**_counts, "inflight": _inflight, "avg_ms": round(_ms / n, 1) if n else None,
+            "concurrency": CONCURRENCY, "pool": POOL, "timeout_s": TIMEOUT_S, "model": MODEL,
+            "cache": _cache.stats() if _cache else None, "breakers": _breakers.stats() if _breakers else None}
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    argv = argv if argv is not None else sys.argv[1:]
+    cmd = (argv or ["stats"])[0]
+    if cmd == "breakers":
+        print(json.dumps(_breakers.stats() if _breakers else "LLM_BREAKER is off", indent=2)); return 0
+    if cmd == "reset-breakers":
+        print(json.dumps({"reset": _breakers.reset() if _breakers else 0})); return 0
+    if _cache is None:
+        print("LLM_CACHE is off"); return 1
+    if cmd == "stats":
+        print(json.dumps(_cache.stats(), indent=2)); return 0
+    if cmd == "purge":
+        print(json.dumps({"purged": _cache.purge()})); return 0
+    print("usage: python -m app.llm [stats|purge|breakers|reset-breakers]"); return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
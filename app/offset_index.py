@@ -0,0 +1,320 @@
+# Byte-offset sidecar for data/content/content.jsonl (content.jsonl.idx), so one chunk can
+# be fetched by id, hash or (source_name, part) without reading the file from the start.
+#
+# Layout: an 80-byte header, then an open-addressing hash table of 24-byte slots
+#   header  magic, version, slots (power of two), keys, watermark (bytes of content.jsonl
+#           covered), inode and sha1 of the TAIL bytes just before the watermark
+#   slot    u64 key hash (0 = empty), u64 line offset, u32 line length (newline included)
+# Keys are 64-bit blake2b of "id\0<id>", "hash\0<hash>" and "src\0<source_name>\x1f<part>";
+# a key seen on several rows points at the last one (a re-ingested document's newest chunk).
+# Readers mmap the file and probe linearly from hash & (slots - 1): O(1), no parsing.
+#
+# content.jsonl is append-only, so update() (called by the ingest writers next to
+# fts_index.try_update) only parses lines past the watermark and writes their slots in
+# place (offset/length before the key, so a concurrent reader never sees a key without
+# its value). Past LOAD_MAX the table is rehashed at twice the size into a temp file and
+# swapped in with os.replace. A rewritten file (inode change, shrank, or the bytes under
+# the watermark differ) triggers rebuild(); verify() compares every slot with a fresh scan.
+#
+#   python -m app.offset_index [update|rebuild|verify|stats|get id|hash KEY|get src NAME PART]
+import fcntl, hashlib, json, mmap, os, struct, sys, threading, time, logging
+from pathlib import Path
+
+_log = logging.getLogger("offset_index")
+
+BASE = Path.home() / "tullman"
+CONTENT_JSONL = BASE / "data" / "content" / "content.jsonl"
+
+MAGIC = b"TLOFFIX\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQ20s")        # magic, version, pad, slots, keys, watermark, inode, tail sha1
+HEADER_SIZE = 80                              # header + padding
+SLOT = struct.Struct("<QQI4x")
+MIN_SLOTS = 1024
+LOAD_MAX = 0.6
+TAIL = 4096
+KINDS = ("id", "hash", "src")
+
+def sidecar(path: Path = CONTENT_JSONL) -> Path:
+    return path.with_name(path.name + ".idx")
+
+def key_hash(kind: str, key: str) -> int:
+    h = int.from_bytes(hashlib.blake2b(f"{kind}\0{key}".encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+    return h or 1
+
+def row_keys(r: dict) -> list[int]:
+    out = []
+    for kind in ("id", "hash"):
+        v = r.get(kind)
+        if isinstance(v, str) and v: out.append(key_hash(kind, v))
+    name, part = r.get("source_name"), r.get("part")
+    if isinstance(name, str) and isinstance(part, str):
+        out.append(key_hash("src", f"{name}\x1f{part}"))
+    return out
+
+def _tail_hash(path: Path, off: int) -> bytes:
+    if off <= 0: return b"\0" * 20
+    with path.open("rb") as f:
+        f.seek(max(0, off - TAIL))
+        return hashlib.sha1(f.read(min(off, TAIL))).digest()
+
+def _entries(path: Path, off: int):
+    """([(key hash, line offset, line length)], end offset) for the complete lines from `off`."""
+    out = []
+    with path.open("rb") as f:
+        f.seek(off)
+        for raw in f:
+            if not raw.endswith(b"\n"): break
+            at = off; off += len(raw)
+            try: r = json.loads(raw)
+            except Exception: continue
+            if isinstance(r, dict):
+                for k in row_keys(r): out.append((k, at, len(raw)))
+    return out, off
+
+# ---- table (bytearray while building, mmap when updating in place)
+def _put(buf, slots: int, k: int, off: int, length: int) -> bool:
+    """Store k -> (off, length); True if k is a new key."""
+    mask = slots - 1; i = k & mask
+    while True:
+        at = HEADER_SIZE + i * SLOT.size
+        cur = struct.unpack_from("<Q", buf, at)[0]
+        if cur == k or cur == 0:
+            struct.pack_into("<QI", buf, at + 8, off, length)
+            if cur == 0: struct.pack_into("<Q", buf, at, k)
+            return cur == 0
+        i = (i + 1) & mask
+
+def _slots_for(keys: int) -> int:
+    n = MIN_SLOTS
+    while keys > n * LOAD_MAX: n *= 2
+    return n
+
+def _live(buf, slots: int):
+    for i in range(slots):
+        k, off, length = SLOT.unpack_from(buf, HEADER_SIZE + i * SLOT.size)
+        if k: yield k, off, length
+
+def _write_table(idx: Path, entries, keys_hint: int, end: int, ino: int, tail: bytes) -> int:
+    slots = _slots_for(keys_hint)
+    buf = bytearray(HEADER_SIZE + slots * SLOT.size)
+    keys = 0
+    for k, off, length in entries:
+        keys += _put(buf, slots, k, off, length)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, slots, keys, end, ino, tail)
+    tmp = idx.with_name(idx.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(buf); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, idx)
+    return keys
+
+def _header(buf) -> dict:
+    magic, ver, _, slots, keys, end, ino, tail = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or ver != VERSION: raise ValueError("not an offset index")
+    return {"slots": slots, "keys": keys, "offset": end, "inode": ino, "tail": tail}
+
+class _Locked:
+    """Exclusive lock for writers (ingest scripts, admin row, backfill) on <idx>.lock."""
+    def __init__(self, idx: Path):
+        self.path = idx.with_name(idx.name + ".lock")
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = self.path.open("a"); fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+    def __exit__(self, *exc):
+        fcntl.flock(self.f, fcntl.LOCK_UN); self.f.close()
+
+def _report(op: str, n: int, nbytes: int, keys: int, dt: float) -> dict:
+    out = {"op": op, "entries": n, "bytes": nbytes, "keys": keys, "secs": round(dt, 3)}
+    _log.info("offset index %s", out)
+    return out
+
+def _rebuild(path: Path, idx: Path) -> dict:
+    t0 = time.perf_counter()
+    entries, end = _entries(path, 0) if path.exists() else ([], 0)
+    ino = path.stat().st_ino if path.exists() else 0
+    keys = _write_table(idx, entries, len(entries), end, ino, _tail_hash(path, end))
+    return _report("rebuild", len(entries), end, keys, time.perf_counter() - t0)
+
+def rebuild(path: Path = CONTENT_JSONL, idx: Path | None = None) -> dict:
+    """Re-index content.jsonl from scratch (temp file + os.replace)."""
+    idx = idx or sidecar(path)
+    with _Locked(idx):
+        return _rebuild(path, idx)
+
+def update(path: Path = CONTENT_JSONL, idx: Path | None = None) -> dict:
+    """Index lines appended since the watermark (rebuilds if the file was rewritten)."""
+    idx = idx or sidecar(path)
+    if not path.exists(): return _report("update", 0, 0, 0, 0.0)
+    t0 = time.perf_counter()
+    with _Locked(idx):
+        st = path.stat()
+        try:
+            with idx.open("r+b") as f, mmap.mmap(f.fileno(), 0) as mm:
+                h = _header(mm)
+                if (h["inode"] != st.st_ino or st.st_size < h["offset"]
+                        or h["tail"] != _tail_hash(path, h["offset"])):
+                    raise ValueError("content.jsonl was rewritten")
+                entries, end = _entries(path, h["offset"])
+                if (h["keys"] + len(entries)) > h["slots"] * LOAD_MAX:
+                    grow = list(_live(mm, h["slots"])) + entries
+                    mm.close()
+                    keys = _write_table(idx, grow, h["keys"] + len(entries), end, st.st_ino, _tail_hash(path, end))
+                    return _report("grow", len(entries), end - h["offset"], keys, time.perf_counter() - t0)
+                keys = h["keys"]
+                for k, off, length in entries:
+                    keys += _put(mm, h["slots"], k, off, length)
+                # header last: readers trust slots, the watermark only drives the next update
+                struct.pack_into("<QQQQ20s", mm, 16, h["slots"], keys, end, st.st_ino, _tail_hash(path, end))
+                mm.flush()
+                return _report("update", len(entries), end - h["offset"], keys, time.perf_counter() - t0)
+        except (OSError, ValueError, struct.error) as e:
+            _log.info("offset index rebuild (%s)", e)
+            return _rebuild(path, idx)
+
+def try_update(path: Path = CONTENT_JSONL, idx: Path | None = None) -> dict | None:
+    """update() for ingest hooks: a failed index write must not fail the ingest."""
+    try:
+        return update(path, idx)
+    except Exception as e:
+        _log.warning("offset index update failed: %s", e)
+        return None
+
+def verify(path: Path = CONTENT_JSONL, idx: Path | None = None) -> dict:
+    """Compare the sidecar with a fresh scan of content.jsonl (up to its watermark)."""
+    idx = idx or sidecar(path)
+    t0 = time.perf_counter()
+    if not idx.exists(): return {"ok": False, "error": "missing", "idx": str(idx)}
+    with idx.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        h = _header(mm)
+        have = {k: (off, length) for k, off, length in _live(mm, h["slots"])}
+    want = {}
+    entries, end = _entries(path, 0) if path.exists() else ([], 0)
+    for k, off, length in entries:
+        if off < h["offset"]: want[k] = (off, length)
+    st = path.stat() if path.exists() else None
+    missing = sum(1 for k in want if k not in have)
+    stale = sum(1 for k, v in want.items() if k in have and have[k] != v)
+    extra = sum(1 for k in have if k not in want)
+    out = {"ok": not (missing or stale or extra) and st is not None and st.st_ino == h["inode"],
+           "keys": len(have), "expected": len(want), "missing": missing, "stale": stale, "extra": extra,
+           "watermark": h["offset"], "unindexed_bytes": (st.st_size if st else 0) - h["offset"],
+           "inode_ok": st is not None and st.st_ino == h["inode"], "secs": round(time.perf_counter() - t0, 3)}
+    return out
+
+# ---- reader
+class OffsetIndex:
+    def __init__(self, path: Path = CONTENT_JSONL, idx: Path | None = None):
+        self.path = Path(path)
+        self.idx = idx or sidecar(self.path)
+        self._map = None               # (inode, mmap, slots)
+        self._lock = threading.Lock()
+
+    def _mm(self):
+        try:
+            ino = self.idx.stat().st_ino
+        except OSError:
+            return None
+        cur = self._map
+        if cur is not None and cur[0] == ino: return cur
+        with self._lock:
+            cur = self._map
+            if cur is not None and cur[0] == ino: return cur
+            try:
+                with self.idx.open("rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                cur = (ino, mm, _header(mm)["slots"])
+            except (OSError, ValueError):
+                return None
+            self._map = cur                 # a replaced mapping is closed by GC once unused
+            return cur
+
+    def lookup(self, kind: str, key: str) -> tuple[int, int] | None:
+        """(byte offset, length) of the line for id/hash/src key, or None."""
+        cur = self._mm()
+        if cur is None: return None
+        _, mm, slots = cur
+        k = key_hash(kind, key); mask = slots - 1; i = k & mask
+        while True:
+            cur_k, off, length = SLOT.unpack_from(mm, HEADER_SIZE + i * SLOT.size)
+            if cur_k == k: return off, length
+            if cur_k == 0: return None
+            i = (i + 1) & mask
+
+    def get(self, kind: str, key: str) -> dict | None:
+        """The row itself (one pread), checked against the key."""
+        hit = self.lookup(kind, key)
+        if hit is None: return None
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+            try: raw = os.pread(fd, hit[1], hit[0])
+            finally: os.close(fd)
+            r = json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(r, dict) or key_hash(kind, key) not in row_keys(r): return None
+        return r
+
+    def by_id(self, rid: str) -> dict | None: return self.get("id", rid)
+    def by_hash(self, h: str) -> dict | None: return self.get("hash", h)
+    def by_part(self, source_name: str, part: str) -> dict | None:
+        return self.get("src", f"{source_name}\x1f{part}")
+
+    def neighbours(self, row: dict, span: int = 1) -> list[dict]:
+        """chunk_{i-span}..chunk_{i+span} of the row's source, in order (the row included)."""
+        name, part = row.get("source_name"), row.get("part") or ""
+        if not name or not part.startswith("chunk_") or not part[6:].isdigit(): return [row]
+        i = int(part[6:])
+        out = []
+        for j in range(max(1, i - span), i + span + 1):
+            r = row if j == i else self.by_part(name, f"chunk_{j}")
+            if r is not None: out.append(r)
+        return out
+
+    def stats(self) -> dict:
+        cur = self._mm()
+        if cur is None: return {"idx": str(self.idx), "exists": False}
+        h = _header(cur[1])
+        return {"idx": str(self.idx), "exists": True, "slots": h["slots"], "keys": h["keys"],
+                "load": round(h["keys"] / h["slots"], 3), "watermark": h["offset"], "bytes": len(cur[1])}
+
+class Seen:
+    """Hash set for ingest dedupe: the sidecar answers for rows already in content.jsonl,
+    a local set for rows added by this run."""
+    def __init__(self, path: Path = CONTENT_JSONL):
+        self.ix = OffsetIndex(path)
+        self.local = set()
+        if try_update(path) is None and path.exists():      # no sidecar: read every hash as before
+            with path.open("rb") as f:
+                for raw in f:
+                    try: h = json.loads(raw).get("hash")
+                    except Exception: continue
+                    if h: self.local.add(h)
+    def __contains__(self, h) -> bool:
+        return h in self.local or self.ix.lookup("hash", h) is not None
+    def add(self, h) -> None:
+        self.local.add(h)
+
+_READERS: dict = {}
+
+def get(path: Path = CONTENT_JSONL) -> OffsetIndex:
+    ix = _READERS.get(str(path))
+    if ix is None: ix = _READERS[str(path)] = OffsetIndex(path)
+    return ix
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    argv = argv if argv is not None else sys.argv[1:]
+    cmd = (argv or ["update"])[0]
+    if cmd == "get" and len(argv) in (3, 4) and argv[1] in KINDS:
+        r = OffsetIndex().get(argv[1], "\x1f".join(argv[2:]))
+        print(json.dumps(r, ensure_ascii=False, indent=2)); return 0 if r else 1
+    ops = {"update": update, "rebuild": rebuild, "verify": verify, "stats": lambda: OffsetIndex().stats()}
+    if cmd not in ops:
+        print("usage: python -m app.offset_index [update|rebuild|verify|stats|get id|hash KEY|get src NAME PART]"); return 2
+    out = ops[cmd]()
+    print(json.dumps(out, indent=2))
+    return 1 if cmd == "verify" and not out["ok"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from app import rule_engine
+
 # ASCII-only, no smart quotes
 ALLOW = (
     "howardtullman.com", "tullman.blogspot.com", "blogspot.com",
@@ -7,9 +9,10 @@ EXCLUDE = ("chunk", "top toady", "roberts")
 POLITICAL = ("israel","gaza","hamas","putin","trump","election","politic")
 AI_TERMS = ("ai","artificial intelligence","strategy","roadmap","plan","llm","automation","table stakes","table-stakes")
 
+rule_engine.register({"policy.political": POLITICAL})
+
 def is_political(text: str) -> bool:
-    t = (text or "").lower()
-    return any(k in t for k in POLITICAL)
+    return "policy.political" in rule_engine.match(text)
 
 def clean_title(t: str) -> str:
     import re
@@ -0,0 +1,112 @@
+# Public-safety flags for content.jsonl rows, computed once at ingest instead of per request.
+#   is_email       row text starts a line with From:/To:/Cc:/Bcc:/Subject:/Date:
+#   bad_term_hit   source_name or text contains a BAD_TERMS phrase (Ken/email/ceremony material)
+#   good_hint_hit  source_name or text contains a GOOD_HINTS phrase (Howard's own material)
+#   public_ok      not is_email, no bad term, and a good hint
+# Rows carry the flags plus "flags_v"; bump FLAGS_VERSION whenever the term lists change
+# and rows written under an older version are recomputed on read until the backfill runs.
+# Writers append through open_append(), which holds a shared flock on <content>.lock;
+# backfill holds it exclusively for the whole copy + os.replace, so no row lands in the
+# old file (or its unlinked inode) after it was copied.
+#
+#   python -m app.public_flags backfill [content.jsonl]
+import fcntl, json, os, re, sys, time, unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+
+CONTENT_JSONL = Path.home() / "tullman" / "data" / "content" / "content.jsonl"
+FLAGS_VERSION = 1
+FLAGS = ("is_email", "bad_term_hit", "good_hint_hit", "public_ok")
+
+# Public JSON filter: exclude email/"Just Ken"/ceremony/speech content
+BAD_TERMS  = {
+  'gmail','my thoughts','kmages','ken mages','avatarbuddy','trincity','eyelevel','just ken','newsletter','on infinity',
+  'graduation','commencement','committee','illinois tech','illinois institute of technology','ceremony','speech',
+  'i want to thank','honored to','team at 1871','board','applause','faculty and staff'
+}
+GOOD_HINTS = {
+  'tullman','howard tullman','hat ',' 1871 ','kendall college','tribeca flashpoint','chicagoland entrepreneurial center',
+  'ccc information services','tunes.com','cobalt'
+}
+_EMAIL = re.compile(r'(?im)^(from|to|cc|bcc|subject|date):')
+
+def _norm(s:str)->str:
+    if not s: return ""
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if ord(ch) < 0x0300).lower()
+
+def compute(rec:dict)->dict:
+    name=_norm(rec.get("source_name")); text=_norm(rec.get("text"))
+    is_email=bool(_EMAIL.search(rec.get("text") or ""))
+    bad=any(b in name or b in text for b in BAD_TERMS)
+    good=any(g in name or g in text for g in GOOD_HINTS)
+    return {"is_email": is_email, "bad_term_hit": bad, "good_hint_hit": good,
+            "public_ok": not is_email and not bad and good, "flags_v": FLAGS_VERSION}
+
+def annotate(rec:dict)->dict:
+    """Add/refresh the flag fields in place; returns the row."""
+    if rec.get("flags_v") != FLAGS_VERSION:
+        rec.update(compute(rec))
+    return rec
+
+def public_ok(rec:dict)->bool:
+    return bool(annotate(rec)["public_ok"])
+
+@contextmanager
+def _flock(path:Path, mode:int):
+    lk=path.with_name(path.name+".lock")
+    lk.parent.mkdir(parents=True, exist_ok=True)
+    with lk.open("a") as f:
+        if mode==fcntl.LOCK_EX:
+            try: fcntl.flock(f, mode|fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"[backfill] waiting for writers on {lk}", file=sys.stderr, flush=True)
+                fcntl.flock(f, mode)
+        else:
+            fcntl.flock(f, mode)
+        try: yield
+        finally: fcntl.flock(f, fcntl.LOCK_UN)
+
+@contextmanager
+def open_append(path:Path):
+    """path opened for appending under the shared writer lock (opened after the lock, so
+    a backfill that just swapped the file is written to, not its old inode)."""
+    path=Path(path)
+    with _flock(path, fcntl.LOCK_SH), path.open("a", encoding="utf-8") as f:
+        yield f
+
+def backfill(path:Path=CONTENT_JSONL)->dict:
+    """Rewrite content.jsonl with current flags (tmp + os.replace) while holding the
+    writer lock exclusively; ingest runs wait (or are waited for)."""
+    t0=time.perf_counter(); tmp=path.with_suffix(".jsonl.flags.tmp")
+    n=changed=bad=0
+    with _flock(path, fcntl.LOCK_EX):
+        with path.open("rb") as src, tmp.open("w", encoding="utf-8") as out:
+            for raw in src:
+                if not raw.endswith(b"\n"):                # partial last line: kept as is
+                    out.write(raw.decode("utf-8","ignore")); break
+                try: rec=json.loads(raw)
+                except Exception:
+                    out.write(raw.decode("utf-8","ignore")); bad+=1; continue
+                if not isinstance(rec, dict):
+                    out.write(raw.decode("utf-8","ignore")); bad+=1; continue
+                before=rec.get("flags_v")
+                annotate(rec); n+=1; changed+=before!=FLAGS_VERSION
+                out.write(json.dumps(rec, ensure_ascii=False)+"\n")
+        os.replace(tmp, path)
+    dt=time.perf_counter()-t0
+    return {"rows": n, "updated": changed, "unparsed": bad, "secs": round(dt,2), "rows_per_s": round(n/dt) if dt else n}
+
+def main(argv=None):
+    argv=argv if argv is not None else sys.argv[1:]
+    if not argv or argv[0]!="backfill":
+        print("usage: python -m app.public_flags backfill [content.jsonl]"); return 2
+    path=Path(argv[1]) if len(argv)>1 else CONTENT_JSONL
+    print(json.dumps(backfill(path)))
+    from app import fts_index, offset_index
+    print(json.dumps(fts_index.try_update(path)))   # file was rewritten -> full FTS rebuild
+    print(json.dumps(offset_index.try_update(path)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
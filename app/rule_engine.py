@@ -0,0 +1,185 @@
+# Compiled prompt rules: the rabbi block, identity/topic/lifespan overrides, intent routes,
+# reflective topics and the political check all register here, and one call returns every
+# rule id that matches a prompt.
+#   keyword rules  ("any" of these substrings) -> one trie-shaped regex inside a lookahead,
+#                  so a single finditer reports the longest keyword starting at each
+#                  offset; every keyword that is a prefix of it matched there too and is
+#                  credited by a table built at compile time
+#   regex rules    -> the literal every match must contain (read from the parsed pattern)
+#                  joins the same keyword pass as a prefilter; only rules whose literal
+#                  turned up, or that have none, run their own compiled regex
+# The prompt is lowercased once and results are memoized per engine, so the several
+# consumers asking about the same prompt share one scan.
+#
+# Modules own their tables and call register(); rules.json (RULES_JSON) can override or
+# add rules under "engine" and is re-read when it changes:
+#   "engine": {"block.rabbi": "regex", "intent.bio": ["who is", "bio"], "intent.kendall": null}
+# This file is loaded by path from backend/app.py, so it only uses the stdlib.
+import json, os, re, threading, time
+from functools import lru_cache
+from pathlib import Path
+try:
+    from re import _parser as _sre
+except ImportError:                     # Python < 3.11
+    import sre_parse as _sre
+
+RULES_JSON = Path(os.getenv("RULES_JSON", "/var/www/tullman/assets/rules.json"))
+CHECK_S = float(os.getenv("RULES_CHECK_S", "2"))     # how often rules.json is stat()ed
+CACHE_SIZE = 2048
+
+_registry = {}          # rule id -> ("re", pattern) | ("any", (keywords, ...)), registration order
+_reg_gen = 0
+_lock = threading.Lock()
+
+def _spec(v):
+    if isinstance(v, re.Pattern): return ("re", v.pattern)
+    if isinstance(v, str): return ("re", v)
+    return ("any", tuple(str(k) for k in v))
+
+def register(rules: dict) -> None:
+    """Add/replace rules: {id: regex string | compiled regex | iterable of keywords}."""
+    global _reg_gen
+    with _lock:
+        for rid, v in rules.items():
+            _registry[rid] = _spec(v)
+        _reg_gen += 1
+
+def _required(items):
+    """Literals of which at least one occurs in any match of the parsed (sub)pattern, or None."""
+    best, run = None, ""
+    def pick(cand):
+        nonlocal best
+        if cand and (best is None or min(map(len, cand)) > min(map(len, best))): best = cand
+    for op, av in list(items) + [(None, None)]:
+        op = str(op)
+        if op == "LITERAL" and av < 128:
+            run += chr(av).lower(); continue
+        if run: pick({run}); run = ""
+        if op == "SUBPATTERN":
+            pick(_required(av[-1]))
+        elif op == "BRANCH":
+            alts = [_required(b) for b in av[1]]
+            if all(alts): pick(set().union(*alts))
+        elif op in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") and av[0] >= 1:
+            pick(_required(av[2]))
+    return best if best and min(map(len, best)) >= 2 else None
+
+def _trie_rx(words):
+    root = {}
+    for w in words:
+        d = root
+        for ch in w: d = d.setdefault(ch, {})
+        d[""] = {}
+    def gen(d):
+        alts = [re.escape(ch) + gen(sub) for ch, sub in sorted(d.items()) if ch]
+        if not alts: return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in d else body
+    return re.compile(f"(?=({gen(root)}))")
+
+class RuleEngine:
+    def __init__(self, rules: dict):
+        self.ids = list(rules)
+        self.order = {rid: i for i, rid in enumerate(self.ids)}
+        # regexes: compile each once; its required literal becomes a prefilter keyword
+        self.regex, self.always, self.errors = {}, [], {}
+        kw = {}
+        for rid, (kind, v) in rules.items():
+            if kind == "any":
+                for k in v:
+                    if k: kw.setdefault(k.lower(), set()).add(rid)
+                continue
+            try:
+                self.regex[rid] = re.compile(v, re.I)
+                lits = _required(_sre.parse(v, re.I))
+            except re.error as e:
+                self.errors[rid] = str(e); continue
+            if lits is None: self.always.append(rid)
+            for k in lits or ():
+                kw.setdefault(k, set()).add(("re", rid))
+        # keywords -> ids, with prefix closure
+        self.kw_ids = {}
+        for k in kw:
+            got = set()
+            for n in range(1, len(k) + 1):
+                got.update(kw.get(k[:n], ()))
+            self.kw_ids[k] = frozenset(got)
+        self.kw_rx = _trie_rx(kw) if kw else None
+        self._match = lru_cache(maxsize=CACHE_SIZE)(self._scan)
+
+    def _scan(self, t: str) -> frozenset:
+        hit = set()
+        if self.kw_rx is not None:
+            kw_ids = self.kw_ids
+            for m in self.kw_rx.finditer(t):
+                hit |= kw_ids[m.group(1)]
+        cand = [r for r in hit if type(r) is tuple]
+        if cand or self.always:
+            hit.difference_update(cand)
+            regex = self.regex
+            for rid in self.always + [r for _, r in cand]:
+                if regex[rid].search(t): hit.add(rid)
+        return frozenset(hit)
+
+    def match(self, text: str) -> frozenset:
+        """Every rule id matching the text (case-insensitive)."""
+        return self._match((text or "").lower())
+
+    def ordered(self, text: str, prefix: str = "") -> list:
+        """Matching ids under `prefix`, in registration order."""
+        hit = self.match(text)
+        return sorted((r for r in hit if r.startswith(prefix)), key=self.order.get)
+
+    def stats(self) -> dict:
+        c = self._match.cache_info()
+        return {"rules": len(self.ids), "keywords": len(self.kw_ids), "regex": len(self.regex),
+                "unfiltered": len(self.always), "errors": self.errors, "cache_hits": c.hits, "cache_misses": c.misses}
+
+# ---- current engine (registry + rules.json overrides), recompiled on change
+def _sig(p: Path):
+    try:
+        st = p.stat()
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+def _overrides() -> dict:
+    try:
+        data = json.loads(RULES_JSON.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    eng = data.get("engine") if isinstance(data, dict) else None
+    return eng if isinstance(eng, dict) else {}
+
+_state = None           # (registry gen, rules.json sig, engine)
+_checked = 0.0
+_generation = 0
+
+def engine() -> RuleEngine:
+    global _state, _checked, _generation
+    st, now = _state, time.monotonic()
+    if st is not None and st[0] == _reg_gen and now - _checked < CHECK_S:
+        return st[2]
+    sig = _sig(RULES_JSON)
+    _checked = now
+    if st is not None and st[0] == _reg_gen and st[1] == sig:
+        return st[2]
+    with _lock:
+        rules = dict(_registry)
+        gen = _reg_gen
+    for rid, v in _overrides().items():
+        if v is None: rules.pop(rid, None)
+        elif isinstance(v, (str, list)): rules[rid] = _spec(v)
+    eng = RuleEngine(rules)
+    _state = (gen, sig, eng)
+    _generation += 1
+    return eng
+
+def match(text: str) -> frozenset:
+    return engine().match(text)
+
+def ordered(text: str, prefix: str = "") -> list:
+    return engine().ordered(text, prefix)
+
+def stats() -> dict:
+    return {**engine().stats(), "generation": _generation, "rules_json": str(RULES_JSON)}
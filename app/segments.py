@@ -0,0 +1,381 @@
+# Immutable corpus segments shared by all workers. Rather than each gunicorn/uvicorn worker
+# parsing content.jsonl into its own rows + BM25 postings, one process writes them once into a
+# segment file and every worker mmaps it read-only, so the pages live once in the page cache
+# however many workers there are.
+#
+#   segments/corpus-<limit>-<gen>.seg   MAGIC, u64 header length, JSON header (row count,
+#                                       source size/mtime/inode, block layout, interned
+#                                       string tables), then 8-byte aligned blocks:
+#                                       the corpus_store.CorpusStore columns (blocks()) and
+#                                       the BM25 postings: sorted terms (UTF-8 + offsets),
+#                                       per-term start into flat doc ids / tfs, doc lengths
+#   segments/corpus-<limit>.current     name of the live generation; replaced atomically
+#                                       (tmp + os.replace), so a worker sees old or new
+#
+# Workers re-read the pointer at most every SEGMENT_CHECK_S seconds and map a new generation
+# when it flips; the old mapping stays valid until its last row view is gone (an unlinked
+# file keeps its pages). Generations beyond the last KEEP are deleted. If no segment can be
+# written (read-only or missing data dir), the corpus is loaded in-process as before.
+#
+# Tail following: a segment records the byte offset it covers plus the inode and a hash of
+# the TAIL bytes before it. On the same check, when content.jsonl's size/mtime moved, the
+# worker reads only the complete lines past that offset (admin index-text, ingest, blog
+# ingester), appends them to a small in-process tail (corpus_store.Chain) and to every BM25
+# index of the generation, up to the corpus limit. An inode change, a shorter file or
+# different bytes under the offset (truncation, rotation, backfill rewrite) start a
+# background rebuild (one worker builds under a flock, the rest map its result) while the
+# mapped generation keeps serving; only a worker with nothing mapped reloads in-process
+# synchronously. Once the tail holds
+# SEGMENT_COMPACT_ROWS rows a background rebuild folds it into a new shared generation.
+#
+#   python -m app.segments [build [LIMIT]|stats]
+import fcntl, hashlib, json, logging, mmap, os, struct, sys, threading, time
+from array import array
+from pathlib import Path
+from app import bm25, corpus_store
+
+_log = logging.getLogger("segments")
+
+CONTENT_JSONL = Path.home() / "tullman" / "data" / "content" / "content.jsonl"
+CHECK_S = float(os.getenv("SEGMENT_CHECK_S", "5"))
+COMPACT_ROWS = int(os.getenv("SEGMENT_COMPACT_ROWS", "2000"))
+TAIL = 4096
+KEEP = 2
+MAGIC = b"TLSEG001"
+_PRE = struct.Struct("<8sQ")
+
+def seg_dir(path: Path) -> Path:
+    return Path(os.getenv("SEGMENTS_DIR") or path.parent / "segments")
+
+def _stem(limit) -> str:
+    return f"corpus-{limit or 'all'}"
+
+def _src_sig(path: Path):
+    try:
+        st = path.stat(); return [st.st_size, st.st_mtime_ns, st.st_ino]
+    except OSError:
+        return None
+
+def _tail_hash(path: Path, off: int) -> str:
+    if off <= 0: return ""
+    with path.open("rb") as f:
+        f.seek(max(0, off - TAIL))
+        return hashlib.sha1(f.read(min(off, TAIL))).hexdigest()
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+# ---- postings over a mapped segment (what BM25Index.post.get() needs)
+class _Postings:
+    __slots__ = ("terms", "off", "at", "ids", "tfs")
+
+    def __init__(self, terms, off, at, ids, tfs):
+        self.terms, self.off, self.at, self.ids, self.tfs = terms, off, at, ids, tfs
+
+    def __len__(self):
+        return len(self.at) - 1
+
+    def get(self, term, default=None):
+        key = term.encode("utf-8"); off = self.off
+        lo, hi = 0, len(self)
+        while lo < hi:                                   # terms are sorted as UTF-8 bytes
+            mid = (lo + hi) // 2
+            cur = bytes(self.terms[off[mid]:off[mid + 1]])
+            if cur < key: lo = mid + 1
+            elif cur > key: hi = mid
+            else:
+                a, b = self.at[mid], self.at[mid + 1]
+                return self.ids[a:b], self.tfs[a:b]
+        return default
+
+def _postings_blocks(ix: bm25.BM25Index) -> dict:
+    tb, toff, at, ids, tfs = bytearray(), array("I", [0]), array("I", [0]), array("I"), array("H")
+    for t in sorted(ix.post, key=lambda t: t.encode("utf-8")):
+        tb += t.encode("utf-8"); toff.append(len(tb))
+        d, f = ix.post[t]; ids.extend(d); tfs.extend(f); at.append(len(ids))
+    return {"bm25.terms": ("B", bytes(tb)), "bm25.term_off": ("I", toff), "bm25.post_at": ("I", at),
+            "bm25.ids": ("I", ids), "bm25.tfs": ("H", tfs), "bm25.dl": ("I", ix.dl)}
+
+# ---- one generation
+class Segment:
+    """A mapped segment (or, as a fallback, an in-process corpus) plus the rows appended
+    since, with its BM25 indexes."""
+
+    def __init__(self, base, post=None, dl=None, total_len=0, meta=None, file=None, off=0, ino=0, tail=""):
+        self.store = corpus_store.Chain(base)
+        self.meta, self.file = meta or {}, file
+        self.off, self.ino, self.tail = off, ino, tail      # source bytes covered so far
+        self._post, self._dl, self._total_len = post, dl, total_len
+        self._ix = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, file: Path) -> "Segment":
+        with file.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, hlen = _PRE.unpack_from(mm, 0)
+        if magic != MAGIC: raise ValueError(f"{file}: not a corpus segment")
+        meta = json.loads(mm[_PRE.size:_PRE.size + hlen])
+        base, mv = _align(_PRE.size + hlen), memoryview(mm)
+        blocks = {name: mv[base + at:base + at + nb].cast(tc) for name, (at, nb, tc) in meta["blocks"].items()}
+        store = corpus_store.CorpusStore.mapped(meta["rows"], blocks, meta["tables"])
+        post = _Postings(blocks["bm25.terms"], blocks["bm25.term_off"], blocks["bm25.post_at"],
+                         blocks["bm25.ids"], blocks["bm25.tfs"])
+        return cls(store, post, blocks["bm25.dl"], meta["total_len"], meta, file,
+                   meta["end"], (meta["sig"] or [0, 0, 0])[2], meta["tail"])
+
+    @classmethod
+    def local(cls, path: Path, limit) -> "Segment":
+        """In-process fallback (no shared file)."""
+        st = corpus_store.load(path, limit)
+        try: ino = path.stat().st_ino
+        except OSError: ino = 0
+        return cls(st, off=st.end, ino=ino, tail=_tail_hash(path, st.end) if st.end else "")
+
+    def bm25(self, prior=None) -> bm25.BM25Index:
+        """BM25 index over this generation; postings are shared, priors are per worker."""
+        ix = self._ix.get(prior)
+        if ix is None:
+            with self._lock:
+                ix = self._ix.get(prior)
+                if ix is None:
+                    rows = self.store
+                    if self._post is None: ix = bm25.BM25Index(rows, prior=prior)
+                    else:
+                        ix = bm25.BM25Index.mapped(rows, self._post, self._dl, self._total_len, prior=prior)
+                        if rows.tail.n: ix.add(list(rows.tail))
+                    self._ix[prior] = ix
+        return ix
+
+    def follow(self, recs: list) -> None:
+        """Append rows read past self.off to the tail and to every index."""
+        with self._lock:
+            views = self.store.extend(recs)
+            for ix in self._ix.values(): ix.add(views)
+
+    @property
+    def gen(self):
+        return self.meta.get("gen")
+
+def _read_meta(file: Path) -> dict | None:
+    try:
+        with file.open("rb") as f:
+            magic, hlen = _PRE.unpack(f.read(_PRE.size))
+            return json.loads(f.read(hlen)) if magic == MAGIC else None
+    except (OSError, ValueError, struct.error):
+        return None
+
+def _pointer(d: Path, limit) -> Path:
+    return d / f"{_stem(limit)}.current"
+
+def _live_file(d: Path, limit) -> Path | None:
+    try:
+        return d / _pointer(d, limit).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+# ---- writer
+class _Locked:
+    def __init__(self, p: Path):
+        self.p = p
+    def __enter__(self):
+        self.f = self.p.open("a"); fcntl.flock(self.f, fcntl.LOCK_EX); return self
+    def __exit__(self, *exc):
+        fcntl.flock(self.f, fcntl.LOCK_UN); self.f.close()
+
+def build(path: Path = CONTENT_JSONL, limit: int | None = None, force: bool = False) -> dict:
+    """Write a new generation for (path, limit) and flip the pointer to it. Without
+    `force`, a live generation that already matches content.jsonl is kept."""
+    d = seg_dir(path); d.mkdir(parents=True, exist_ok=True)
+    with _Locked(d / f"{_stem(limit)}.lock"):
+        sig = _src_sig(path)
+        live = _live_file(d, limit)
+        meta = _read_meta(live) if live else None
+        if not force and meta and meta.get("sig") == sig:
+            return {"op": "fresh", "file": str(live), "rows": meta["rows"]}
+        t0 = time.perf_counter()
+        store = corpus_store.load(path, limit)
+        ix = bm25.BM25Index(store)
+        blocks, tables = store.blocks()
+        blocks.update(_postings_blocks(ix))
+        layout, at = {}, 0
+        for name, (tc, buf) in blocks.items():
+            nb = memoryview(buf).nbytes
+            layout[name] = [at, nb, tc]; at = _align(at + nb)
+        gen = time.time_ns()
+        head = json.dumps({"rows": store.n, "limit": limit, "source": str(path), "sig": sig, "gen": gen,
+                           "end": store.end, "tail": _tail_hash(path, store.end) if store.end else "",
+                           "total_len": ix.total_len, "blocks": layout, "tables": tables},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"{_stem(limit)}-{gen}.seg"
+        tmp = d / (name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(_PRE.pack(MAGIC, len(head)) + head)
+            f.write(b"\0" * (_align(_PRE.size + len(head)) - _PRE.size - len(head)))
+            for _, (tc, buf) in blocks.items():
+                mv = memoryview(buf).cast("B")
+                f.write(mv); f.write(b"\0" * (_align(len(mv)) - len(mv)))
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, d / name)
+        ptr = _pointer(d, limit); ptmp = ptr.with_name(ptr.name + ".tmp")
+        ptmp.write_text(name, encoding="utf-8"); os.replace(ptmp, ptr)
+        _gc(d, limit)
+        out = {"op": "build", "file": str(d / name), "rows": store.n, "terms": len(ix.post),
+               "bytes": (d / name).stat().st_size, "secs": round(time.perf_counter() - t0, 3)}
+        _log.info("segment %s", out)
+        return out
+
+def _gc(d: Path, limit) -> None:
+    gens = sorted(d.glob(f"{_stem(limit)}-*.seg"), key=lambda p: p.stat().st_mtime_ns)
+    for p in gens[:-KEEP]:
+        try: p.unlink()
+        except OSError: pass
+
+# ---- per-worker view of the live generation
+class _Live:
+    def __init__(self, path: Path, limit):
+        self.path, self.limit = path, limit
+        self.seg = None
+        self.sig = None                # content.jsonl (size, mtime, inode) last followed
+        self.checked = 0.0
+        self.building = False
+        self.generation = 0            # bumps on every new mapping or appended batch
+        self.reloads = 0               # full reloads after truncation/rotation
+        self.appended = 0              # rows tail-read into this worker
+        self.lock = threading.Lock()
+
+    def current(self) -> Segment:
+        now = time.monotonic()
+        if self.seg is not None and now - self.checked < CHECK_S: return self.seg
+        with self.lock:
+            if self.seg is not None and now - self.checked < CHECK_S: return self.seg
+            self.checked = now
+            try:
+                self._refresh()
+            except (OSError, ValueError) as e:
+                if self.seg is None:
+                    _log.warning("segments unavailable (%s); loading %s in-process", e, self.path)
+                    self._use(Segment.local(self.path, self.limit))
+                elif self.seg.file is not None:             # keep serving what we have
+                    _log.warning("segment refresh failed: %s", e)
+                if self.seg.file is None:                   # in-process corpus follows the file itself
+                    try: self._follow()
+                    except OSError as e: _log.warning("corpus follow failed: %s", e)
+            return self.seg
+
+    def _use(self, seg: Segment):
+        self.seg, self.sig = seg, None
+        self.generation += 1
+        _log.info("corpus %s generation %d: %s (%d rows)", _stem(self.limit), self.generation,
+                  seg.file.name if seg.file else "in-process", len(seg.store))
+
+    def _refresh(self):
+        d = seg_dir(self.path)
+        live = _live_file(d, self.limit)
+        if live is None or not live.exists():
+            if not self.path.exists():
+                if self.seg is None: self._use(Segment.local(self.path, self.limit))
+                return
+            build(self.path, self.limit)                  # first worker builds, others wait
+            live = _live_file(d, self.limit)
+        if self.seg is None or self.seg.file != live:
+            self._use(Segment.open(live))
+        self._follow()
+
+    def _follow(self):
+        seg = self.seg
+        try:
+            st = self.path.stat()
+        except OSError:
+            return
+        sig = (st.st_size, st.st_mtime_ns, st.st_ino)
+        if sig == self.sig: return
+        if st.st_ino != seg.ino or st.st_size < seg.off or _tail_hash(self.path, seg.off) != seg.tail:
+            if seg.file is None:                          # nothing mapped: reload in-process now
+                _log.info("%s was rewritten; full reload", self.path)
+                self.reloads += 1
+                self._use(Segment.local(self.path, self.limit))
+            elif not self.building:                       # keep serving the mapped generation
+                _log.info("%s was rewritten; rebuilding in the background", self.path)
+                self.reloads += 1; self.building = True
+                threading.Thread(target=self._rebuild, name="segment-build", daemon=True).start()
+            return
+        room = max(0, self.limit - len(seg.store)) if self.limit else None
+        recs, end = [], seg.off
+        for rec, end in corpus_store.records(self.path, seg.off, room):
+            if rec is not None: recs.append(rec)
+        if recs:
+            seg.follow(recs)
+            self.generation += 1; self.appended += len(recs)
+            _log.info("corpus %s generation %d: +%d rows", _stem(self.limit), self.generation, len(recs))
+        if end != seg.off:
+            seg.off, seg.tail = end, _tail_hash(self.path, end)
+        self.sig = sig
+        if seg.file is not None and seg.store.tail.n >= COMPACT_ROWS and not self.building:
+            self.building = True
+            threading.Thread(target=self._rebuild, name="segment-build", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            build(self.path, self.limit)
+        except Exception as e:
+            _log.warning("segment rebuild failed: %s", e)
+        finally:
+            self.building = False
+            self.checked = 0.0                            # map the new generation on next use
+
+    def stats(self) -> dict:
+        seg = self.seg
+        out = {"generation": self.generation, "reloads": self.reloads, "appended": self.appended,
+               "building": self.building}
+        if seg is not None:
+            out.update(segment=seg.file.name if seg.file else None, segment_gen=seg.gen, offset=seg.off,
+                       **seg.store.stats())
+        return out
+
+_LIVE: dict = {}
+_LLOCK = threading.Lock()
+
+def current(path: Path = CONTENT_JSONL, limit: int | None = None) -> Segment:
+    key = (str(path), limit)
+    lv = _LIVE.get(key)
+    if lv is None:
+        with _LLOCK:
+            lv = _LIVE.get(key)
+            if lv is None: lv = _LIVE[key] = _Live(Path(path), limit)
+    return lv.current()
+
+def corpus(path: Path = CONTENT_JSONL, limit: int | None = None) -> corpus_store.Chain:
+    """Rows of the live generation plus rows appended since (dict-style views)."""
+    return current(path, limit).store
+
+def index(path: Path = CONTENT_JSONL, limit: int | None = None, prior=None) -> bm25.BM25Index:
+    """BM25 over the live generation (appended rows included); a new object once a new
+    generation is mapped."""
+    return current(path, limit).bm25(prior)
+
+def stats(path: Path = CONTENT_JSONL) -> dict:
+    d = seg_dir(path)
+    out = {"dir": str(d), "segments": {}}
+    for ptr in sorted(d.glob("corpus-*.current")):
+        live = d / ptr.read_text(encoding="utf-8").strip()
+        meta = _read_meta(live) or {}
+        out["segments"][ptr.name[:-len(".current")]] = {
+            "file": live.name, "rows": meta.get("rows"), "bytes": live.stat().st_size if live.exists() else None,
+            "fresh": meta.get("sig") == _src_sig(path), "gen": meta.get("gen")}
+    out["live"] = {_stem(k[1]): lv.stats() for k, lv in _LIVE.items() if k[0] == str(path)}
+    return out
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    argv = argv if argv is not None else sys.argv[1:]
+    cmd = (argv or ["stats"])[0]
+    if cmd == "build":
+        limit = int(argv[1]) if len(argv) > 1 and argv[1] != "all" else None
+        print(json.dumps(build(CONTENT_JSONL, limit, force=True), indent=2)); return 0
+    if cmd == "stats":
+        print(json.dumps(stats(), indent=2)); return 0
+    print("usage: python -m app.segments [build [LIMIT|all]|stats]"); return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# Semantic answer cache for public /chat: a prompt whose embedding is within
+# SEMCACHE_MIN_COS (cosine) of a prompt already answered gets that answer back instead of
+# a 2-10 s GPT round trip ("why do I need an AI strategy" / "do I really need AI strategy?").
+#   embeddings  SEMCACHE_EMBED=minilm (sentence-transformers all-MiniLM-L6-v2, the model
+#               semantic_golden uses; local) | openai (LLM_EMBED_MODEL through app/llm.py) |
+#               auto (minilm when installed, else openai when a key is set). Vectors are
+#               L2-normalized, so inner product = cosine. Rows remember their embedder and
+#               only rows of the current one are searched
+#   index       flat inner product over a float32 matrix: exact, and well under a
+#               millisecond at SEMCACHE_MAX_ROWS entries, so no ANN structure is needed
+#   store       SQLite WAL table (SEMCACHE_DB) shared by all workers; each worker appends
+#               its answers and pulls the rows other workers added at most every
+#               SEMCACHE_SYNC_S seconds
+#   ttl         per entry (expires column, SEMCACHE_TTL_S unless the caller passes one);
+#               expired rows are skipped and swept, the oldest go past SEMCACHE_MAX_ROWS
+#   scope       only turns without prior context are looked up or stored: an answer that
+#               depends on the conversation would be wrong for anyone else
+# purge() (POST /admin/semantic-cache/purge) empties the table and bumps a generation in
+# meta; every worker drops its matrix on its next sync. Without numpy or an embedder
+# the cache is off and lookups miss.
+import json, os, sqlite3, threading, time, logging
+from pathlib import Path
+from app import llm
+
+_log = logging.getLogger("semantic_cache")
+
+DB        = Path(os.getenv("SEMCACHE_DB", str(Path.home() / "tullman" / "data" / "semantic_cache.db")))
+EMBED     = os.getenv("SEMCACHE_EMBED", "auto")
+MIN_COS   = float(os.getenv("SEMCACHE_MIN_COS", "0.92"))
+TTL_S     = float(os.getenv("SEMCACHE_TTL_S", "86400"))
+MAX_ROWS  = int(os.getenv("SEMCACHE_MAX_ROWS", "20000"))
+SYNC_S    = float(os.getenv("SEMCACHE_SYNC_S", "5"))
+MINILM    = "sentence-transformers/all-MiniLM-L6-v2"
+
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+def _minilm_installed():
+    try:
+        import sentence_transformers  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+class SemanticCache:
+    def __init__(self, db=DB, embed=EMBED, min_cos=MIN_COS, ttl_s=TTL_S, max_rows=MAX_ROWS):
+        self.db, self.min_cos, self.ttl_s, self.max_rows = Path(db), min_cos, ttl_s, max_rows
+        self.kind = embed if embed != "auto" else ("minilm" if _minilm_installed() else "openai")
+        self.embedder = MINILM if self.kind == "minilm" else llm.EMBED_MODEL
+        self._model = None             # SentenceTransformer, loaded in the background
+        self._loading = False
+        self._snap = ([], None)        # ([(row id, expires)], float32 matrix) swapped as one
+        self._last_id, self._gen, self._synced = 0, None, 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counts = {"lookups": 0, "hits": 0, "misses": 0, "skipped_prior": 0, "stored": 0,
+                       "not_ready": 0, "errors": 0, "purges": 0}
+        self.last_score = None
+
+    @property
+    def enabled(self):
+        if _np is None: return False
+        return self.kind == "minilm" or (self.kind == "openai" and llm.available())
+
+    # ---- embeddings
+    def _load_model(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(MINILM)
+            _log.info("semantic cache: %s loaded", MINILM)
+        except Exception as e:
+            self.counts["errors"] += 1; _log.warning("semantic cache: embedder failed: %s", e)
+        finally:
+            self._loading = False
+
+    def _embed(self, prompt):
+        """Unit vector for prompt, or None while the local model is still loading."""
+        last = getattr(self._local, "last", None)       # lookup() then store() of one turn
+        if last and last[0] == prompt: return last[1]
+        if self.kind == "minilm":
+            if self._model is None:
+                with self._lock:
+                    if not self._loading:
+                        self._loading = True
+                        threading.Thread(target=self._load_model, name="semcache-embed", daemon=True).start()
+                return None
+            v = _np.asarray(self._model.encode([prompt], show_progress_bar=False, normalize_embeddings=True)[0],
+                            dtype="float32")
+        else:
+            v = _np.asarray(llm.embed([prompt])[0], dtype="float32")
+            v /= max(float(_np.linalg.norm(v)), 1e-9)
+        self._local.last = (prompt, v)
+        return v
+
+    # ---- shared table
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            self.db.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.db), timeout=2.0, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL"); con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("CREATE TABLE IF NOT EXISTS answers(id INTEGER PRIMARY KEY AUTOINCREMENT, embedder TEXT, prompt TEXT,"
+                        " answer TEXT, vec BLOB, created REAL, expires REAL, hits INTEGER DEFAULT 0)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def _sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._synced < SYNC_S: return
+        with self._lock:
+            if not force and now - self._synced < SYNC_S: return
+            self._synced = now
+            con = self._con()
+            row = con.execute("SELECT value FROM meta WHERE key='generation'").fetchone()
+            gen = row[0] if row else "0"
+            ids, mat = self._snap
+            if gen != self._gen or len(ids) > self.max_rows * 1.25:     # purged, or time to shed expired rows
+                ids, mat, self._last_id, self._gen = [], None, 0, gen
+            rows = con.execute("SELECT id, expires, vec FROM answers WHERE id > ? AND embedder = ? AND expires > ?"
+                               " ORDER BY id", (self._last_id, self.embedder, time.time())).fetchall()
+            if rows:
+                new = _np.frombuffer(b"".join(r[2] for r in rows), dtype="float32").reshape(len(rows), -1)
+                mat = new if mat is None else _np.vstack([mat, new])
+                ids = ids + [(r[0], r[1]) for r in rows]
+                self._last_id = rows[-1][0]
+            self._snap = (ids, mat)
+
+    # ---- API
+    def lookup(self, prompt: str, prior: str = ""):
+        """(answer, cosine) of the closest cached prompt above the threshold, else None."""
+        if not self.enabled or not (prompt or "").strip(): return None
+        if (prior or "").strip():
+            self.counts["skipped_prior"] += 1; return None
+        self.counts["lookups"] += 1
+        try:
+            v = self._embed(prompt)
+            if v is None:
+                self.counts["not_ready"] += 1; return None
+            self._sync()
+            ids, mat = self._snap
+            if mat is None or mat.shape[1] != v.shape[0]:
+                self.counts["misses"] += 1; return None
+            sims = mat @ v
+            now = time.time()
+            for i in _np.argsort(-sims)[:4].tolist():
+                score = float(sims[i])
+                if score < self.min_cos: break
+                rid, expires = ids[i]
+                if expires <= now: continue
+                row = self._con().execute("SELECT answer FROM answers WHERE id = ?", (rid,)).fetchone()
+                if row is None: continue                          # purged or swept meanwhile
+                self._con().execute("UPDATE answers SET hits = hits + 1 WHERE id = ?", (rid,))
+                self.counts["hits"] += 1; self.last_score = round(score, 4)
+                return json.loads(row[0]), score
+            self.counts["misses"] += 1
+            return None
+        except Exception as e:
+            self.counts["errors"] += 1; _log.warning("semantic cache lookup failed: %s", e)
+            return None
+
+    def store(self, prompt: str, answer, prior: str = "", ttl_s: float | None = None) -> bool:
+        """Remember answer (JSON-able) for prompt; turns with prior context are not stored."""
+        if not self.enabled or not (prompt or "").strip() or (prior or "").strip(): return False
+        try:
+            v = self._embed(prompt)
+            if v is None: return False
+            now = time.time()
+            con = self._con()
+            con.execute("INSERT INTO answers(embedder, prompt, answer, vec, created, expires) VALUES(?,?,?,?,?,?)",
+                        (self.embedder, prompt, json.dumps(answer, ensure_ascii=False), v.astype("float32").tobytes(),
+                         now, now + (self.ttl_s if ttl_s is None else ttl_s)))
+            self.counts["stored"] += 1; self._synced = 0.0     # index it on the next lookup
+            if self.counts["stored"] % 100 == 1: self.sweep()
+            return True
+        except Exception as e:
+            self.counts["errors"] += 1; _log.warning("semantic cache store failed: %s", e)
+            return False
+
+    def sweep(self) -> int:
+        """Drop expired rows, then the oldest beyond max_rows."""
+        con = self._con()
+        n = con.execute("DELETE FROM answers WHERE expires <= ?", (time.time(),)).rowcount
+        n += con.execute("DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                         (self.max_rows,)).rowcount
+        return n
+
+    def purge(self) -> int:
+        con = self._con()
+        n = con.execute("DELETE FROM answers").rowcount
+        con.execute("INSERT OR REPLACE INTO meta(key, value) VALUES('generation', ?)", (str(time.time_ns()),))
+        self.counts["purges"] += 1
+        self._sync(force=True)
+        return n
+
+    def stats(self) -> dict:
+        ids, mat = self._snap
+        try:
+            rows = self._con().execute("SELECT COUNT(*) FROM answers").fetchone()[0] if self.enabled else None
+        except sqlite3.Error:
+            rows = None
+        looked = self.counts["hits"] + self.counts["misses"]
+        return {"enabled": self.enabled, "embedder": self.embedder, "min_cos": self.min_cos, "ttl_s": self.ttl_s,
+                "rows": rows, "indexed": len(ids), "db": str(self.db), "last_score": self.last_score,
+                "hit_rate": round(self.counts["hits"] / looked, 4) if looked else None, **self.counts}
+
+_CACHE = None
+_CLOCK = threading.Lock()
+
+def get() -> SemanticCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CLOCK:
+            if _CACHE is None: _CACHE = SemanticCache()
+    return _CACHE
+
+def lookup(prompt, prior=""):
+    return get().lookup(prompt, prior)
+
+def store(prompt, answer, prior="", ttl_s=None):
+    return get().store(prompt, answer, prior, ttl_s)
+
+def purge():
+    return get().purge()
+
+def stats():
+    return get().stats()
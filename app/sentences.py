@@ -0,0 +1,84 @@
+# Sentence segmentation for content.jsonl rows, computed once at ingest instead of per request.
+#   sents    flat [start, end, start, end, ...] character offsets into row["text"], one pair
+#            per non-empty sentence (split after . ! ? + whitespace, ends trimmed); end is
+#            stored negated when the sentence holds whitespace other than single spaces
+#   sent_h   63-bit blake2b of each sentence with whitespace collapsed and lowercased,
+#            so snippet assembly dedupes with a set instead of re-normalizing strings
+#   sents_v  SENTS_VERSION; rows from an older version (or none) are segmented on first
+#            use and the result is kept on the row
+import hashlib, json, re
+
+SENTS_VERSION = 1
+SPLIT = re.compile(r'(?<=[.!?])\s+')
+_WS = re.compile(r"\s+")
+
+def norm(s:str)->str:
+    return _WS.sub(" ", s).strip()
+
+def shash(s:str)->int:
+    return int.from_bytes(hashlib.blake2b(norm(s).lower().encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+def segment(text:str)->tuple[list,list]:
+    offs, hs = [], []
+    at = 0
+    for m in SPLIT.finditer(text):
+        _span(text, at, m.start(), offs, hs); at = m.end()
+    _span(text, at, len(text), offs, hs)
+    return offs, hs
+
+def _span(text, a, b, offs, hs):
+    piece = text[a:b]
+    lead = len(piece) - len(piece.lstrip())
+    body = piece.strip()
+    if body:
+        end = a + lead + len(body)
+        offs += (a + lead, end if norm(body) == body else -end); hs.append(shash(body))
+
+def annotate(rec:dict)->dict:
+    """Add/refresh sents/sent_h in place; returns the row."""
+    if rec.get("sents_v") != SENTS_VERSION:
+        rec["sents"], rec["sent_h"] = segment(rec.get("text") or "")
+        rec["sents_v"] = SENTS_VERSION
+    return rec
+
+def columns(rec:dict)->tuple[str,str,int]:
+    """docs-table encoding (JSON text) of an annotated row."""
+    annotate(rec)
+    return json.dumps(rec["sents"], separators=(",", ":")), json.dumps(rec["sent_h"], separators=(",", ":")), SENTS_VERSION
+
+def _arrays(rec:dict)->tuple[list,list]:
+    o = rec.get("sents")
+    if rec.get("sents_v") == SENTS_VERSION and isinstance(o, str):   # straight from content.db
+        rec["sents"], rec["sent_h"] = json.loads(o), json.loads(rec.get("sent_h") or "[]")
+    annotate(rec)
+    return rec["sents"], rec["sent_h"]
+
+def spans(rec:dict)->list[tuple[int,int,int]]:
+    """[(start, end, hash)] per sentence of rec["text"]."""
+    o, h = _arrays(rec)
+    return [(o[2*i], abs(o[2*i+1]), h[i]) for i in range(len(h))]
+
+def merge(rows:list[dict], max_sent:int, first_ok=None)->list[str]:
+    """Up to max_sent whitespace-normalized sentences from rows in order. Duplicates are
+    dropped by hash. Once 50+ chars are merged, a sentence contained in the merged text is
+    dropped too, but that substring test only runs where it can catch something hashes
+    miss: the first and last sentence of a chunk (cut by chunk overlap) and every sentence
+    of a row that had no stored sents_v. `first_ok(s)` must hold for the opening sentence."""
+    out=[]; seen=set(); low=[]; merged_low=""; size=0
+    for r in rows:
+        txt=r.get("text") or ""
+        stored = r.get("sents_v") == SENTS_VERSION
+        o, hs = _arrays(r)
+        last=len(hs)-1
+        for i,h in enumerate(hs):
+            if h in seen: continue
+            b=o[2*i+1]
+            s=txt[o[2*i]:b] if b>=0 else norm(txt[o[2*i]:-b])
+            if not out and first_ok is not None and not first_ok(s): continue
+            key=s.lower()
+            if size>=50 and (not stored or i==0 or i==last):
+                if len(merged_low)!=size: merged_low=" ".join(low)
+                if key in merged_low: continue
+            seen.add(h); out.append(s); low.append(key); size+=len(key)+(1 if size else 0)
+            if len(out)>=max_sent: return out
+    return out
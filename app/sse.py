@@ -0,0 +1,30 @@
+# Server-Sent Events framing for the streaming answer endpoints: server.py /chat
+# (FastAPI), server_stable.py /chat (Flask) and, loaded by path, the backend /retrieve.
+#   opt-in      Accept: text/event-stream or ?stream=1; without either the endpoints
+#               answer with the same JSON body as before
+#   events      "delta" {"text": ...} per chunk of model output as it arrives, then one
+#               "done" whose data is exactly the JSON body the non-streaming request
+#               would have returned (finalized answer, filtered sources, session_id):
+#               clients render deltas as a preview and replace it with "done"
+#   proxies     HEADERS turn off nginx buffering (X-Accel-Buffering) and caching, so
+#               chunks reach the browser as they are written
+# Stdlib only: backend/ loads this file through shared.load("sse").
+import json
+
+MIMETYPE = "text/event-stream"
+HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def wants_stream(accept: str | None, stream: str | None = None) -> bool:
+    """True when the client asked for events (Accept header or a truthy ?stream=)."""
+    if (stream or "").strip().lower() in ("1", "true", "yes", "on"): return True
+    return MIMETYPE in (accept or "").lower()
+
+def event(name: str, data) -> str:
+    """One SSE frame; data is sent as a single line of JSON."""
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def delta(text: str) -> str:
+    return event("delta", {"text": text})
+
+def done(body: dict) -> str:
+    return event("done", body)
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from pathlib import Path
 from typing import List, Optional, Dict
 import json, time, uuid, os
+from app import fts_index, offset_index, public_flags, sentences
 
 router = APIRouter(prefix="/admin/tune", tags=["tune"])
 
@@ -91,7 +92,10 @@ def index_text(it: IndexText):
         "tags": ["tullman_ai", "admin"] + list(dict.fromkeys(it.tags)),
         "hash": str(uuid.uuid4()).replace("-", "")
     }
+    public_flags.annotate(row); sentences.annotate(row)
     CONTENT_JSONL.parent.mkdir(parents=True, exist_ok=True)
-    with CONTENT_JSONL.open("a", encoding="utf-8") as f:
+    with public_flags.open_append(CONTENT_JSONL) as f:   # shared lock vs. backfill
         f.write(json.dumps(row, ensure_ascii=False) + "\n")
-    return {"ok": True, "added": 1}
+    fts = fts_index.try_update(CONTENT_JSONL)   # tail-only: just the row above
+    offset_index.try_update(CONTENT_JSONL)
+    return {"ok": True, "added": 1, "fts": bool(fts)}
@@ -1,6 +1,7 @@
 from flask import request, jsonify
 import os, re, json
 from pathlib import Path
+import seed_index, shared
 
 # ---------- files ----------
 SEED       = "/home/kmages/backend/voiceprint_seed.jsonl"
@@ -33,16 +34,8 @@ def _seed_pairs():
     return out
 
 def _best_match(q):
-    tq=_tok(q)
-    if not tq: return None
-    best=None; sc=0.0
-    for pq,pa in _seed_pairs():
-        tp=_tok(pq)
-        if not tp: continue
-        jac=len(tq & tp)/max(1, len(tq|tp))
-        if "kendall" in tq and "kendall" in tp: jac += 0.25
-        if jac>sc: sc=jac; best=pa
-    return (best, sc) if sc>=0.42 else (None, sc)
+    # token sets + inverted index are kept warm in seed_index; reloads on file change
+    return seed_index.best_match(q, SEED)
 
 # ---------- identity / topic (for CONTEXT, not final) ----------
 def _ident(pl:str):
@@ -67,7 +60,7 @@ def _lifespan_stub(pl:str):
     return None
 
 # ---------- GPT helpers ----------
-_client=None
+llm = shared.load("llm")      # pooled OpenAI gateway (app/llm.py)
 def _voiceprint():
     for p in (VOICE_STG, VOICE_PROD):
         try:
@@ -80,40 +73,17 @@ def _voiceprint():
 
 def _gpt_weave(prompt:str, context:str|None):
     """Always call GPT to create the final answer; weave context if present."""
-    global _client
-    try:
-        from openai import OpenAI
-    except Exception as _e:
-            fb = "Give me one detail (timeframe, scope, or result) and I’ll answer directly."
-            try:
-                return jsonify({"answer": fb, "response": fb, "ruled": False, "service": service_tag})
-            except Exception:
-                from flask import Response
-                return Response("{\"answer\":\"%s\",\"response\":\"%s\",\"ruled\":false,\"service\":\"%s\"}" % (fb, fb, service_tag), mimetype="application/json")
+    if not llm.available():
+        return None
     try:
-        if _client is None: _client = OpenAI()
         model = os.getenv("OPENAI_MODEL","gpt-4o-mini")  # set to gpt-5 if available
-        sys = _voiceprint()
         parts=[]
         if context:
             parts.append(f"Reference to weave:\n{context}")
         parts.append(f"Prompt:\n{prompt}")
-        
-parts.append("Write in first person as Howard. Use a short, clean paragraph (3–5 sentences). Start with ‘I …’. No markdown headings.")
-        
-        
-user_msg="\n\n".join(parts)
-        r = _client.chat.completions.create(
-            model=model, temperature=0.35,
-            messages=[{"role":"system","content":sys},
-                      {"role":"user","content":user_msg}],
-        )
-        txt = (r.choices[0].message.content or "").strip()
-        
-try:
-            return txt or None
-        except Exception:
-            return txt or None
+        parts.append("Write in first person as Howard. Use a short, clean paragraph (3–5 sentences). Start with ‘I …’. No markdown headings.")
+        txt = llm.chat(llm.messages(_voiceprint(), "\n\n".join(parts)), model=model, temperature=0.35)
+        return txt or None
     except Exception:
         return None
 
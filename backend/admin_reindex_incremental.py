@@ -1,14 +1,78 @@
 # /home/kmages/backend/admin_reindex_incremental.py
-import os, argparse, pickle
+import os, argparse, pickle, fcntl, math
 from typing import List
 import faiss
-from sentence_transformers import SentenceTransformer
 
 # Keep consistent with your production embedding (384-dim)
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-def load_or_create_index(path: str, dim: int):
+# Serving index type (GOLDEN_INDEX_TYPE):
+#   flat      exact IndexFlatIP, 4*dim bytes/vector (1.5 KB at 384-d)
+#   sq8       int8 scalar quantization, dim bytes/vector, near-exact
+#   hnsw      graph over full vectors; fastest queries, most memory
+#   ivf_flat  inverted lists of full vectors; probes GOLDEN_NPROBE of nlist lists
+#   ivf_pq    inverted lists of PQ codes (GOLDEN_PQ_M bytes/vector) wrapped in IndexRefineFlat:
+#             the top GOLDEN_REFINE*k PQ hits are re-scored against full vectors the index
+#             also holds, so it is no smaller than flat; PQ distances alone gave recall@10
+#             ~0.57 on the 20k bench, refined x8 ~0.999
+# Non-flat types keep the exact vectors in index.flat.faiss next to index.faiss; that
+# sidecar is what training, retraining and the recall report (bench_golden_index.py)
+# read. Workers only load index.faiss. Until there are enough vectors to train, the
+# index stays flat, and load_or_create_index() migrates it once there are.
+INDEX_TYPE = os.getenv("GOLDEN_INDEX_TYPE", "flat")
+NLIST_MAX  = int(os.getenv("GOLDEN_NLIST", "1024"))
+NPROBE     = int(os.getenv("GOLDEN_NPROBE", "16"))
+PQ_M       = int(os.getenv("GOLDEN_PQ_M", "48"))      # 384/48 = 8 dims per sub-quantizer
+HNSW_M     = int(os.getenv("GOLDEN_HNSW_M", "32"))
+EF_SEARCH  = int(os.getenv("GOLDEN_EF_SEARCH", "64"))
+REFINE     = float(os.getenv("GOLDEN_REFINE", "8"))   # ivf_pq: PQ candidates per result re-scored exactly
+MIN_TRAIN  = {"flat": 0, "sq8": 1, "hnsw": 0, "ivf_flat": 1000, "ivf_pq": 10000}
+RETRAIN_GROWTH = 4        # retrain IVF/PQ once the index is 4x the size it was trained on
+
+def nlist_for(n: int) -> int:
+    # ~4*sqrt(n) lists, and at least 39 training points per centroid
+    return max(1, min(NLIST_MAX, int(4 * math.sqrt(n)), n // 39))
+
+def factory_spec(kind: str, dim: int, n: int) -> str:
+    if kind == "flat":     return "Flat"
+    if kind == "sq8":      return "SQ8"
+    if kind == "hnsw":     return f"HNSW{HNSW_M}"
+    if kind == "ivf_flat": return f"IVF{nlist_for(n)},Flat"
+    if kind == "ivf_pq":
+        m = PQ_M if dim % PQ_M == 0 else max(d for d in range(1, min(PQ_M, dim) + 1) if dim % d == 0)
+        return f"IVF{nlist_for(n)},PQ{m}x8,RFlat"
+    raise ValueError(f"unknown GOLDEN_INDEX_TYPE {kind!r}")
+
+def tune_search(index):
+    """Apply query-time knobs (nprobe / efSearch / refine k_factor); a no-op for flat and sq8."""
+    if isinstance(index, faiss.IndexRefine):
+        index.k_factor = REFINE
+    try:
+        faiss.extract_index_ivf(index).nprobe = NPROBE
+    except Exception:
+        pass
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = EF_SEARCH
+    return index
+
+def build_index(kind: str, flat):
+    """Train + fill a `kind` index from the exact vectors in `flat`; None if too few to train."""
+    n, dim = flat.ntotal, flat.d
+    if kind == "flat" or n < MIN_TRAIN[kind]:
+        return None
+    xb = flat.reconstruct_n(0, n) if n else None
+    index = faiss.index_factory(dim, factory_spec(kind, dim, n), faiss.METRIC_INNER_PRODUCT)
+    if kind == "ivf_pq":
+        # polysemous codes are never searched here, and training them took ~90% of the build
+        faiss.downcast_index(index.base_index).do_polysemous_training = False
+    if not index.is_trained:
+        index.train(xb)
+    if n: index.add(xb)
+    return tune_search(index)
+
+def load_or_create_index(path: str, dim: int, kind: str = INDEX_TYPE, retrain: bool = False):
     faiss_path = os.path.join(path, "index.faiss")
+    flat_path  = os.path.join(path, "index.flat.faiss")
     meta_path  = os.path.join(path, "index.pkl")
 
     if os.path.exists(faiss_path) and os.path.exists(meta_path):
@@ -18,41 +82,91 @@ def load_or_create_index(path: str, dim: int):
         # meta is expected to be a dict with "texts" list
         if "texts" not in meta:
             meta["texts"] = []
-        return index, meta
     else:
         os.makedirs(path, exist_ok=True)
         index = faiss.IndexFlatIP(dim)  # cosine via normalized vectors
         meta = {"texts": []}
-        return index, meta
+
+    # exact vectors: the index itself while flat, else the sidecar
+    cur = meta.get("index_type", "flat")
+    if cur == "flat":
+        flat = index
+    elif os.path.exists(flat_path):
+        flat = faiss.read_index(flat_path)
+    else:
+        flat = None             # quantized without a sidecar: keep serving it as-is
+
+    # migrate a flat (or differently typed) index, or retrain one that outgrew its centroids
+    stale = retrain or (kind.startswith("ivf") and cur == kind and flat is not None and
+                        flat.ntotal >= RETRAIN_GROWTH * max(1, meta.get("trained_n", 0)))
+    # ivf_pq saved before it was wrapped in IndexRefineFlat: rebuild it from the sidecar
+    stale = stale or (kind == "ivf_pq" and cur == kind and not isinstance(index, faiss.IndexRefine))
+    if flat is not None and (cur != kind or stale):
+        new = build_index(kind, flat) if kind != "flat" else flat
+        if new is not None:
+            index = new
+            meta["index_type"] = kind
+            meta["trained_n"] = flat.ntotal
+    if meta.get("index_type", "flat") != "flat" and flat is not None and flat is not index:
+        meta["_flat"] = flat    # runtime only; save_index() writes it to index.flat.faiss
+    return tune_search(index), meta
+
+def add_vectors(index, meta, emb):
+    """Append to the serving index and, for quantized types, the exact sidecar."""
+    index.add(emb)
+    flat = meta.get("_flat")
+    if flat is not None and flat is not index:
+        flat.add(emb)
 
 def save_index(index, meta, path: str):
+    # tmp + os.replace so readers never see a half-written file; the pickle goes first
+    # so a reader catching the pair mid-swap sees extra texts, never vectors without text
     faiss_path = os.path.join(path, "index.faiss")
+    flat_path  = os.path.join(path, "index.flat.faiss")
     meta_path  = os.path.join(path, "index.pkl")
-    faiss.write_index(index, faiss_path)
-    with open(meta_path, "wb") as f:
+    flat = meta.get("_flat")
+    meta = {k: v for k, v in meta.items() if k != "_flat"}
+    if flat is not None and flat is not index:
+        faiss.write_index(flat, flat_path + ".tmp")
+        os.replace(flat_path + ".tmp", flat_path)
+    with open(meta_path + ".tmp", "wb") as f:
         pickle.dump(meta, f)
+    faiss.write_index(index, faiss_path + ".tmp")
+    os.replace(meta_path + ".tmp", meta_path)
+    os.replace(faiss_path + ".tmp", faiss_path)
 
-def embed_texts(model: SentenceTransformer, texts: List[str]):
+def embed_texts(model, texts: List[str]):
     embs = model.encode(texts, show_progress_bar=False, normalize_embeddings=True)
     return embs
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--text", required=True, help="Edited response to add")
+    parser.add_argument("--text", help="Edited response to add")
     parser.add_argument("--faiss_dir", required=True)
+    parser.add_argument("--migrate", choices=sorted(MIN_TRAIN), help="convert/retrain the index to this type")
     args = parser.parse_args()
 
-    text = args.text.strip()
-    if not text:
+    text = (args.text or "").strip()
+    if not text and not args.migrate:
         return
 
-    model = SentenceTransformer(MODEL_NAME)
-    emb = embed_texts(model, [text])
+    emb = None
+    if text:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+        emb = embed_texts(model, [text]).astype("float32")
 
-    index, meta = load_or_create_index(args.faiss_dir, emb.shape[1])
-    index.add(emb.astype("float32"))
-    meta["texts"].append(text)
-    save_index(index, meta, args.faiss_dir)
+    os.makedirs(args.faiss_dir, exist_ok=True)
+    with open(os.path.join(args.faiss_dir, ".lock"), "w") as lk:
+        fcntl.flock(lk, fcntl.LOCK_EX)   # same lock as embed_worker.py
+        dim = emb.shape[1] if emb is not None else 384   # only used for a brand-new index
+        index, meta = load_or_create_index(args.faiss_dir, dim, args.migrate or INDEX_TYPE,
+                                           retrain=bool(args.migrate))
+        if emb is not None:
+            add_vectors(index, meta, emb)
+            meta["texts"].append(text)
+        save_index(index, meta, args.faiss_dir)
+        print(f"[index] type={meta.get('index_type','flat')} vectors={index.ntotal} trained_n={meta.get('trained_n',0)}")
 
 if __name__ == "__main__":
     main()
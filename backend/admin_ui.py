@@ -4,6 +4,7 @@ from __future__ import annotations
 import os, json, uuid, subprocess, datetime, shutil, pickle
 from typing import List, Dict, Any
 from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify
+import embed_worker
 
 admin_bp = Blueprint("admin", __name__, template_folder="templates")
 
@@ -72,15 +73,11 @@ def _py() -> str:
     return VENV_PYTHON if os.path.exists(VENV_PYTHON) else "python3"
 
 def kick_reindex_async(text: str) -> None:
+    # queued for the long-lived embed worker (embed_worker.py); no per-save subprocess
     try:
         if not REINDEX_ENABLED: return
         if not text or not text.strip(): return
-        if not os.path.exists(REINDEX_PY): return
-        os.makedirs(FAISS_DIR, exist_ok=True)
-        subprocess.Popen(
-            [_py(), REINDEX_PY, "--text", text.strip(), "--faiss_dir", FAISS_DIR],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
-        )
+        embed_worker.enqueue(text)
     except Exception:
         return
 
@@ -299,6 +296,12 @@ def api_index_text():
     return jsonify({"ok":True})
 
 
+@admin_bp.route("/admin/api/reindex_status")
+def api_reindex_status():
+    if not require_admin_key(): return "Unauthorized", 401
+    return jsonify({"ok": True, "enabled": REINDEX_ENABLED, **embed_worker.status()})
+
+
 @admin_bp.route("/admin/save_raw", methods=["POST"])
 def admin_save_raw():
     """Save the model's raw answer to the corpus (Approve as-is)."""
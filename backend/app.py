@@ -1,5 +1,11 @@
 from flask import Flask, request, jsonify
 import os, re, json, datetime, subprocess, pickle
+import seed_index
+import semantic_golden
+import semantic_tfidf
+import hybrid_retrieve
+import retrieval_cache
+import shared
 
 app = Flask(__name__)
 SERVICE_TAG = "tullman-backend v2.4 (hotfix+gpt+lifespan)"
@@ -21,7 +27,12 @@ def meta():
     rules=[r"\bfree[\s\-]?will\b",r"\breligion(s|al)?\b",r"\bfaith\b",r"\bgod\b|\bgods\b|\bdeity\b",
            r"\bmeaning\s+of\s+life\b",r"\bpurpose\s+of\s+life\b",r"\bafterlife\b|\bheaven\b|\bhell\b",
            r"\bdeath\b|\bdying\b|\bmortality\b",r"\bphilosoph(y|ical|er)\b"]
-    return jsonify({"service": SERVICE_TAG, "rules": rules, "ts": now()})
+    return jsonify({"service": SERVICE_TAG, "rules": rules, "ts": now(),
+                    "semantic": semantic_golden.get().stats(),
+                    "tfidf": semantic_tfidf.get().stats(),
+                    "retrieval_cache": retrieval_cache.stats(),
+                    "hybrid": hybrid_retrieve.stats(),
+                    "llm": llm.stats()})
 
 # -------- small utils for examples
 def load_pairs():
@@ -50,39 +61,50 @@ def tokens(s):
     return {t for t in _word.findall(s.lower()) if len(t)>2 and t not in STOP}
 
 def best_match_answer(q):
-    tq = tokens(q)
-    if not tq: return None
-    pairs = load_pairs()
-    best=None; best_score=0.0
-    for pq,pa in pairs:
-        tp = tokens(pq)
-        if not tp: continue
-        jac = len(tq & tp) / max(1, len(tq | tp))
-        # small boost if a rare keyword appears in both
-        if "kendall" in tq and "kendall" in tp: jac += 0.25
-        if jac > best_score:
-            best_score = jac; best = pa
-    # be stricter to avoid bad grabs
-    return best if best_score >= 0.42 else None
+    # indexed Jaccard match (see seed_index.py); >= 0.42, kendall boost
+    best, _ = seed_index.best_match(q, SEED_JSONL)
+    return best
 
 # -------- retrieve (identity → topic → examples → fallback), plus rabbi rule
-BLOCK = re.compile(r"(free\s*-?\s*will|religion(s|al)?|faith|\bgod(s)?\b|deity|meaning\s+of\s+life|purpose\s+of\s+life|afterlife|heaven|hell|death|dying|mortality|philosoph(y|ical|er))", re.I)
+# Prompt rules are matched by the compiled engine in app/rule_engine.py (one pass per
+# prompt, hot reload from rules.json). Tables: (rule id, pattern, answer) in priority order.
+rules = shared.load("rule_engine")     # this file is app.py, so the main tree's is loaded by path
+
+BLOCK = ("block.rabbi", r"(free\s*-?\s*will|religion(s|al)?|faith|\bgod(s)?\b|deity|meaning\s+of\s+life|purpose\s+of\s+life|afterlife|heaven|hell|death|dying|mortality|philosoph(y|ical|er))")
 FIXED = "I am not a rabbi, priest or philosopher and I’m also in a hurry so questions like this are not a good use of my time or yours."
 
 IDENTITY_OVERRIDES = [
-    (re.compile(r"\bwho\s+is\s+howard\s+tullman\??", re.I),
+    ("ident.who_is_howard", r"\bwho\s+is\s+howard\s+tullman\??",
      "I’m a serial entrepreneur, investor, and educator. I’ve led multiple tech companies, ran 1871 in Chicago, and spent decades building teams, backing founders, and writing about execution."),
-    (re.compile(r"\bwhy\b.*\bai\s+strategy\b|\bwhy\s+do\s+i\s+need\s+an\s+ai\s+strategy\??", re.I),
+    ("ident.ai_strategy", r"\bwhy\b.*\bai\s+strategy\b|\bwhy\s+do\s+i\s+need\s+an\s+ai\s+strategy\??",
      "Because it drives results: faster execution, lower cost, and clear differentiation. Start with a 12-month roadmap, pick 2–3 high-value use cases, ship a small win in 30–60 days, then scale what works."),
-    (re.compile(r"\b(kendall)\b.*(changed|change|under\s+your\s+leadership)", re.I),
-     "At Kendall I focused on speed, relevance, and outcomes — tighter industry ties, more real-world projects, measurable results, and higher expectations for students, faculty, and partners."),
+    ("ident.kendall", r"\b(kendall)\b.*(changed|change|under\s+your\s+leadership)",
+     "At Kendall I focused on speed, relevance, and outcomes—tighter industry ties, more real-world projects, measurable results, and higher expectations for students, faculty, and partners."),
 ]
 
 TOPIC_OVERRIDES = [
-    (re.compile(r"\b(relativity|einstein)\b.*\b(ten|10|child|kid|kids|student)\b|\bteach\b.*\brelativity\b", re.I),
-     "Imagine you’re on a very fast train. You toss a ball; to you it looks normal, but to someone standing outside it moves differently. Relativity says time and distance can look different depending on how fast you’re moving and how strong gravity is. Go faster or be near something heavy, and clocks tick a tiny bit differently. That’s it: motion and gravity change what we see as time and space."),
+    ("topic.relativity", r"\b(relativity|einstein)\b.*\b(ten|10|child|kid|kids|student)\b|\bteach\b.*\brelativity\b",
+     "Imagine you’re on a very fast train. You toss a ball; to you it looks normal, but to someone outside it moves differently. Relativity says time and distance can look different depending on speed and gravity. Go faster or be near something heavy, and clocks tick a little differently. That’s it: motion and gravity change what we see as time and space."),
+]
+
+# small rule-of-thumb fallback for common “how long do X live?”
+LIFESPAN_STUBS = [
+    ("lifespan.dogs", r"\bhow\s+long\s+do\s+dogs?\s+live",
+     "Most dogs live about 10–13 years. Smaller breeds often reach 12–16; giant breeds are closer to 7–10. Care, genetics, and size drive the spread."),
+    ("lifespan.cats", r"\bhow\s+long\s+do\s+cats?\s+live",
+     "Indoor cats often reach 12–15 years and many live past 16; outdoor cats trend shorter. Care and genetics matter."),
+    ("lifespan.humans", r"\bhow\s+long\s+do\s+humans?\s+live|\blife\s+expectancy\b",
+     "In the U.S., life expectancy is roughly mid-70s to low-80s depending on sex and region. Health, lifestyle, and access drive the spread."),
 ]
 
+rules.register(dict([BLOCK[:2]] + [(rid, pat) for rid, pat, _ in IDENTITY_OVERRIDES + TOPIC_OVERRIDES + LIFESPAN_STUBS]))
+
+def _rule_answer(table, hits):
+    return next((ans for rid, _, ans in table if rid in hits), None)
+
+def _blocked(prompt):
+    return BLOCK[0] in rules.match(prompt)
+
 
 # ===== patched /retrieve (identity → topic → examples → fallback) =====
 import json as _json, re as _re
@@ -112,52 +134,23 @@ def _r_tokens(s):
     return {t for t in _R_WORD.findall((s or '').lower()) if len(t)>2 and t not in _R_STOP}
 
 def _r_best_match(q):
-    tq = _r_tokens(q)
-    if not tq: return None
-    best=None; best_score=0.0
-    for pq,pa in _r_load_pairs():
-        tp = _r_tokens(pq)
-        if not tp: continue
-        jac = len(tq & tp) / max(1, len(tq | tp))
-        if "kendall" in tq and "kendall" in tp:
-            jac += 0.25
-        if jac > best_score:
-            best_score = jac; best = pa
-    return best if best_score >= 0.42 else None  # stricter to avoid bad grabs
-
-_R_BLOCK = _re.compile(r"(free\s*-?\s*will|religion(s|al)?|faith|\bgod(s)?\b|deity|meaning\s+of\s+life|purpose\s+of\s+life|afterlife|heaven|hell|death|dying|mortality|philosoph(y|ical|er))", _re.I)
-_R_FIXED = "I am not a rabbi, priest or philosopher and I’m also in a hurry so questions like this are not a good use of my time or yours."
-
-_R_IDENTS = [
-    (_re.compile(r"\bwho\s+is\s+howard\s+tullman\??", _re.I),
-     "I’m a serial entrepreneur, investor, and educator. I’ve led multiple tech companies, ran 1871 in Chicago, and spent decades building teams, backing founders, and writing about execution."),
-    (_re.compile(r"\bwhy\b.*\bai\s+strategy\b|\bwhy\s+do\s+i\s+need\s+an\s+ai\s+strategy\??", _re.I),
-     "Because it drives results: faster execution, lower cost, and clear differentiation. Start with a 12-month roadmap, pick 2–3 high-value use cases, ship a small win in 30–60 days, then scale what works."),
-    (_re.compile(r"\b(kendall)\b.*(changed|change|under\s+your\s+leadership)", _re.I),
-     "At Kendall I focused on speed, relevance, and outcomes—tighter industry ties, more real-world projects, measurable results, and higher expectations for students, faculty, and partners."),
-]
+    best, _ = seed_index.best_match(q, _R_SEED)
+    return best  # None below 0.42 (stricter to avoid bad grabs)
 
-_R_TOPICS = [
-    (_re.compile(r"\b(relativity|einstein)\b.*\b(ten|10|child|kid|kids|student)\b|\bteach\b.*\brelativity\b", _re.I),
-     "Imagine you’re on a very fast train. You toss a ball; to you it looks normal, but to someone outside it moves differently. Relativity says time and distance can look different depending on speed and gravity. Go faster or be near something heavy, and clocks tick a little differently. That’s it: motion and gravity change what we see as time and space."),
-]
+_R_FIXED = FIXED
 
 @app.route("/retrieve", methods=["POST"])
 def retrieve():
     data = request.get_json(silent=True) or {}
     prompt = (data.get("prompt") or data.get("q") or data.get("text") or "").strip()
 
-    if _R_BLOCK.search(prompt or ""):
+    hits = rules.match(prompt)
+    if BLOCK[0] in hits:
         return jsonify({"answer": _R_FIXED, "response": _R_FIXED, "ruled": True, "service": SERVICE_TAG})
 
-    pl = (prompt or "").lower()
-    for rx,ans in _R_IDENTS:
-        if rx.search(pl):
-            return jsonify({"answer": ans, "response": ans, "ruled": False, "service": SERVICE_TAG})
-
-    for rx,ans in _R_TOPICS:
-        if rx.search(pl):
-            return jsonify({"answer": ans, "response": ans, "ruled": False, "service": SERVICE_TAG})
+    ans = _rule_answer(IDENTITY_OVERRIDES + TOPIC_OVERRIDES, hits)
+    if ans:
+        return jsonify({"answer": ans, "response": ans, "ruled": False, "service": SERVICE_TAG})
 
     ex = _r_best_match(prompt)
     if ex:
@@ -215,6 +208,38 @@ def api_examples_restore_from_prod():
             if q and a: f.write(json.dumps({"prompt":q,"response":a,"date":now(),"source":"restored_from_prod"}, ensure_ascii=False)+"\n")
     return jsonify({"ok": True, "count": len([1 for q,a in pairs if q and a])})
 
+@app.route("/retrieve/hybrid", methods=["POST"])
+def retrieve_hybrid():
+    data = request.get_json(silent=True) or {}
+    prompt = (data.get("prompt") or data.get("q") or data.get("text") or "").strip()
+    if not prompt: return jsonify({"ok": False, "error": "empty prompt"}), 400
+    try: k = max(1, min(50, int(data.get("k") or 8)))
+    except Exception: k = 8
+    # stages: list of known names or "seed,fts"; budgets may only lower the server limits
+    stages = data.get("stages")
+    if isinstance(stages, str): stages = stages.split(",")
+    if stages is not None:
+        known = isinstance(stages, list) and stages and all(isinstance(n, str) and n.strip() in hybrid_retrieve.STAGES
+                                                           for n in stages)
+        if not known:
+            return jsonify({"ok": False, "error": "stages: list of " + ", ".join(hybrid_retrieve.STAGES)}), 400
+        stages = [n.strip() for n in stages]
+    raw = data.get("budgets")
+    budgets = {n: min(int(v), hybrid_retrieve.BUDGETS[n]) for n, v in (raw.items() if isinstance(raw, dict) else ())
+               if n in hybrid_retrieve.BUDGETS and str(v).isdigit()}
+    out = hybrid_retrieve.retrieve(prompt, k=k, stages=stages, budgets=budgets)
+    return jsonify({"ok": True, "service": SERVICE_TAG, **out})
+
+@app.route("/admin/api/semantic_promote", methods=["POST"])
+def api_semantic_promote():
+    import build_semantic_index
+    try:
+        rc = build_semantic_index.promote()
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"promote failed: {e}"}), 500
+    if rc: return jsonify({"ok": False, "error": "staging index incomplete"}), 400
+    return jsonify({"ok": True, "path": SEM_PROD})
+
 @app.route("/admin/api/voiceprint", methods=["GET","POST"])
 def api_voiceprint():
     if request.method=="GET":
@@ -281,7 +306,7 @@ if __name__ == "__main__":
 
 
 # === /retrieve hotfix (GPT-backed + rule-of-thumb fallback) ===
-import json as _J, re as _R, os as _OS
+import json as _J, re as _R, os as _OS, time as _time
 from pathlib import Path as _P
 
 _R_SEED = "/home/kmages/backend/voiceprint_seed.jsonl"
@@ -309,32 +334,12 @@ _RW=_R.compile(r"[a-z0-9]+")
 def _tok(x): return {t for t in _RW.findall((x or "").lower()) if len(t)>2 and t not in _R_STOP}
 
 def _best(q):
-    tq=_tok(q)
-    if not tq: return None
-    best=None; sc=0.0
-    for pq,pa in _r_seed_pairs():
-        tp=_tok(pq)
-        if not tp: continue
-        jac=len(tq & tp)/max(1,len(tq|tp))
-        if "kendall" in tq and "kendall" in tp: jac += 0.25
-        if jac>sc: sc=jac; best=pa
-    return best if sc>=0.42 else None
-
-# hard rule block
-_R_BLOCK=_R.compile(r"(free\s*-?\s*will|religion(s|al)?|faith|\bgod(s)?\b|deity|meaning\s+of\s+life|purpose\s+of\s+life|afterlife|heaven|hell|death|dying|mortality|philosoph(y|ical|er))",_R.I)
-_R_FIXED="I am not a rabbi, priest or philosopher and I’m also in a hurry so questions like this are not a good use of my time or yours."
-
-# identity / topics
+    best, _ = seed_index.best_match(q, _R_SEED)
+    return best
+
+# hard rule block + identity / topics (rule tables at the top of this file)
 def _ident(pl:str):
-    if _R.search(r"\bwho\s+is\s+howard\s+tullman\??", pl):
-        return "I’m a serial entrepreneur, investor, and educator. I’ve led multiple tech companies, ran 1871 in Chicago, and spent decades building teams, backing founders, and writing about execution."
-    if _R.search(r"\bwhy\b.*\bai\s+strategy\b|\bwhy\s+do\s+i\s+need\s+an\s+ai\s+strategy\??", pl):
-        return "Because it drives results: faster execution, lower cost, and clear differentiation. Start with a 12-month roadmap, pick 2–3 high-value use cases, ship a small win in 30–60 days, then scale what works."
-    if _R.search(r"\b(kendall)\b.*(changed|change|under\s+your\s+leadership)", pl):
-        return "At Kendall I focused on speed, relevance, and outcomes—tighter industry ties, more real-world projects, measurable results, and higher expectations for students, faculty, and partners."
-    if _R.search(r"\b(relativity|einstein)\b.*\b(ten|10|child|kid|kids|student)\b|\bteach\b.*\brelativity\b", pl):
-        return "Imagine you’re on a very fast train. You toss a ball; to you it looks normal, but to someone outside it moves differently. Relativity says time and distance can look different depending on speed and gravity. Go faster or be near something heavy, and clocks tick a little differently. That’s it: motion and gravity change what we see as time and space."
-    return None
+    return _rule_answer(IDENTITY_OVERRIDES + TOPIC_OVERRIDES, rules.match(pl))
 
 def _voiceprint():
     for pth in (_VOICE_STG, _VOICE_PROD):
@@ -346,38 +351,96 @@ def _voiceprint():
             "Tone: first person; direct; concise; no fluff; no hedging.\n"
             "Output: one concise first-person answer only.")
 
-# small rule-of-thumb fallback for common “how long do X live?”
 def _lifespan_stub(pl:str):
-    if _R.search(r"\bhow\s+long\s+do\s+dogs?\s+live", pl):
-        return "Most dogs live about 10–13 years. Smaller breeds often reach 12–16; giant breeds are closer to 7–10. Care, genetics, and size drive the spread."
-    if _R.search(r"\bhow\s+long\s+do\s+cats?\s+live", pl):
-        return "Indoor cats often reach 12–15 years and many live past 16; outdoor cats trend shorter. Care and genetics matter."
-    if _R.search(r"\bhow\s+long\s+do\s+humans?\s+live|\blife\s+expectancy\b", pl):
-        return "In the U.S., life expectancy is roughly mid-70s to low-80s depending on sex and region. Health, lifestyle, and access drive the spread."
-    return None
-
-# optional OpenAI v1 client
-_client=None
-def _gpt_ans(prompt:str):
-    global _client
-    try:
-        from openai import OpenAI
-    except Exception:
-        return None
+    return _rule_answer(LIFESPAN_STUBS, rules.match(pl))
+
+# OpenAI through the shared gateway (app/llm.py: pooled client, bounded concurrency)
+llm = shared.load("llm")
+def _gpt_ans(prompt:str, refs=None):
     try:
-        if _client is None: _client = OpenAI()
         model = _OS.getenv("OPENAI_MODEL","gpt-4o-mini")
-        sys = _voiceprint()
-        r = _client.chat.completions.create(
-            model=model, temperature=0.3,
-            messages=[{"role":"system","content":sys},
-                      {"role":"user","content":prompt}],
-        )
-        txt = (r.choices[0].message.content or "").strip()
+        txt = llm.chat(llm.messages(_voiceprint(), _with_refs(prompt, refs)), model=model, temperature=0.3)
         return txt or None
     except Exception:
         return None
 
+# golden answers close to the prompt (semantic_golden.py), woven in as reference
+_SEM_ANSWER_MIN = float(_OS.getenv("SEM_ANSWER_MIN", "0.8"))
+def _with_refs(prompt:str, refs):
+    if not refs: return prompt
+    ref="\n\n".join(h["text"] for h in refs)
+    return f"Reference answers to weave:\n{ref}\n\nPrompt:\n{prompt}"
+
+def _semantic_ans(prompt:str):
+    # fused seed/FTS/TF-IDF/FAISS hits (hybrid_retrieve.py) as the GPT reference
+    hits = hybrid_retrieve.retrieve(prompt, k=3)["results"]
+    ans = _gpt_ans(prompt, hits)
+    if not ans:
+        for h in hits:
+            if h["stages"].get("faiss", {}).get("score", 0) >= _SEM_ANSWER_MIN:
+                return h["text"]
+    return ans
+
+# answers of the chain below per normalized prompt; the generation covers every file it
+# reads plus the indexes that reload in the background
+def _retrieve_gen():
+    return (retrieval_cache.file_sig(rules.RULES_JSON, *seed_index.pool(_R_SEED), _VOICE_STG, _VOICE_PROD,
+                                     semantic_tfidf.SEM_PROD, hybrid_retrieve.FTS_DB, f"{hybrid_retrieve.FTS_DB}-wal",
+                                     *(_OS.path.join(semantic_golden.FAISS_DIR, n) for n in ("index.faiss", "index.pkl"))),
+            semantic_tfidf.get().generation, semantic_golden.get().generation)
+
+_answers = retrieval_cache.get("retrieve", _retrieve_gen)
+
+def _answer(prompt:str):
+    pl=(prompt or "").lower()
+    return _ident(pl) or _best(prompt) or semantic_tfidf.get().best(prompt) or _lifespan_stub(pl) or _semantic_ans(prompt)
+
+# ---- streaming (Accept: text/event-stream or ?stream=1, app/sse.py): the same chain, but
+# the GPT step yields chunks as they arrive; rule/seed/tfidf answers come as one chunk.
+# The after_request hooks below leave JSON bodies as they are (mimetype only), so the
+# "done" dict is the body a JSON client gets
+from flask import Response, stream_with_context
+sse = shared.load("sse")
+_R_DETAIL = "Give me one detail (timeframe, scope, or result) and I’ll answer directly."
+
+def _semantic_stream(prompt:str):
+    hits = hybrid_retrieve.retrieve(prompt, k=3)["results"]
+    sent = False
+    if llm.available():
+        try:
+            model = _OS.getenv("OPENAI_MODEL","gpt-4o-mini")
+            for d in llm.stream(llm.messages(_voiceprint(), _with_refs(prompt, hits)), model=model, temperature=0.3):
+                sent = True; yield d
+        except Exception:
+            if sent: raise
+    if sent: return
+    for h in hits:
+        if h["stages"].get("faiss", {}).get("score", 0) >= _SEM_ANSWER_MIN:
+            yield h["text"]; return
+
+def _answer_stream(prompt:str):
+    pl=(prompt or "").lower()
+    ans = _ident(pl) or _best(prompt) or semantic_tfidf.get().best(prompt) or _lifespan_stub(pl)
+    if ans: yield ans
+    else: yield from _semantic_stream(prompt)
+
+def _retrieve_events(prompt:str):
+    ans = None
+    try:
+        ans, gen = _answers.lookup(prompt)
+        if ans:
+            yield sse.delta(ans)
+        else:
+            t0 = _time.perf_counter(); parts = []
+            for d in _answer_stream(retrieval_cache.fix_typos(prompt)):
+                parts.append(d); yield sse.delta(d)
+            ans = "".join(parts).strip() or None
+            if ans: _answers.store(prompt, gen, ans, (_time.perf_counter() - t0) * 1000)
+    except Exception:
+        app.logger.exception("retrieve_stream_error"); ans = None
+    ans = ans or _R_DETAIL
+    yield sse.done({"answer":ans,"response":ans,"ruled":False,"service":SERVICE_TAG})
+
 @app.before_request
 def _intercept_retrieve():
     try:
@@ -385,14 +448,18 @@ def _intercept_retrieve():
             return None
         data=request.get_json(silent=True) or {}
         prompt=(data.get("prompt") or data.get("q") or data.get("text") or "").strip()
+        stream=sse.wants_stream(request.headers.get("Accept"), request.args.get("stream"))
 
-        if _R_BLOCK.search(prompt or ""):
-            return jsonify({"answer":_R_FIXED,"response":_R_FIXED,"ruled":True,"service":SERVICE_TAG})
+        if _blocked(prompt):
+            body={"answer":_R_FIXED,"response":_R_FIXED,"ruled":True,"service":SERVICE_TAG}
+            if stream: return Response(sse.done(body), mimetype=sse.MIMETYPE, headers=sse.HEADERS)
+            return jsonify(body)
+        if stream:
+            return Response(stream_with_context(_retrieve_events(prompt)), mimetype=sse.MIMETYPE, headers=sse.HEADERS)
 
-        pl=(prompt or "").lower()
-        ans = _ident(pl) or _best(prompt) or _lifespan_stub(pl) or _gpt_ans(prompt)
+        ans = _answers.cached(prompt, lambda: _answer(retrieval_cache.fix_typos(prompt)))
         if not ans:
-            ans="Give me one detail (timeframe, scope, or result) and I’ll answer directly."
+            ans=_R_DETAIL
         return jsonify({"answer":ans,"response":ans,"ruled":False,"service":SERVICE_TAG})
     except Exception:
         return None
@@ -413,7 +480,7 @@ from flask import Response
 @app.after_request
 def _force_json_retrieve(r):
     try:
-        if request.path == "/retrieve":
+        if request.path == "/retrieve" and r.mimetype != sse.MIMETYPE:
             body = r.get_data(as_text=True)
             # If not JSON, wrap it
             if not body.strip().startswith("{"):
@@ -469,7 +536,7 @@ from flask import Response
 @app.after_request
 def _tullman_force_json_and_ivoice(r):
     try:
-        if request.path == "/retrieve":
+        if request.path == "/retrieve" and r.mimetype != sse.MIMETYPE:
             body = r.get_data(as_text=True)
 
             # Ensure JSON
@@ -500,6 +567,17 @@ def _tullman_force_json_and_ivoice(r):
         pass
     return r
 
+# ---- ingest/admin writes drop this worker's cached retrieval answers at once (other
+# workers see the changed files through the cache generation) ----
+@app.after_request
+def _retrieval_cache_invalidate(r):
+    try:
+        if request.method == "POST" and request.path.startswith(("/admin/api/", "/tuner/")) and r.status_code < 400:
+            retrieval_cache.invalidate()
+    except Exception:
+        pass
+    return r
+
 # ---- Admin: upload files into corpus (.txt/.md/.jsonl) ----
 import os, json, datetime
 from flask import request, jsonify
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# /home/kmages/backend/bench_golden_index.py
+# recall@k vs latency for each GOLDEN_INDEX_TYPE, measured against the exact flat index.
+# Vectors come from --faiss_dir (index.flat.faiss, or index.faiss while it is still flat)
+# or, with --synthetic N, from clustered random unit vectors of the MiniLM dimension.
+# Queries are held-out perturbed copies of stored vectors, as prompts near golden answers are.
+# Usage: python bench_golden_index.py --synthetic 100000 --queries 500 --k 10
+import argparse, os, time
+import numpy as np
+import faiss
+import admin_reindex_incremental as ari
+
+KINDS = ["flat", "sq8", "hnsw", "ivf_flat", "ivf_pq"]
+
+def unit(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype("float32")
+
+def synth(n, dim=384, clusters=200, seed=7):
+    rnd = np.random.default_rng(seed)
+    centers = rnd.standard_normal((clusters, dim))
+    return unit(centers[rnd.integers(0, clusters, n)] + 0.6 * rnd.standard_normal((n, dim)))
+
+def load_vectors(d):
+    for name in ("index.flat.faiss", "index.faiss"):
+        p = os.path.join(d, name)
+        if os.path.exists(p):
+            ix = faiss.read_index(p)
+            if isinstance(ix, faiss.IndexFlat) or name == "index.flat.faiss":
+                return ix.reconstruct_n(0, ix.ntotal)
+    raise SystemExit(f"no exact vectors in {d} (quantized index without index.flat.faiss)")
+
+def lat(fn, qs):
+    out = []
+    for q in qs:
+        t0 = time.perf_counter(); fn(q[None, :]); out.append((time.perf_counter() - t0) * 1e6)
+    out.sort()
+    pct = lambda p: out[min(len(out) - 1, int(p * len(out)))]
+    return sum(out) / len(out), pct(.5), pct(.95)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--faiss_dir")
+    ap.add_argument("--synthetic", type=int, default=0)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--kinds", default=",".join(KINDS))
+    a = ap.parse_args()
+
+    xb = synth(a.synthetic) if a.synthetic else load_vectors(a.faiss_dir)
+    rnd = np.random.default_rng(11)
+    qs = unit(xb[rnd.integers(0, len(xb), a.queries)] + 0.05 * rnd.standard_normal((a.queries, xb.shape[1])))
+    flat = faiss.IndexFlatIP(xb.shape[1]); flat.add(xb)
+    _, truth = flat.search(qs, a.k)
+    print(f"[pool] vectors={len(xb)} dim={xb.shape[1]} queries={a.queries} k={a.k} "
+          f"nprobe={ari.NPROBE} efSearch={ari.EF_SEARCH}")
+    print(f"{'type':9} {'spec':20} {'build_s':>8} {'bytes/vec':>9} {'recall@k':>8} {'mean_us':>8} {'p50_us':>7} {'p95_us':>7}")
+    for kind in a.kinds.split(","):
+        t0 = time.perf_counter()
+        ix = flat if kind == "flat" else ari.build_index(kind, flat)
+        build = time.perf_counter() - t0
+        if ix is None:
+            print(f"{kind:9} (needs >= {ari.MIN_TRAIN[kind]} vectors to train)"); continue
+        _, got = ix.search(qs, a.k)
+        recall = np.mean([len(set(g) & set(t)) / a.k for g, t in zip(got.tolist(), truth.tolist())])
+        size = faiss.serialize_index(ix).nbytes / len(xb)
+        spec = ari.factory_spec(kind, xb.shape[1], len(xb))
+        mean, p50, p95 = lat(lambda q: ix.search(q, a.k), qs)
+        print(f"{kind:9} {spec:20} {build:8.2f} {size:9.0f} {recall:8.3f} {mean:8.0f} {p50:7.0f} {p95:7.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# /home/kmages/backend/bench_seed_lookup.py
+# Compare example lookup strategies on a synthetic golden-sized pool:
+#   scan      - the old per-request O(N) Jaccard loop
+#   inverted  - seed_index token -> ids postings (exact)
+#   lsh       - seed_index with MinHash/LSH candidates (verified with exact Jaccard)
+# Before timing, check_reload() verifies that appends are read as a tail and that an
+# in-place rewrite (tuner / restore keep the inode) is picked up in full, with and
+# without LSH; ranked() must hand back the pairs of the snapshot it scored.
+# Usage: python bench_seed_lookup.py --pairs 100000 --queries 500
+import argparse, itertools, os, random, tempfile, json, time
+import seed_index
+
+VOCAB_COMMON = ["howard","tullman","chicago","startup","founder","business","team","company",
+                "advice","strategy","market","leadership","growth","product","customer"]
+
+def synth(n, seed=7):
+    rnd = random.Random(seed)
+    vocab = VOCAB_COMMON + [f"w{i}" for i in range(30000)]
+    cum = list(itertools.accumulate(1.0/(i+1)**1.1 for i in range(len(vocab))))  # zipf-ish
+    out=[]
+    for i in range(n):
+        k = rnd.randint(3, 9)
+        words = rnd.choices(vocab, cum_weights=cum, k=k)
+        out.append((" ".join(words)+"?", f"answer {i}"))
+    return out
+
+def perturb(q, rnd):
+    w = q.rstrip("?").split()
+    if len(w) > 3 and rnd.random() < 0.5: w.pop(rnd.randrange(len(w)))
+    if rnd.random() < 0.5: w.append(rnd.choice(VOCAB_COMMON))
+    return " ".join(w)+"?"
+
+def scan(pairs, q):
+    tq=seed_index.tokens(q)
+    if not tq: return None, 0.0
+    best=None; sc=0.0
+    for pq,pa in pairs:
+        tp=seed_index.tokens(pq)
+        if not tp: continue
+        jac=len(tq & tp)/max(1, len(tq|tp))
+        if "kendall" in tq and "kendall" in tp: jac += 0.25
+        if jac>sc: sc=jac; best=pa
+    return (best, sc) if sc>=seed_index.THRESHOLD else (None, sc)
+
+def timed(fn, queries):
+    res=[]; lat=[]
+    for q in queries:
+        t0=time.perf_counter(); res.append(fn(q)); lat.append((time.perf_counter()-t0)*1e6)
+    lat.sort()
+    pct=lambda p: lat[min(len(lat)-1, int(p*len(lat)))]
+    return res, f"mean={sum(lat)/len(lat):,.0f}us p50={pct(.5):,.0f}us p95={pct(.95):,.0f}us"
+
+def check_reload(lsh_min):
+    with tempfile.TemporaryDirectory() as d:
+        path=os.path.join(d, "voiceprint_seed.jsonl")
+        def write(mode, rows):
+            with open(path, mode, encoding="utf-8") as f:
+                for q,r in rows: f.write(json.dumps({"prompt":q,"response":r})+"\n")
+        write("w", [("what about kendall college", "old answer one"), ("who runs the chicago incubator", "old answer two")])
+        ix=seed_index.SeedIndex(path, lsh_min=lsh_min); ix.refresh()
+        write("a", [("tell me about tribeca flashpoint", "appended answer")])
+        ix.refresh()
+        assert ix.best("tribeca flashpoint")[0] == "appended answer", "append must be indexed"
+        ino=os.stat(path).st_ino
+        write("w", [("what about kendall college", "new answer one"), ("who runs the chicago incubator", "new answer two"),
+                    ("tell me about tribeca flashpoint", "new appended answer")])
+        assert os.stat(path).st_ino == ino
+        ix.refresh()
+        assert ix.best("what about kendall college")[0] == "new answer one", "in-place rewrite must rebuild"
+        assert len(ix.pairs) == 3, ix.pairs
+        assert ix.ranked("tell me about tribeca flashpoint", 1) == [(1.0, "tell me about tribeca flashpoint", "new appended answer")]
+    print(f"[check] lsh_min={lsh_min}: append tail-read and in-place rewrite reload ok")
+
+def main():
+    ap=argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=100000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--scan-queries", type=int, default=20, help="the linear scan is slow; time a subset")
+    a=ap.parse_args()
+    check_reload(10**12); check_reload(0)
+
+    rnd=random.Random(11)
+    pairs=synth(a.pairs)
+    # half near-duplicates of stored prompts, half unseen prompts (mostly misses)
+    queries=[perturb(rnd.choice(pairs)[0], rnd) for _ in range(a.queries//2)]
+    queries+=[q for q,_ in synth(a.queries - len(queries), seed=99)]
+
+    with tempfile.TemporaryDirectory() as d:
+        path=os.path.join(d, "golden.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for q,r in pairs: f.write(json.dumps({"prompt":q,"response":r})+"\n")
+
+        t0=time.perf_counter(); inv=seed_index.SeedIndex(path, lsh_min=10**12); inv.refresh()
+        t_inv=time.perf_counter()-t0
+        t0=time.perf_counter(); lsh=seed_index.SeedIndex(path, lsh_min=0); lsh.refresh()
+        t_lsh=time.perf_counter()-t0
+
+        more=synth(100, seed=5)
+        with open(path, "a", encoding="utf-8") as f:
+            for q,r in more: f.write(json.dumps({"prompt":q,"response":r})+"\n")
+        t0=time.perf_counter(); lsh.refresh(); t_app=time.perf_counter()-t0
+        assert lsh.best(more[0][0])[0] == more[0][1], "appended pair must be found"
+        inv.refresh(); pairs+=more
+
+        r_inv, us_inv = timed(inv.best, queries)
+        r_lsh, us_lsh = timed(lsh.best, queries)
+        sub=queries[:a.scan_queries]
+        r_scan, us_scan = timed(lambda q: scan(pairs, q), sub)
+
+    assert [x[1] for x in r_scan] == [x[1] for x in r_inv[:len(sub)]], "inverted index must match scan"
+    hits=[i for i,(ans,_) in enumerate(r_inv) if ans is not None]
+    agree=sum(1 for i in hits if r_lsh[i][1] == r_inv[i][1])
+    print(f"[pool] pairs={len(pairs)} queries={len(queries)} above-threshold={len(hits)}")
+    print(f"[build] inverted={t_inv:.2f}s lsh={t_lsh:.2f}s append100(lsh)={t_app*1000:.0f}ms  {lsh.stats()['lsh']}")
+    print(f"[query] scan     {us_scan}")
+    print(f"[query] inverted {us_inv}")
+    print(f"[query] lsh      {us_lsh}")
+    print(f"[recall] lsh best-score agreement on threshold hits: {agree}/{len(hits)}")
+    assert agree == len(hits), "lsh must find every match at or above the threshold"
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 # /home/kmages/backend/build_semantic_index.py
-import os, json, pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
+#   python build_semantic_index.py            # fit TF-IDF over seed + golden prompts -> semantic_staging.pkl
+#   python build_semantic_index.py --promote  # staging -> semantic_prod.pkl (atomic); workers hot-reload it
+import os, sys, json, pickle, shutil
 
 BASE    = "/home/kmages/backend"
 SEED    = os.path.join(BASE, "voiceprint_seed.jsonl")
 GOLDEN  = "/home/kmages/golden.jsonl"
 OUT_STG = os.path.join(BASE, "semantic_staging.pkl")
+OUT_PRD = os.path.join(BASE, "semantic_prod.pkl")
 
 def load_pairs(path):
     out=[]
@@ -22,7 +24,14 @@ def load_pairs(path):
                 except: pass
     return out
 
-def main():
+def _write_atomic(obj, path):
+    tmp = path + ".tmp"
+    with open(tmp,"wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+def build():
+    from sklearn.feature_extraction.text import TfidfVectorizer
     qa   = load_pairs(SEED)
     gold = load_pairs(GOLDEN)
     pairs = qa + gold
@@ -30,12 +39,33 @@ def main():
         print("[warn] no data; staging index not written")
         return
     questions = [q for q,_ in pairs]
+    # norm="l2" (the default) makes a row dot product the cosine; semantic_tfidf relies on it
     vec = TfidfVectorizer(lowercase=True, ngram_range=(1,2),
-                          max_features=50000, strip_accents="unicode")
-    X = vec.fit_transform(questions)
-    with open(OUT_STG,"wb") as f:
-        pickle.dump({"vectorizer": vec, "matrix": X, "pairs": pairs}, f)
+                          max_features=50000, strip_accents="unicode", norm="l2")
+    X = vec.fit_transform(questions).tocsr()
+    _write_atomic({"vectorizer": vec, "matrix": X, "pairs": pairs}, OUT_STG)
     print(f"[ok] wrote {OUT_STG} | questions={len(questions)}")
 
+def promote():
+    """Validate staging and swap it in as prod with one rename (old prod -> .bak)."""
+    with open(OUT_STG,"rb") as f:
+        obj = pickle.load(f)
+    X, pairs = obj.get("matrix"), obj.get("pairs") or []
+    if obj.get("vectorizer") is None or X is None or X.shape[0] != len(pairs) or not pairs:
+        print(f"[err] {OUT_STG} is incomplete; prod left as is")
+        return 1
+    tmp = OUT_PRD + ".tmp"
+    shutil.copyfile(OUT_STG, tmp)
+    if os.path.exists(OUT_PRD):
+        shutil.copy2(OUT_PRD, OUT_PRD + ".bak")
+    os.replace(tmp, OUT_PRD)       # workers see the old file or the new one, never a partial
+    print(f"[ok] promoted {OUT_STG} -> {OUT_PRD} | questions={len(pairs)}")
+    return 0
+
+def main():
+    if "--promote" in sys.argv[1:]:
+        sys.exit(promote())
+    build()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,195 @@
+# /home/kmages/backend/corpus_index.py
+# In-memory index of ~/tullman/corpus for search_corpus(): a background thread polls the
+# directory (os.scandir + stat, every CORPUS_POLL_S seconds), extracts text once per file
+# version (mtime/size) with real parsers, and swaps in a new snapshot. Requests only read
+# the snapshot, never the filesystem. Until the first scan has finished (boot, new
+# worker), search() waits for it up to CORPUS_READY_S instead of answering from an empty
+# snapshot and sending the request down the slow web/GPT fallbacks.
+#   .pdf        pypdf, else pdfminer (lazy imports; skipped when neither is installed)
+#   .html/.htm  BeautifulSoup without script/style, else tag-stripping regex
+#   other text  utf-8 (errors ignored), inline tags stripped as before
+# search(prompt): whole words the prompt contains narrow the files through a word ->
+# files postings map; the survivors are checked with the same substring test and
+# 200-char snippet window as the old os.walk scan, in directory order.
+import os, re, threading, time, logging
+
+_log = logging.getLogger("corpus_index")
+
+EXTS = (".txt",".md",".html",".htm",".json",".mdx",".rst",".yaml",".yml",
+        ".ini",".cfg",".conf",".log",".sql",".csv",".tsv",".pdf")
+POLL_S = float(os.getenv("CORPUS_POLL_S", "10"))
+READY_S = float(os.getenv("CORPUS_READY_S", "20"))
+_WORD = re.compile(r"[a-z0-9]+")
+_TAGS = re.compile(r"<[^>]+>")
+
+# ---- extractors (lazy import so missing libs don't crash the server)
+def _pdf_text(path):
+    try:
+        from pypdf import PdfReader
+        return "\n".join(pg.extract_text() or "" for pg in PdfReader(path).pages)
+    except ImportError:
+        pass
+    from pdfminer.high_level import extract_text
+    return extract_text(path) or ""
+
+def _html_text(raw):
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        return _TAGS.sub(" ", raw)
+    soup = BeautifulSoup(raw, "html.parser")
+    for t in soup(["script", "style"]): t.extract()
+    return soup.get_text(separator=" ")
+
+def extract(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        return _pdf_text(path)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        raw = f.read()
+    return _html_text(raw) if ext in (".html", ".htm") else _TAGS.sub(" ", raw)
+
+class _Doc:
+    __slots__ = ("path", "sig", "text", "lower", "words")
+    def __init__(self, path, sig, text):
+        self.path, self.sig, self.text = path, sig, text
+        self.lower = text.lower()
+        self.words = frozenset(_WORD.findall(self.lower))
+
+class CorpusIndex:
+    def __init__(self, root, poll_s=POLL_S):
+        self.root = root
+        self.poll_s = poll_s
+        self._snap = ((), {})          # (docs in directory order, word -> doc positions)
+        self._docs = {}                # path -> _Doc (writer side)
+        self.failed = {}               # path -> (sig, error)
+        self.last_scan = None          # wall time of the last completed scan
+        self.scan_ms = None
+        self.scans = 0
+        self.generation = 0            # bumps with every new snapshot (retrieval_cache key)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()   # set once the first scan has run (even a failed one)
+        self.not_ready = 0             # searches that gave up waiting for the first scan
+        self._thread = None
+
+    # ---- writer
+    def _walk(self):
+        out, stack = [], [self.root]
+        while stack:
+            d = stack.pop()
+            try:
+                ents = sorted(os.scandir(d), key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for e in ents:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        subdirs.append(e.path)
+                    elif e.name.lower().endswith(EXTS):
+                        st = e.stat()
+                        out.append((e.path, (st.st_mtime_ns, st.st_size)))
+                except OSError:
+                    continue
+            stack.extend(reversed(subdirs))
+        return out
+
+    def scan(self):
+        """One polling pass; re-extracts new/changed files. Returns number of changes."""
+        with self._lock:
+            t0 = time.perf_counter()
+            seen = self._walk()
+            changed = 0
+            live = {p for p, _ in seen}
+            for p in [p for p in self._docs if p not in live]:
+                del self._docs[p]; changed += 1
+            for p in [p for p in self.failed if p not in live]:
+                del self.failed[p]
+            for p, sig in seen:
+                doc = self._docs.get(p)
+                if doc is not None and doc.sig == sig: continue
+                if p in self.failed and self.failed[p][0] == sig: continue
+                try:
+                    self._docs[p] = _Doc(p, sig, extract(p))
+                    self.failed.pop(p, None)
+                except Exception as e:
+                    self._docs.pop(p, None)
+                    self.failed[p] = (sig, f"{e.__class__.__name__}: {e}"[:200])
+                changed += 1
+            if changed or not self.scans:
+                docs = tuple(self._docs[p] for p, _ in seen if p in self._docs)
+                post = {}
+                for i, d in enumerate(docs):
+                    for w in d.words:
+                        s = post.get(w)
+                        if s is None: post[w] = [i]
+                        else: s.append(i)
+                self._snap = (docs, post)
+                self.generation += 1
+            self.scans += 1
+            self.last_scan = time.time()
+            self.scan_ms = round((time.perf_counter() - t0) * 1000, 1)
+            self._ready.set()
+            return changed
+
+    def _loop(self):
+        while True:
+            try:
+                n = self.scan()
+                if n: _log.info("corpus index: %d change(s) under %s", n, self.root)
+            except Exception as e:
+                _log.warning("corpus index scan failed: %s", e)
+            self._ready.set()
+            time.sleep(self.poll_s)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="corpus-index", daemon=True)
+            self._thread.start()
+        return self
+
+    # ---- reader
+    def search(self, prompt, ready_s=READY_S):
+        """{'file': path, 'snippet': text} for the first file containing the prompt, or None."""
+        if not self._ready.is_set() and not self._ready.wait(ready_s):
+            self.not_ready += 1
+            return None
+        p = (prompt or "").strip().lower()
+        docs, post = self._snap
+        # words bounded on both sides inside the prompt must be whole words in the file
+        toks = [(m.group(), m.start(), m.end()) for m in _WORD.finditer(p)]
+        need = [w for w, s, e in toks if s > 0 and e < len(p)]
+        cand = None
+        for w in sorted(set(need), key=lambda w: len(post.get(w, ()))):
+            ids = post.get(w)
+            if not ids: return None
+            cand = set(ids) if cand is None else cand.intersection(ids)
+            if not cand: return None
+        for i in (sorted(cand) if cand is not None else range(len(docs))):
+            d = docs[i]
+            pos = d.lower.find(p)
+            if pos != -1:
+                text = d.text
+                return {"file": d.path, "snippet": text[max(0, pos-200):min(len(text), pos+200)].strip()}
+        return None
+
+    def stats(self):
+        docs, post = self._snap
+        age = round(time.time() - self.last_scan, 1) if self.last_scan else None
+        return {"root": self.root, "ready": self.last_scan is not None, "files": len(docs),
+                "chars": sum(len(d.text) for d in docs), "words": len(post), "failed": len(self.failed),
+                "scans": self.scans, "not_ready": self.not_ready, "generation": self.generation, "scan_ms": self.scan_ms, "last_scan_age_s": age,
+                "stale": age is None or age > 3 * self.poll_s}
+
+_INDEXES = {}
+_LOCK = threading.Lock()
+
+def get(root):
+    """Running index for `root` (background polling starts on first use)."""
+    ix = _INDEXES.get(root)
+    if ix is None:
+        with _LOCK:
+            ix = _INDEXES.get(root)
+            if ix is None:
+                ix = _INDEXES[root] = CorpusIndex(os.path.expanduser(root)).start()
+    return ix
@@ -0,0 +1,148 @@
+# /home/kmages/backend/embed_worker.py
+# Long-lived embedding worker for the golden FAISS index.
+#
+# Admin saves call enqueue(text): one small JSON job file is dropped (atomically) into
+# SPOOL_DIR, so any gunicorn worker can enqueue without touching the index. A single
+# worker process (ops/embed-worker.service) keeps the MiniLM model warm, drains the
+# spool in batches, appends the vectors to the in-memory index and writes index.pkl +
+# index.faiss via tmp files + os.replace under an flock, then deletes the jobs it
+# committed. A crash before the replace leaves the jobs in the spool for the next run.
+#
+#   python embed_worker.py            # run forever
+#   python embed_worker.py --once     # drain the spool and exit
+import argparse, fcntl, json, os, time, uuid, logging
+
+FAISS_DIR = os.getenv("SEM_FAISS_DIR", "/home/kmages/just-ken-GPT/golden_faiss_index")
+SPOOL_DIR = os.getenv("EMBED_SPOOL_DIR", "/home/kmages/backend/embed_spool")
+STATUS    = os.path.join(SPOOL_DIR, "status.json")
+BATCH     = int(os.getenv("EMBED_BATCH", "64"))
+POLL_SECS = float(os.getenv("EMBED_POLL_SECS", "1.0"))
+
+_log = logging.getLogger("embed_worker")
+
+# ---- producer side (imported by admin_ui; no ML deps needed)
+def enqueue(text, meta=None):
+    """Queue one text for embedding; returns the job id or None."""
+    text = (text or "").strip()
+    if not text: return None
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    jid = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(SPOOL_DIR, f".{jid}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"id": jid, "text": text, "meta": meta or {}, "ts": time.time()}, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(SPOOL_DIR, f"{jid}.job"))
+    return jid
+
+def pending():
+    try:
+        return sorted(n for n in os.listdir(SPOOL_DIR) if n.endswith(".job"))
+    except OSError:
+        return []
+
+def status():
+    """Queue depth from the spool + the worker's last heartbeat/throughput."""
+    st = {}
+    try:
+        with open(STATUS, "r", encoding="utf-8") as f: st = json.load(f)
+    except Exception:
+        pass
+    st["depth"] = len(pending())
+    hb = st.get("heartbeat") or 0
+    st["alive"] = bool(hb and time.time() - hb < max(30.0, POLL_SECS * 10))
+    return st
+
+# ---- worker side
+def _sig(d):
+    try:
+        return tuple((st.st_mtime_ns, st.st_size) for st in
+                     (os.stat(os.path.join(d, n)) for n in ("index.faiss", "index.pkl")))
+    except OSError:
+        return None
+
+class Worker:
+    def __init__(self, faiss_dir=FAISS_DIR, batch=BATCH):
+        from sentence_transformers import SentenceTransformer
+        from admin_reindex_incremental import MODEL_NAME
+        self.dir, self.batch = faiss_dir, batch
+        t0 = time.perf_counter()
+        self.model = SentenceTransformer(MODEL_NAME)
+        self.st = {"pid": os.getpid(), "started": time.time(), "model_load_s": round(time.perf_counter() - t0, 2),
+                   "processed": 0, "batches": 0, "failed": 0, "embed_s": 0.0, "write_s": 0.0,
+                   "last_batch": 0, "last_batch_ms": 0.0, "texts_per_s": 0.0, "vectors": 0}
+        self.index = self.meta = self.sig = None
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _take(self):
+        jobs = []
+        for n in pending()[:self.batch]:
+            p = os.path.join(SPOOL_DIR, n)
+            try:
+                with open(p, "r", encoding="utf-8") as f: j = json.load(f)
+            except FileNotFoundError:
+                continue
+            except Exception:
+                os.replace(p, p + ".bad"); self.st["failed"] += 1; continue
+            if (j.get("text") or "").strip(): jobs.append((p, j))
+            else: os.remove(p)
+        return jobs
+
+    def step(self):
+        """Embed and commit one batch; returns how many texts were added."""
+        from admin_reindex_incremental import add_vectors, embed_texts, load_or_create_index, save_index
+        jobs = self._take()
+        if not jobs: return 0
+        texts = [j["text"].strip() for _, j in jobs]
+        t0 = time.perf_counter()
+        emb = embed_texts(self.model, texts).astype("float32")
+        t1 = time.perf_counter()
+        with open(os.path.join(self.dir, ".lock"), "w") as lk:
+            fcntl.flock(lk, fcntl.LOCK_EX)
+            # the index stays in memory; re-read only if someone else (the CLI) wrote it
+            if self.index is None or _sig(self.dir) != self.sig:
+                self.index, self.meta = load_or_create_index(self.dir, emb.shape[1])
+            add_vectors(self.index, self.meta, emb)
+            self.meta["texts"].extend(texts)
+            save_index(self.index, self.meta, self.dir)
+            self.sig = _sig(self.dir)
+            self.st["vectors"] = self.index.ntotal
+        for p, _ in jobs:
+            try: os.remove(p)
+            except FileNotFoundError: pass
+        t2 = time.perf_counter()
+        st = self.st
+        st["processed"] += len(texts); st["batches"] += 1
+        st["embed_s"] = round(st["embed_s"] + (t1 - t0), 3); st["write_s"] = round(st["write_s"] + (t2 - t1), 3)
+        st["last_batch"] = len(texts); st["last_batch_ms"] = round((t2 - t0) * 1000, 1)
+        busy = st["embed_s"] + st["write_s"]
+        st["texts_per_s"] = round(st["processed"] / busy, 1) if busy else 0.0
+        _log.info("embedded %d texts in %.0f ms (depth %d)", len(texts), (t2 - t0) * 1000, len(pending()))
+        return len(texts)
+
+    def heartbeat(self):
+        self.st["heartbeat"] = time.time()
+        tmp = STATUS + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(self.st, f)
+        os.replace(tmp, STATUS)
+
+    def run(self, once=False):
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+        while True:
+            try:
+                n = self.step()
+            except Exception as e:
+                _log.exception("embed batch failed: %s", e); self.st["failed"] += 1; n = 0
+                self.index = None      # may hold unsaved vectors; re-read before the retry
+            self.heartbeat()
+            if once and (not n or not pending()): return
+            if not n: time.sleep(POLL_SECS)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--once", action="store_true", help="drain the spool and exit")
+    ap.add_argument("--batch", type=int, default=BATCH)
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    Worker(batch=a.batch).run(once=a.once)
+
+if __name__ == "__main__":
+    main()
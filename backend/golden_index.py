@@ -0,0 +1,168 @@
+# /home/kmages/backend/golden_index.py
+# Lookup index over /var/www/tullman/assets/golden.json, built once per file version
+# (mtime/size/inode) instead of re-reading and scanning it on every request.
+#   exact     dict question -> first id
+#   contained question inside the prompt: Aho-Corasick automaton (pyahocorasick when
+#             installed; otherwise per-length hash buckets, one slice lookup per prompt
+#             offset per distinct question length)
+#             prompt inside a question: trigram postings, intersect the rarest few, verify
+#   fuzzy     trigram overlap shortlists FUZZY_SHORTLIST candidates of plausible length,
+#             then the same ratio tests difflib.get_close_matches(n=1, cutoff) applies
+# Results match the old linear scans: the first question in file order wins.
+import json, os, heapq, threading
+from array import array
+from difflib import SequenceMatcher
+
+try:
+    import ahocorasick as _ac
+except Exception:
+    _ac = None
+
+CUTOFF = 0.86
+FUZZY_SHORTLIST = 64
+COMMON_POSTING = 5000       # trigrams in more questions than this don't help a shortlist
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+def read_pairs(path):
+    """[(question lowercased, answer)] in file order, same parsing as golden_pairs()."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    rows = []
+    if isinstance(data, list):
+        for d in data:
+            if not isinstance(d, dict): continue
+            q = (d.get("q") or "").strip()
+            a = (d.get("a") or "").strip()
+            if q: rows.append((q.lower(), a))
+    elif isinstance(data, dict):
+        for q, a in data.items():
+            rows.append((str(q).strip().lower(), str(a)))
+    return rows
+
+def trigrams(s):
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+class GoldenIndex:
+    def __init__(self, pairs):
+        self.pairs = pairs
+        self.exact = {}                       # question -> first id
+        for i, (q, _) in enumerate(pairs):
+            self.exact.setdefault(q, i)
+        self.tri = {}                         # trigram -> array of ids (distinct questions)
+        for q, i in self.exact.items():
+            for g in trigrams(q):
+                p = self.tri.get(g)
+                if p is None: p = self.tri[g] = array("I")
+                p.append(i)
+        self.ids = sorted(self.exact.values())
+        self.short = [i for i in self.ids if len(pairs[i][0]) < 3]   # no trigrams of their own
+        if _ac is not None:
+            self.auto = _ac.Automaton()
+            for q, i in self.exact.items():
+                if q: self.auto.add_word(q, i)
+            self.auto.make_automaton()
+            self.by_len = None
+        else:
+            self.auto = None
+            self.by_len = {}                  # len -> {question: id}
+            for q, i in self.exact.items():
+                if q: self.by_len.setdefault(len(q), {})[q] = i
+            self.lens = sorted(self.by_len)
+
+    def __len__(self): return len(self.pairs)
+
+    # ---- question contained in the prompt
+    def _in_prompt(self, p):
+        best = self.exact.get("")             # an empty question (dict form) is in every prompt
+        if self.auto is not None:
+            if self.auto.kind == _ac.EMPTY: return best
+            for _, i in self.auto.iter(p):
+                if best is None or i < best: best = i
+            return best
+        n = len(p)
+        for L in self.lens:
+            if L > n: break
+            d = self.by_len[L]
+            for s in range(n - L + 1):
+                i = d.get(p[s:s+L])
+                if i is not None and (best is None or i < best): best = i
+        return best
+
+    # ---- prompt contained in a question
+    def _prompt_in(self, p):
+        pairs = self.pairs
+        if len(p) < 3:
+            return next((i for i in self.ids if p in pairs[i][0]), None)
+        posts = sorted((self.tri.get(g) or () for g in trigrams(p)), key=len)
+        if not posts or not posts[0]: return None
+        cand = set(posts[0])
+        for post in posts[1:4]:
+            cand.intersection_update(post)
+            if not cand: return None
+        best = None
+        for i in cand:
+            if (best is None or i < best) and p in pairs[i][0]: best = i
+        return best
+
+    def contained(self, p):
+        """First id whose question contains, or is contained in, the prompt."""
+        a, b = self._in_prompt(p), self._prompt_in(p)
+        if a is None: return b
+        return a if b is None else min(a, b)
+
+    # ---- fuzzy (typo-tolerant)
+    def fuzzy(self, p, cutoff=CUTOFF):
+        pairs = self.pairs
+        lo, hi = len(p) * cutoff / (2 - cutoff), len(p) * (2 - cutoff) / cutoff
+        posts = sorted((self.tri[g] for g in trigrams(p) if g in self.tri), key=len)
+        rare = [x for x in posts if len(x) <= COMMON_POSTING] or posts[:1]
+        counts = {}
+        for post in rare:
+            for i in post: counts[i] = counts.get(i, 0) + 1
+        cand = [i for i in heapq.nlargest(FUZZY_SHORTLIST * 4, counts, key=counts.get)
+                if lo <= len(pairs[i][0]) <= hi][:FUZZY_SHORTLIST]
+        cand += [i for i in self.short if lo <= len(pairs[i][0]) <= hi]
+        s = SequenceMatcher(); s.set_seq2(p)
+        scored = []
+        for i in cand:
+            x = pairs[i][0]; s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff and s.ratio() >= cutoff:
+                scored.append((s.ratio(), x))
+        if not scored: return None
+        return self.exact[max(scored)[1]]     # get_close_matches order: score, then string
+
+    def lookup(self, prompt, fuzzy=True):
+        """Answer for the prompt or None (exact -> contained -> fuzzy)."""
+        p = (prompt or "").strip().lower()
+        i = self.exact.get(p)
+        if i is None: i = self.contained(p)
+        if i is None and fuzzy: i = self.fuzzy(p)
+        return None if i is None else self.pairs[i][1]
+
+    def stats(self):
+        return {"pairs": len(self.pairs), "questions": len(self.exact), "trigrams": len(self.tri),
+                "automaton": "pyahocorasick" if self.auto is not None else "length-buckets"}
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+def get(path):
+    """Index for the current version of `path` (rebuilt when the file changes)."""
+    sig = _sig(path)
+    hit = _CACHE.get(path)
+    if hit and hit[0] == sig: return hit[1]
+    with _LOCK:
+        hit = _CACHE.get(path)
+        if hit and hit[0] == sig: return hit[1]
+        ix = GoldenIndex(read_pairs(path) if sig else [])
+        _CACHE[path] = (sig, ix)
+        return ix
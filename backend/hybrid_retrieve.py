@@ -0,0 +1,159 @@
+# /home/kmages/backend/hybrid_retrieve.py
+# One retrieval call over every index we keep warm:
+#   seed   - boosted Jaccard over voiceprint_seed.jsonl (+golden) via seed_index
+#   fts    - BM25 over ~/tullman/data/content/content.db (app/fts_index.py builds it),
+#            public-safe rows only: the hits feed public /retrieve answers
+#   tfidf  - sparse cosine over semantic_prod.pkl via semantic_tfidf
+#   faiss  - MiniLM cosine over golden_faiss_index via semantic_golden
+# Stages run concurrently; each has its own millisecond budget measured from the start
+# of the call, and a stage that has not answered by then is dropped: its future is
+# cancelled (a queued call never runs; a running one finishes and is discarded), and a
+# stage that already has HYBRID_MAX_INFLIGHT calls queued or running is dropped without
+# being submitted, so a slow stage never backs up the pool. Surviving rankings are fused with
+# reciprocal-rank fusion: score(d) = sum over stages of 1 / (RRF_K + rank).
+import os, re, sqlite3, threading, time, logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as _Timeout
+from pathlib import Path
+
+import seed_index, semantic_tfidf, semantic_golden, shared
+
+public_flags = shared.load("public_flags")
+
+_log = logging.getLogger("hybrid_retrieve")
+
+FTS_DB = Path(os.getenv("HYBRID_FTS_DB", str(Path.home() / "tullman" / "data" / "content" / "content.db")))
+RRF_K  = int(os.getenv("HYBRID_RRF_K", "60"))
+BUDGETS = {"seed": 25, "fts": 60, "tfidf": 40, "faiss": 150}     # ms; HYBRID_BUDGETS=seed=25,fts=60,...
+for _kv in filter(None, os.getenv("HYBRID_BUDGETS", "").split(",")):
+    _k, _, _v = _kv.partition("=")
+    if _k.strip() in BUDGETS and _v.strip().isdigit(): BUDGETS[_k.strip()] = int(_v)
+
+MAX_INFLIGHT = int(os.getenv("HYBRID_MAX_INFLIGHT", "4"))     # queued+running calls per stage
+
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid")
+_lock = threading.Lock()
+_inflight = {}
+
+def _key(text):
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()[:240]
+
+# ---- stages: each returns [{"text", "score", ...}] best first
+def stage_seed(q, k):
+    out = []
+    for p in seed_index.pool():
+        for sc, pq, pa in seed_index.get(p).ranked(q, k):
+            out.append({"text": pa, "prompt": pq, "score": round(sc, 4), "origin": os.path.basename(p)})
+    out.sort(key=lambda h: -h["score"])
+    return out[:k]
+
+_fts_local = threading.local()
+_fts_stats = {"opened": 0, "reopened": 0}
+
+def _fts_ino():
+    try: return FTS_DB.stat().st_ino
+    except OSError: return None
+
+def _fts_conn():
+    """One read-only connection per pool thread; reopened if content.db is replaced."""
+    con = getattr(_fts_local, "con", None); ino = _fts_ino()
+    if con is not None and _fts_local.ino == ino: return con
+    if con is not None:
+        con.close()
+        with _lock: _fts_stats["reopened"] += 1
+    con = sqlite3.connect(f"file:{FTS_DB}?mode=ro", uri=True, check_same_thread=False)
+    con.execute("PRAGMA mmap_size=268435456"); con.execute("PRAGMA query_only=1")
+    _fts_local.con, _fts_local.ino = con, ino
+    with _lock: _fts_stats["opened"] += 1
+    return con
+
+# rows flagged under the current FLAGS_VERSION are filtered in SQL; rows with an older
+# flags_v come back too and are re-checked with public_flags, as server_stable does
+FTS_SQL = ("SELECT d.title, d.source_name, d.text, d.url, d.public_ok, d.flags_v, bm25(content) AS s"
+           " FROM content JOIN docs d ON d.rowid=content.rowid"
+           " WHERE content MATCH ? AND (d.public_ok=1 OR d.flags_v IS NOT ?) ORDER BY s LIMIT ?")
+
+def stage_fts(q, k):
+    if not FTS_DB.exists(): return []
+    terms = list(dict.fromkeys(re.findall(r"[a-z0-9]{3,}", (q or "").lower())))
+    if not terms: return []
+    match = " OR ".join(f'"{t}"' for t in terms)
+    out = []
+    for ti, sn, t, u, ok, fv, s in _fts_conn().execute(FTS_SQL, (match, public_flags.FLAGS_VERSION, k * 4)):
+        if not public_flags.public_ok({"source_name": sn, "text": t, "public_ok": ok, "flags_v": fv}): continue
+        out.append({"text": t, "title": ti, "source_name": sn, "url": u, "score": round(-s, 4)})
+        if len(out) >= k: break
+    return out
+
+def stage_tfidf(q, k):
+    return [{"text": a, "prompt": pq, "score": round(sc, 4)} for sc, pq, a in semantic_tfidf.get().search(q, k)]
+
+def stage_faiss(q, k):
+    # semantic_golden keeps its own executor + budget; give it ours so it never waits longer
+    return [{"text": h["text"], "score": h["score"]} for h in semantic_golden.search(q, k, budget_ms=BUDGETS["faiss"])]
+
+STAGES = {"seed": stage_seed, "fts": stage_fts, "tfidf": stage_tfidf, "faiss": stage_faiss}
+
+def _timed(fn, q, k):
+    t0 = time.perf_counter()
+    out = fn(q, k)
+    return out, (time.perf_counter() - t0) * 1000
+
+def _submit(n, prompt, k):
+    """Future for stage n, or None while MAX_INFLIGHT of its calls are queued or running."""
+    with _lock:
+        if _inflight.get(n, 0) >= MAX_INFLIGHT: return None
+        _inflight[n] = _inflight.get(n, 0) + 1
+    fut = _POOL.submit(_timed, STAGES[n], prompt, k)
+    fut.add_done_callback(lambda _f: _finished(n))
+    return fut
+
+def _finished(n):
+    with _lock: _inflight[n] -= 1
+
+def stats():
+    with _lock:
+        return {"inflight": dict(_inflight), "max_inflight": MAX_INFLIGHT, "fts": dict(_fts_stats)}
+
+def retrieve(prompt, k=8, stages=None, budgets=None):
+    """Fused top-k + per-stage report: {"results": [...], "stages": {name: {...}}, "ms": total}."""
+    budgets = {**BUDGETS, **(budgets or {})}
+    names = [s for s in (stages or STAGES) if s in STAGES]
+    t0 = time.perf_counter()
+    futs = {n: _submit(n, prompt, k) for n in names}
+    report, ranked = {}, {}
+    for n in [n for n in names if futs[n] is None]:
+        report[n] = {"status": "dropped", "reason": "busy", "budget_ms": budgets.get(n), "ms": None, "hits": 0}
+        names.remove(n)
+    # wait for stages in budget order; each wait is bounded by that stage's own deadline
+    for n in sorted(names, key=lambda n: budgets.get(n, 0)):
+        left = budgets.get(n, 0) / 1000.0 - (time.perf_counter() - t0)
+        try:
+            hits, ms = futs[n].result(timeout=max(0.0, left))
+        except _Timeout:
+            futs[n].cancel()      # still queued: never runs; running: finishes and is dropped
+            report[n] = {"status": "dropped", "reason": "budget", "budget_ms": budgets.get(n), "ms": None, "hits": 0}
+            continue
+        except Exception as e:
+            _log.warning("hybrid stage %s failed: %s", n, e)
+            report[n] = {"status": "error", "budget_ms": budgets.get(n), "error": str(e)[:200], "hits": 0}
+            continue
+        report[n] = {"status": "ok", "budget_ms": budgets.get(n), "ms": round(ms, 2), "hits": len(hits)}
+        ranked[n] = hits
+
+    fused = {}
+    for n, hits in ranked.items():
+        for rank, h in enumerate(hits, start=1):
+            key = _key(h["text"])
+            if not key: continue
+            d = fused.get(key)
+            if d is None:
+                d = fused[key] = {"text": h["text"], "rrf": 0.0, "stages": {}}
+                for f in ("prompt", "title", "source_name", "url"):
+                    if h.get(f): d[f] = h[f]
+            d["rrf"] += 1.0 / (RRF_K + rank)
+            d["stages"][n] = {"rank": rank, "score": h["score"]}
+    results = sorted(fused.values(), key=lambda d: -d["rrf"])[:k]
+    for d in results: d["rrf"] = round(d["rrf"], 5)
+    for n, r in report.items():
+        r["contributed"] = sum(1 for d in results if n in d["stages"])
+    return {"results": results, "stages": report, "ms": round((time.perf_counter() - t0) * 1000, 2)}
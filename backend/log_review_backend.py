@@ -7,8 +7,11 @@ import requests
 from flask import Flask, request, jsonify, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 from retrieve_route import setup_retrieve
+import golden_index, corpus_index, retrieval_cache, shared
 from werkzeug.utils import secure_filename
 
+llm = shared.load("llm")     # pooled OpenAI gateway (app/llm.py)
+
 # ========= Config =========
 DB_PATH       = os.path.expanduser('~/tullman/app.db')
 ARCHIVE_PATH  = os.path.expanduser('~/tullman/archive/archive.jsonl')
@@ -94,52 +97,14 @@ def load_rules():
 def strip_html(txt):
     return re.sub(r'<[^>]+>', ' ', txt or '')
 
-def golden_pairs():
-    served = os.path.join(ASSETS_DIR, "golden.json")
-    data = load_json(served, [])
-    rows = []
-    if isinstance(data, list):
-        for d in data:
-            q = (d.get("q") or "").strip()
-            a = (d.get("a") or "").strip()
-            if q: rows.append((q.lower(), a))
-    elif isinstance(data, dict):
-        for q,a in data.items():
-            rows.append((str(q).strip().lower(), str(a)))
-    return rows
-
 def golden_lookup(prompt):
-    p = (prompt or "").strip().lower()
-    pairs = golden_pairs()
-    for q,a in pairs:
-        if q == p: return a
-    for q,a in pairs:
-        if p in q or q in p: return a
-    return None
+    # exact, then contains either way (no fuzzy here)
+    return golden_index.get(os.path.join(ASSETS_DIR, "golden.json")).lookup(prompt, fuzzy=False)
 
 def search_corpus(prompt):
     """Return {'file': path, 'snippet': text} or None."""
     try:
-        p = (prompt or "").strip().lower()
-        best = None
-        for root, _, files in os.walk(CORPUS_DIR):
-            for name in files:
-                if not name.lower().endswith((".txt",".md",".html",".htm",".json",".csv",".mdx",".rst",".yaml",".yml",".ini",".cfg",".conf",".log",".sql",".tsv",".pdf")):
-                    continue
-                fp = os.path.join(root, name)
-                try:
-                    raw = Path(fp).read_text(encoding="utf-8", errors="ignore")
-                except Exception:
-                    try:
-                        with open(fp, "rb") as f: raw = f.read().decode("utf-8", "ignore")
-                    except Exception:
-                        continue
-                text = strip_html(raw)
-                hit = text.lower().find(p)
-                if hit != -1:
-                    start = max(0, hit-200); end = min(len(text), hit+200)
-                    return {"file": fp, "snippet": text[start:end].strip()}
-        return best
+        return corpus_index.get(CORPUS_DIR).search(prompt)
     except Exception:
         return None
 
@@ -241,11 +206,8 @@ def internet_fallback(prompt, budget_sec=60.0):
                 if time.monotonic() - t0 > budget_sec*0.96 or len(hits) >= 5: break
 
     # Build answer: GPT if possible, else stitched snippet
-    api_key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY")
-    if hits and api_key and time.monotonic() - t0 <= budget_sec*0.98:
+    if hits and llm.available() and time.monotonic() - t0 <= budget_sec*0.98:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=api_key)
             # context
             parts = []
             for h in hits:
@@ -261,14 +223,8 @@ def internet_fallback(prompt, budget_sec=60.0):
                 )},
                 {"role":"user","content": ctx},
             ]
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.35,
-                max_tokens=900,
-                timeout=max(5, int(budget_sec - (time.monotonic() - t0)) - 2)
-            )
-            answer = (resp.choices[0].message.content or "").strip()
+            answer = llm.chat(messages, model="gpt-4o-mini", temperature=0.35, max_tokens=900,
+                              timeout=max(5, int(budget_sec - (time.monotonic() - t0)) - 2))
             return {"answer": answer, "source": "internet-howard", "sources": [h["url"] for h in hits]}
         except Exception:
             pass
@@ -293,7 +249,10 @@ def rules_match(patterns, prompt):
 # ========= API =========
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"ok": True, "service": "log_review_backend"})
+    return jsonify({"ok": True, "service": "log_review_backend",
+                    "corpus": corpus_index.get(CORPUS_DIR).stats(),
+                    "retrieval_cache": retrieval_cache.stats(),
+                    "llm": llm.stats()})
 
 @app.route("/api/rules", methods=["GET","PUT"])
 def rules():
@@ -0,0 +1,130 @@
+# /home/kmages/backend/minhash_lsh.py
+# MinHash signatures + LSH banding over token sets (the ones seed_index.tokens builds).
+# query() returns ids whose Jaccard with the query is *likely* above the band threshold;
+# callers verify candidates with exact Jaccard, so a false positive only costs one set op.
+#
+# Defaults: 288 hashes = 96 bands x 3 rows -> S-curve midpoint (1/96)^(1/3) ~ 0.22, well
+# below the 0.42 /retrieve cutoff, so a pair at J=0.42 becomes a candidate ~99.9% of the
+# time (J=0.3 ~93%, J=0.2 ~54%). The midpoint must sit under the cutoff: at 32x4 it sat
+# on it and J=0.42 matches were found only ~64% of the time. More rows = fewer
+# candidates (faster), more bands = better recall near the cutoff; tune with
+# SEED_LSH_BANDS / SEED_LSH_ROWS and bench_seed_lookup.py, which requires full recall.
+import hashlib, os, random
+
+P = (1 << 31) - 1          # Mersenne prime; a*x+b stays < 2**63 for numpy uint64
+M64 = (1 << 64) - 1
+BANDS = int(os.getenv("SEED_LSH_BANDS", "96"))
+ROWS  = int(os.getenv("SEED_LSH_ROWS", "3"))
+SEED = 1871
+MAX_LAYERS = 8             # extended() merges its append layers past this many
+
+try:
+    import numpy as _np
+except Exception:           # pure-python path still works, just slower to build
+    _np = None
+
+_HCACHE = {}
+def token_hash(t):
+    h = _HCACHE.get(t)
+    if h is None:
+        h = int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little") % P
+        if len(_HCACHE) < 500000: _HCACHE[t] = h
+    return h
+
+class MinHashLSH:
+    def __init__(self, bands=BANDS, rows=ROWS, seed=SEED):
+        self.bands, self.rows = bands, rows
+        self.num_perm = bands * rows
+        rnd = random.Random(seed)
+        self.a = [rnd.randrange(1, P) for _ in range(self.num_perm)]
+        self.b = [rnd.randrange(0, P) for _ in range(self.num_perm)]
+        if _np is not None:
+            self._a = _np.array(self.a, dtype=_np.uint64)[:, None]
+            self._b = _np.array(self.b, dtype=_np.uint64)[:, None]
+        self.mult = [rnd.randrange(1, M64) | 1 for _ in range(rows)]
+        self.buckets = [dict() for _ in range(bands)]   # band -> {band_key: [ids]}
+        self.layers = (self.buckets,)                    # buckets + extended() appends
+        self.size = 0
+
+    def signature(self, toks):
+        hs = [token_hash(t) for t in toks]
+        if not hs: return None
+        if _np is not None and len(hs) > 2:
+            x = _np.array(hs, dtype=_np.uint64)[None, :]
+            return ((self._a * x + self._b) % P).min(axis=1).tolist()
+        return [min((a*x + b) % P for x in hs) for a, b in zip(self.a, self.b)]
+
+    def _keys(self, sig):
+        # band key = sum(row_value * mult) mod 2**64; same formula as the numpy bulk path
+        r, m = self.rows, self.mult
+        return [sum(v*k for v, k in zip(sig[i*r:(i+1)*r], m)) & M64 for i in range(self.bands)]
+
+    def _insert(self, idx, sig):
+        for band, key in zip(self.buckets, self._keys(sig)):
+            band.setdefault(key, []).append(idx)
+        self.size += 1
+
+    def add(self, idx, toks):
+        sig = self.signature(toks)
+        if sig is not None: self._insert(idx, sig)
+
+    def add_many(self, items):
+        """Bulk insert [(idx, toks)]; one vectorised pass when numpy is available."""
+        items = [(i, t) for i, t in items if t]
+        if _np is None or not items:
+            for i, t in items: self.add(i, t)
+            return
+        hs = [token_hash(w) for _, t in items for w in t]
+        starts = _np.cumsum([0] + [len(t) for _, t in items[:-1]])
+        x = _np.array(hs, dtype=_np.uint64)
+        for lo in range(0, self.num_perm, 16):      # 16 hash rows at a time keeps memory flat
+            hi = min(lo + 16, self.num_perm)
+            part = _np.minimum.reduceat((self._a[lo:hi] * x + self._b[lo:hi]) % P, starts, axis=1)
+            block = part if lo == 0 else _np.vstack([block, part])
+        sig = block.T.reshape(len(items), self.bands, self.rows)
+        keys = (sig * _np.array(self.mult, dtype=_np.uint64)).sum(axis=2, dtype=_np.uint64)
+        ids = [i for i, _ in items]
+        for b, band in enumerate(self.buckets):
+            for key, i in zip(keys[:, b].tolist(), ids):
+                band.setdefault(key, []).append(i)
+        self.size += len(items)
+
+    def extended(self, items):
+        """Copy with [(idx, toks)] added; self is left untouched for concurrent readers
+        (add / add_many are for building an index before it is shared). The new items go
+        into a small layer of their own next to the shared ones, so an append costs only
+        its own hashing; append layers are folded together past MAX_LAYERS."""
+        out = object.__new__(MinHashLSH)
+        out.__dict__.update(self.__dict__)
+        layer = [dict() for _ in range(self.bands)]
+        for i, t in items:
+            sig = self.signature(t)
+            if sig is None: continue
+            for band, key in zip(layer, self._keys(sig)):
+                band.setdefault(key, []).append(i)
+            out.size += 1
+        layers = self.layers + (layer,)
+        if len(layers) > MAX_LAYERS:      # fold the append layers together; the base stays shared
+            merged = [dict() for _ in range(self.bands)]
+            for lay in layers[1:]:
+                for band, part in zip(merged, lay):
+                    for key, ids in part.items(): band.setdefault(key, []).extend(ids)
+            layers = (layers[0], merged)
+        out.layers = layers
+        return out
+
+    def query(self, toks):
+        sig = self.signature(toks)
+        if sig is None: return set()
+        out = set()
+        keys = self._keys(sig)
+        for layer in self.layers:
+            for band, key in zip(layer, keys):
+                ids = band.get(key)
+                if ids: out.update(ids)
+        return out
+
+    def stats(self):
+        return {"items": self.size, "bands": self.bands, "rows": self.rows,
+                "buckets": sum(len(b) for lay in self.layers for b in lay), "layers": len(self.layers),
+                "numpy": _np is not None}
@@ -0,0 +1,136 @@
+# /home/kmages/backend/retrieval_cache.py
+# Result cache for the retrieval stacks behind /api/retrieve (golden -> corpus -> web
+# fallback) and /retrieve (rules -> seed Jaccard -> tfidf -> hybrid + GPT), so repeated
+# and trivially different prompts ("Who is Howard Tullman?", "who is howard tullman",
+# "Who is Howard Tulllman") are answered once.
+#   key         canon(prompt): NFKC + casefold, apostrophes dropped, other punctuation and
+#               whitespace collapsed to one space, known misspellings fixed (TYPOS)
+#   generation  each cache has a generation() callable returning the versions of what the
+#               answer was built from (file sigs, loaded index generations); an entry from
+#               another generation is a miss, so a worker never needs to hear about an
+#               ingest done by another worker or a CLI rebuild
+#   bounds      LRU over RETRIEVAL_CACHE_SIZE entries per cache, one entry per key (a newer
+#               generation replaces the old one), each valid for RETRIEVAL_CACHE_TTL_S
+#   metrics     hits / misses (expired, stale generation) / evictions and the compute time
+#               the hits saved, per cache; invalidate() also drops everything at once
+# Only answers the caller marks as keepable are stored (not the "give me one detail"
+# fallbacks, not empty results).
+import os, re, threading, time, unicodedata
+from collections import OrderedDict
+
+SIZE  = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+TTL_S = float(os.getenv("RETRIEVAL_CACHE_TTL_S", "900"))
+
+TYPOS = [
+    (re.compile(r"\btul+m+an+\b", re.I), "Tullman"),     # Tulman, Tulllman, Tullmann
+    (re.compile(r"\bhow(?:rad|ad|erd)\b", re.I), "Howard"),
+]
+_APOS = re.compile(r"['‘’`]")
+_PUNCT = re.compile(r"[\W_]+")
+
+def fix_typos(prompt):
+    """The prompt with known misspellings fixed; callers answer this one, so every
+    spelling that shares a key also shares the answer."""
+    s = prompt or ""
+    for rx, rep in TYPOS: s = rx.sub(rep, s)
+    return s
+
+def canon(prompt):
+    s = fix_typos(unicodedata.normalize("NFKC", prompt or "")).casefold()
+    return " ".join(_PUNCT.sub(" ", _APOS.sub("", s)).split())
+
+def file_sig(*paths):
+    """(mtime_ns, size, inode) per path (None when missing): a cheap generation part."""
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p); out.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+class RetrievalCache:
+    def __init__(self, name, generation=None, size=SIZE, ttl_s=TTL_S):
+        self.name, self.generation = name, generation or (lambda: None)
+        self.size, self.ttl_s = size, ttl_s
+        self._d = OrderedDict()        # key -> (generation, expires, value, compute ms)
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "stale": 0, "stored": 0,
+                       "evictions": 0, "invalidations": 0}
+        self.saved_ms = 0.0
+
+    def cached(self, prompt, compute, keep=lambda v: v is not None):
+        """compute() for this prompt, or its stored result from the same generation."""
+        key = canon(prompt)
+        if not key: return compute()
+        gen = self.generation()
+        hit = self._get(key, gen)
+        if hit is not None: return hit
+        t0 = time.perf_counter()
+        val = compute()
+        if keep(val): self._put(key, gen, val, (time.perf_counter() - t0) * 1000)
+        return val
+
+    def lookup(self, prompt):
+        """(stored result or None, generation to store() a fresh one under): for callers
+        that produce the result incrementally (streaming) instead of through cached()."""
+        gen = self.generation()
+        key = canon(prompt)
+        return (self._get(key, gen) if key else None), gen
+
+    def store(self, prompt, gen, val, ms=0.0):
+        key = canon(prompt)
+        if key: self._put(key, gen, val, ms)
+
+    def _get(self, key, gen):
+        now = time.monotonic()
+        with self._lock:
+            e = self._d.get(key)
+            if e is not None:
+                if e[0] == gen and e[1] > now:
+                    self._d.move_to_end(key)
+                    self.counts["hits"] += 1; self.saved_ms += e[3]
+                    return e[2]
+                del self._d[key]
+                self.counts["stale" if e[0] != gen else "expired"] += 1
+            self.counts["misses"] += 1
+        return None
+
+    def _put(self, key, gen, val, ms):
+        with self._lock:
+            self._d[key] = (gen, time.monotonic() + self.ttl_s, val, ms)
+            self._d.move_to_end(key)
+            self.counts["stored"] += 1
+            while len(self._d) > self.size:
+                self._d.popitem(last=False); self.counts["evictions"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._d.clear(); self.counts["invalidations"] += 1
+
+    def stats(self):
+        c = self.counts; looked = c["hits"] + c["misses"]
+        return {"entries": len(self._d), "size": self.size, "ttl_s": self.ttl_s, **c,
+                "hit_rate": round(c["hits"] / looked, 4) if looked else None,
+                "saved_ms": round(self.saved_ms, 1)}
+
+_CACHES = {}
+_LOCK = threading.Lock()
+
+def get(name, generation=None):
+    """The worker's cache called `name` (created with `generation` on first use)."""
+    c = _CACHES.get(name)
+    if c is None:
+        with _LOCK:
+            c = _CACHES.get(name)
+            if c is None:
+                c = _CACHES[name] = RetrievalCache(name, generation)
+    return c
+
+def invalidate(name=None):
+    """Drop cached results (all caches, or one): called by the ingest endpoints."""
+    for n, c in list(_CACHES.items()):
+        if name is None or n == name: c.invalidate()
+
+def stats():
+    return {n: c.stats() for n, c in _CACHES.items()}
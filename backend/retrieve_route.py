@@ -7,7 +7,9 @@ def setup_retrieve(app, db, Example,
        rules (deny/force) -> golden -> corpus -> GPT-internet (Howard) -> openai -> examples -> fallback
        Chips are answered on the front-end from golden.json."""
     from flask import request, jsonify
-    import os, json, re, time, requests, difflib
+    import os, json, re, time, requests
+    import golden_index, corpus_index, retrieval_cache, shared
+    llm = shared.load("llm")     # pooled OpenAI gateway (app/llm.py)
 
     UA = {"User-Agent": "Mozilla/5.0 (compatible; TullmanBackend/1.0; +https://tullman.ai)"}
     HOWARD_URLS = [
@@ -39,78 +41,18 @@ def setup_retrieve(app, db, Example,
                     return True
         return False
 
-    def golden_pairs():
-        data = load_json(golden_path, [])
-        rows = []
-        if isinstance(data, list):
-            for d in data:
-                q = (d.get("q") or "").strip()
-                a = (d.get("a") or "").strip()
-                if q:
-                    rows.append((q.lower(), a))
-        elif isinstance(data, dict):
-            for q, a in data.items():
-                rows.append((str(q).strip().lower(), str(a)))
-        return rows
-
     def golden_lookup(prompt):
         # normalize obvious name spellings
         prompt = (prompt or "").replace("Tulllman","Tullman").replace("Tulman","Tullman")
-        p = prompt.strip().lower()
-
-        pairs = golden_pairs()
-
-        # exact
-        for q, a in pairs:
-            if q == p:
-                return a
-
-        # contains either way
-        for q, a in pairs:
-            if p in q or q in p:
-                return a
-
-        # fuzzy (typo-tolerant)
-        try:
-            gold_qs = [q for q, _ in pairs]
-            best = difflib.get_close_matches(p, gold_qs, n=1, cutoff=0.86)
-            if best:
-                bq = best[0]
-                for q, a in pairs:
-                    if q == bq:
-                        return a
-        except Exception:
-            pass
-
-        return None
-
-    def strip_html(txt):
-        return re.sub(r"<[^>]+>", " ", txt or "")
+        # exact -> contains either way -> fuzzy (typo-tolerant), indexed per golden.json version
+        return golden_index.get(golden_path).lookup(prompt)
 
     def search_corpus(prompt):
         """Return {'file': path, 'snippet': text} or None (best-effort)."""
-        p = (prompt or "").strip().lower()
         try:
-            for root, _, files in os.walk(corpus_dir):
-                for name in files:
-                    if not name.lower().endswith((
-                        ".txt",".md",".html",".htm",".json",".mdx",".rst",".yaml",".yml",
-                        ".ini",".cfg",".conf",".log",".sql",".csv",".tsv",".pdf"
-                    )):
-                        continue
-                    fp = os.path.join(root, name)
-                    try:
-                        raw = open(fp, "r", encoding="utf-8", errors="ignore").read()
-                    except Exception:
-                        continue
-                    text = strip_html(raw)
-                    pos = text.lower().find(p)
-                    if pos != -1:
-                        start = max(0, pos-200); end = min(len(text), pos+200)
-                        return {"file": fp, "snippet": text[start:end].strip()}
+            return corpus_index.get(corpus_dir).search(prompt)
         except Exception:
-            pass
-        return None
+            return None
 
     def fetch_readable(url, timeout=15):
         """Fetch via readability proxy to avoid 403 blocks (no search engine).
@@ -151,13 +93,9 @@ def setup_retrieve(app, db, Example,
 
     def gpt_weave(prompt, hits):
         """Ask GPT to weave a quote/anecdote from the supplied sources (needs OPENAI_API_KEY)."""
-        key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY")
-        if not key:
+        if not llm.available():
             return None
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=key)
-
             parts = []
             for h in hits[:4]:
                 excerpt = h["text"][:1500]
@@ -174,53 +112,27 @@ def setup_retrieve(app, db, Example,
                 )},
                 {"role":"user","content": ctx},
             ]
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini", messages=messages,
-                temperature=0.35, max_tokens=900, timeout=55
-            )
-            return (resp.choices[0].message.content or "").strip()
+            return llm.chat(messages, model="gpt-4o-mini", temperature=0.35, max_tokens=900, timeout=55)
         except Exception:
             return None
 
-    @app.route("/api/retrieve", methods=["POST"])
-    def api_retrieve():
-        data = request.get_json(force=True) or {}
-        prompt = (data.get("prompt") or "").strip()
-        if not prompt:
-            return jsonify({"error": "empty prompt"}), 400
-
-        # 0) rules
-        rules = load_rules()
-        deny_patterns  = rules.get("deny_patterns")  or []
-        force_golden   = rules.get("force_golden")   or []
-        force_examples = rules.get("force_examples") or []
-        deny_message   = rules.get("deny_message")   or "I don’t discuss that. Please ask me something else."
-
-        if rules_match(deny_patterns, prompt):
-            return jsonify({"answer": deny_message, "source":"policy", "session_id": None})
-
-        if rules_match(force_examples, prompt):
-            ex = Example.query.filter(Example.primary_question.ilike(f"%{prompt}%")).first()
-            if ex:
-                return jsonify({"answer": ex.answer, "source":"examples-forced", "session_id": None})
-
-        if rules_match(force_golden, prompt):
-            ans = golden_lookup(prompt)
-            if ans:
-                return jsonify({"answer": ans, "source":"golden-forced", "session_id": None})
+    # golden -> corpus -> web -> openai results, per normalized prompt and source version
+    cache = retrieval_cache.get("api_retrieve", lambda: (
+        retrieval_cache.file_sig(golden_path), corpus_index.get(corpus_dir).generation))
 
+    def answer_chain(prompt):
         # 1) golden
         ans = golden_lookup(prompt)
         if ans:
-            return jsonify({"answer": ans, "source":"golden", "session_id": None})
+            return {"answer": ans, "source":"golden", "session_id": None}
 
         # 2) corpus
         hit = search_corpus(prompt)
         if hit:
-            return jsonify({
+            return {
                 "answer": f"(from corpus: {os.path.basename(hit['file'])}) {hit['snippet']}",
                 "source": "corpus", "session_id": None
-            })
+            }
 
         # 3) GPT-internet (curated Howard sources, no search engine)
         hits = gather_howard_context(prompt, budget_sec=40)
@@ -230,29 +142,55 @@ def setup_retrieve(app, db, Example,
                 # prefer article pages over author/home if deeper links exist
                 urls = [h["url"] for h in hits]
                 srcs = urls[:]
-                return jsonify({
+                return {
                     "answer": woven, "source":"internet-howard",
                     "session_id": None, "sources": srcs
-                })
+                }
 
         # 4) OpenAI plain fallback (if configured)
-        key = os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_APIKEY")
-        if key:
+        if llm.available():
             try:
-                from openai import OpenAI
-                client = OpenAI(api_key=key)
                 messages = [
                     {"role":"system","content":"You are Howard Tullman. Answer crisply in his voice."},
                     {"role":"user","content": prompt}
                 ]
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini", messages=messages,
-                    temperature=0.35, max_tokens=600, timeout=30
-                )
-                answer = (resp.choices[0].message.content or "").strip()
-                return jsonify({"answer": answer, "source":"openai", "session_id": None})
+                answer = llm.chat(messages, model="gpt-4o-mini", temperature=0.35, max_tokens=600, timeout=30)
+                return {"answer": answer, "source":"openai", "session_id": None}
             except Exception:
                 pass
+        return None
+
+    @app.route("/api/retrieve", methods=["POST"])
+    def api_retrieve():
+        data = request.get_json(force=True) or {}
+        prompt = (data.get("prompt") or "").strip()
+        if not prompt:
+            return jsonify({"error": "empty prompt"}), 400
+
+        # 0) rules
+        rules = load_rules()
+        deny_patterns  = rules.get("deny_patterns")  or []
+        force_golden   = rules.get("force_golden")   or []
+        force_examples = rules.get("force_examples") or []
+        deny_message   = rules.get("deny_message")   or "I don’t discuss that. Please ask me something else."
+
+        if rules_match(deny_patterns, prompt):
+            return jsonify({"answer": deny_message, "source":"policy", "session_id": None})
+
+        if rules_match(force_examples, prompt):
+            ex = Example.query.filter(Example.primary_question.ilike(f"%{prompt}%")).first()
+            if ex:
+                return jsonify({"answer": ex.answer, "source":"examples-forced", "session_id": None})
+
+        if rules_match(force_golden, prompt):
+            ans = golden_lookup(prompt)
+            if ans:
+                return jsonify({"answer": ans, "source":"golden-forced", "session_id": None})
+
+        # 1-4) golden, corpus, GPT-internet, OpenAI (cached)
+        out = cache.cached(prompt, lambda: answer_chain(retrieval_cache.fix_typos(prompt)))
+        if out:
+            return jsonify(out)
 
         # 5) Examples fallback
         ex2 = Example.query.filter(Example.primary_question.ilike(f"%{prompt}%")).first()
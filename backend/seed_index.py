@@ -0,0 +1,228 @@
+# /home/kmages/backend/seed_index.py
+# In-memory index over voiceprint_seed.jsonl for the /retrieve example match.
+# Loads the file once, keeps each prompt's token set, and maps token -> example ids
+# so a query only scores examples that share at least one token with it.
+# Reloads on its own when the file's mtime/size changes (admin saves rewrite it).
+#
+# Large pools (golden.jsonl merged in via SEED_INCLUDE_GOLDEN=1) switch candidate
+# generation to MinHash/LSH (minhash_lsh.py) once they pass SEED_LSH_MIN pairs;
+# candidates are still verified with exact Jaccard.
+#
+# Everything a lookup reads lives in one _Snapshot that is never mutated: an append
+# builds an extended copy (sharing untouched postings) and a rewrite builds a fresh one,
+# and either is published with one reference assignment.
+import os, re, json, heapq, hashlib, threading
+from minhash_lsh import MinHashLSH
+
+SEED   = "/home/kmages/backend/voiceprint_seed.jsonl"
+GOLDEN = "/home/kmages/golden.jsonl"
+
+INCLUDE_GOLDEN = os.getenv("SEED_INCLUDE_GOLDEN", "0") in ("1","true","True","yes","on")
+LSH_MIN = int(os.getenv("SEED_LSH_MIN", "5000"))
+
+STOP = set("a an and are as at be but by for from had has have i if in is it its of on or our so than that the their then there these they this to under was were what when where which who why will with you your".split())
+WORD = re.compile(r"[a-z0-9]+")
+
+TAIL = 4096               # bytes before the read offset that must be unchanged for a tail read
+
+THRESHOLD = 0.42          # stricter to avoid bad grabs
+BOOSTS = {"kendall": 0.25}  # rare keyword in both prompt and example
+
+def tokens(x):
+    return frozenset(t for t in WORD.findall((x or "").lower()) if len(t)>2 and t not in STOP)
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+def _tail_hash(path, off):
+    """sha1 of the TAIL bytes before off: an in-place rewrite of a seed file keeps its
+    inode and often its size, so only the content tells it from an append."""
+    if off <= 0: return ""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, off - TAIL))
+            return hashlib.sha1(f.read(min(off, TAIL))).hexdigest()
+    except OSError:
+        return None
+
+def _pair(raw):
+    try:
+        j=json.loads(raw)
+        q=(j.get("prompt") or "").strip()
+        a=(j.get("response") or "").strip()
+        if q and a: return (q,a)
+    except Exception: pass
+    return None
+
+def read_pairs(path, offset=0):
+    """Return (pairs, end_offset). A trailing line without newline is left for next time."""
+    out=[]; end=offset
+    try:
+        with open(path,"rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"): break
+                end += len(raw)
+                ln=raw.decode("utf-8","ignore").strip()
+                if not ln: continue
+                p=_pair(ln)
+                if p: out.append(p)
+    except Exception: pass
+    return out, end
+
+class _Snapshot:
+    """pairs, toks, post, first, lsh for one state of the file. Never mutated after it is
+    built: a reload builds a new one and swaps it in with a single assignment, so a reader
+    that binds self.snap once sees ids, pairs and postings from the same state."""
+    __slots__ = ("pairs", "toks", "post", "first", "lsh")
+
+    def __init__(self, pairs=(), toks=(), post=None, first=None, lsh=None):
+        self.pairs = tuple(pairs)   # (prompt, response) per id
+        self.toks = tuple(toks)     # frozenset per id, same order
+        self.post = post or {}      # token -> (ids) ascending
+        self.first = first or {}    # token set -> first id carrying it
+        self.lsh = lsh              # MinHashLSH once len(pairs) >= lsh_min
+
+    def extended(self, pairs, lsh_min):
+        """New snapshot with pairs appended; untouched postings are shared, not copied."""
+        base = len(self.pairs)
+        toks = [tokens(q) for q, _ in pairs]
+        first, new, added = dict(self.first), [], {}
+        for i, tp in enumerate(toks, start=base):
+            # repeated prompts score identically and the first one wins ties: index it once
+            if tp in first: continue
+            first[tp] = i; new.append((i, tp))
+            for t in tp: added.setdefault(t, []).append(i)
+        post = dict(self.post)
+        for t, ids in added.items(): post[t] = post.get(t, ()) + tuple(ids)
+        lsh = self.lsh
+        if lsh is not None:
+            lsh = lsh.extended(new)
+        elif base + len(pairs) >= lsh_min:
+            lsh = MinHashLSH()
+            lsh.add_many((i, tp) for tp, i in first.items())
+        return _Snapshot(self.pairs + tuple(pairs), self.toks + tuple(toks), post, first, lsh)
+
+class SeedIndex:
+    def __init__(self, path=SEED, threshold=THRESHOLD, lsh_min=LSH_MIN):
+        self.path = path
+        self.threshold = threshold
+        self.lsh_min = lsh_min
+        self._lock = threading.Lock()
+        self._sig = None
+        self._off = 0
+        self._tail = ""
+        self.generation = 0
+        self.snap = _Snapshot()
+
+    @property
+    def pairs(self): return self.snap.pairs
+
+    # ---- build / reload
+    def refresh(self):
+        """Re-read the seed file if it changed since the last load (tail-only when appended)."""
+        sig = _sig(self.path)
+        if sig == self._sig: return False
+        with self._lock:
+            sig = _sig(self.path)
+            if sig == self._sig: return False
+            old = self._sig
+            # tail-only when the bytes already read are still there (golden.jsonl appends);
+            # tuner/restore rewrite voiceprint_seed.jsonl in place: same inode, new content
+            appended = (old is not None and sig is not None and sig[2] == old[2] and sig[1] >= self._off
+                        and _tail_hash(self.path, self._off) == self._tail)
+            pairs, end = read_pairs(self.path, self._off if appended else 0)
+            base = self.snap if appended else _Snapshot()
+            self.snap = base.extended(pairs, self.lsh_min)
+            self._off = end
+            self._tail = _tail_hash(self.path, end)
+            self._sig = sig
+            self.generation += 1
+            return True
+
+    # ---- lookup
+    @staticmethod
+    def _candidates(snap, tq):
+        cand=set()
+        if snap.lsh is not None:
+            cand = snap.lsh.query(tq)
+            for w in BOOSTS:   # boosted pairs can pass with a lower raw Jaccard
+                if w in tq: cand.update(snap.post.get(w, ()))
+            return cand
+        for t in tq:
+            ids=snap.post.get(t)
+            if ids: cand.update(ids)
+        return cand
+
+    def candidates(self, tq):
+        return self._candidates(self.snap, tq)
+
+    @staticmethod
+    def _scored(snap, tq):
+        for i in SeedIndex._candidates(snap, tq):
+            tp=snap.toks[i]
+            inter=len(tq & tp)
+            if not inter: continue
+            jac=inter/(len(tq)+len(tp)-inter)
+            for w,b in BOOSTS.items():
+                if w in tq and w in tp: jac += b
+            yield jac, i
+
+    def score(self, q):
+        """Best (answer, score, id) regardless of threshold."""
+        self.refresh()
+        tq = tokens(q)
+        if not tq: return None, 0.0, -1
+        snap = self.snap
+        sc=0.0; bi=-1
+        for jac, i in self._scored(snap, tq):
+            # lowest id wins ties: same answer the old file-order scan picked
+            if jac>sc or (jac==sc and i<bi): sc=jac; bi=i
+        return (snap.pairs[bi][1] if bi >= 0 else None), sc, bi
+
+    def ranked(self, q, k=10):
+        """Top-k [(score, prompt, answer)] by boosted Jaccard, best first (lowest id wins ties)."""
+        self.refresh()
+        tq = tokens(q)
+        if not tq: return []
+        snap = self.snap
+        top = heapq.nsmallest(k, self._scored(snap, tq), key=lambda x: (-x[0], x[1]))
+        return [(jac, *snap.pairs[i]) for jac, i in top]
+
+    def best(self, q):
+        """Return (answer, score) for the best example; answer is None below threshold."""
+        best, sc, _ = self.score(q)
+        return (best, sc) if sc>=self.threshold else (None, sc)
+
+    def stats(self):
+        snap = self.snap
+        return {"path": self.path, "pairs": len(snap.pairs), "distinct": len(snap.first), "tokens": len(snap.post),
+                "generation": self.generation, "lsh": snap.lsh.stats() if snap.lsh else None}
+
+_INDEXES = {}
+_ILOCK = threading.Lock()
+
+def get(path=SEED):
+    """One shared index per seed file per worker."""
+    ix = _INDEXES.get(path)
+    if ix is None:
+        with _ILOCK:
+            ix = _INDEXES.get(path)
+            if ix is None:
+                ix = _INDEXES[path] = SeedIndex(path)
+    return ix
+
+def pool(path=SEED):
+    return [path, GOLDEN] if INCLUDE_GOLDEN and path != GOLDEN else [path]
+
+def best_match(q, path=SEED):
+    """(answer, score) over the seed file (+ golden.jsonl if enabled); seed wins ties."""
+    best=None; sc=0.0
+    for p in pool(path):
+        a, s, _ = get(p).score(q)
+        if s>sc: best, sc = a, s
+    return (best, sc) if sc>=THRESHOLD else (None, sc)
@@ -0,0 +1,158 @@
+# /home/kmages/backend/semantic_golden.py
+# In-process semantic lookup over the golden FAISS index (admin_reindex_incremental.py
+# writes it: index.faiss + index.pkl {"texts": [...]}, MiniLM 384-d, normalized -> IP = cosine).
+#
+# The SentenceTransformer and the index are loaded once per worker. search() runs the
+# embed + FAISS lookup on a small executor and waits at most SEM_BUDGET_MS; a late
+# answer is dropped and counted, so a slow or cold model never stalls /retrieve. A
+# timed-out query is cancelled if it has not started, and no new one is submitted while
+# SEM_MAX_INFLIGHT are already queued or running: under sustained load the executor
+# never builds a backlog that every later query would time out behind.
+# A changed index.faiss / index.pkl is re-read in the background and swapped in.
+import os, pickle, threading, time, logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as _Timeout
+
+_log = logging.getLogger("semantic_golden")
+
+FAISS_DIR  = os.getenv("SEM_FAISS_DIR", "/home/kmages/just-ken-GPT/golden_faiss_index")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"   # same model the reindexer uses
+BUDGET_MS  = int(os.getenv("SEM_BUDGET_MS", "150"))
+MIN_SCORE  = float(os.getenv("SEM_MIN_SCORE", "0.45"))
+MAX_INFLIGHT = int(os.getenv("SEM_MAX_INFLIGHT", "4"))
+CHECK_SECS = 5.0          # how often to stat the index files
+
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+except Exception:         # stage is simply off without the ML deps
+    faiss = None
+    SentenceTransformer = None
+
+def _sig(d):
+    out=[]
+    for n in ("index.faiss", "index.pkl"):
+        try:
+            st=os.stat(os.path.join(d, n)); out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            return None
+    return tuple(out)
+
+class GoldenSemantic:
+    def __init__(self, faiss_dir=FAISS_DIR, model_name=MODEL_NAME, budget_ms=BUDGET_MS, min_score=MIN_SCORE):
+        self.dir, self.model_name = faiss_dir, model_name
+        self.budget_ms, self.min_score = budget_ms, min_score
+        self.model = None
+        self.state = None         # (index, texts, sig) swapped as one tuple
+        self._lock = threading.Lock()
+        self._loading = False
+        self._checked = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="semgold")
+        self._inflight = 0
+        self.generation = 0
+        self.counts = {"queries": 0, "hits": 0, "over_budget": 0, "not_ready": 0, "errors": 0, "reloads": 0}
+        self.last_ms = 0.0
+
+    @property
+    def enabled(self):
+        return faiss is not None and SentenceTransformer is not None
+
+    # ---- load / reload (background)
+    def _load(self, sig):
+        try:
+            if self.model is None:
+                self.model = SentenceTransformer(self.model_name)
+            from admin_reindex_incremental import tune_search   # nprobe / efSearch / ivf_pq refine
+            index = tune_search(faiss.read_index(os.path.join(self.dir, "index.faiss")))
+            with open(os.path.join(self.dir, "index.pkl"), "rb") as f:
+                texts = (pickle.load(f) or {}).get("texts") or []
+            self.state = (index, texts, sig)
+            self.generation += 1; self.counts["reloads"] += 1
+            _log.info("semantic golden gen=%d vectors=%d texts=%d", self.generation, index.ntotal, len(texts))
+        except Exception as e:
+            self.counts["errors"] += 1
+            _log.warning("semantic golden load failed: %s", e)
+        finally:
+            self._loading = False
+
+    def refresh(self, wait=False):
+        """Kick a reload when the index files changed; returns without waiting by default."""
+        if not self.enabled: return
+        now = time.monotonic()
+        if not wait and now - self._checked < CHECK_SECS and self.state is not None: return
+        self._checked = now
+        sig = _sig(self.dir)
+        if sig is None or (self.state is not None and self.state[2] == sig): return
+        with self._lock:
+            if self._loading: return
+            self._loading = True
+        if wait: self._load(sig)
+        else: threading.Thread(target=self._load, args=(sig,), daemon=True).start()
+
+    # ---- query
+    def _query(self, prompt, k):
+        index, texts, _ = self.state
+        emb = self.model.encode([prompt], show_progress_bar=False, normalize_embeddings=True)
+        D, I = index.search(emb.astype("float32"), k)
+        out=[]
+        for s, i in zip(D[0].tolist(), I[0].tolist()):
+            if 0 <= i < len(texts) and s >= self.min_score:
+                out.append({"text": texts[i], "score": round(float(s), 4), "id": int(i)})
+        return out
+
+    def search(self, prompt, k=3, budget_ms=None):
+        """Top-k golden texts [{"text","score","id"}] or [] if not ready / over budget."""
+        if not self.enabled or not (prompt or "").strip(): return []
+        self.refresh()
+        self.counts["queries"] += 1
+        if self.state is None or self.model is None:
+            self.counts["not_ready"] += 1
+            return []
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        t0 = time.perf_counter()
+        with self._lock:
+            if self._inflight >= MAX_INFLIGHT:
+                self.counts["over_budget"] += 1
+                return []
+            self._inflight += 1
+        fut = self._pool.submit(self._query, prompt, k)
+        fut.add_done_callback(self._finished)
+        try:
+            out = fut.result(timeout=budget)
+        except _Timeout:
+            fut.cancel()          # still queued: never runs; running: finishes and is dropped
+            self.counts["over_budget"] += 1
+            return []
+        except Exception as e:
+            self.counts["errors"] += 1
+            _log.warning("semantic golden query failed: %s", e)
+            return []
+        finally:
+            self.last_ms = (time.perf_counter() - t0) * 1000
+        if out: self.counts["hits"] += 1
+        return out
+
+    def _finished(self, fut):
+        with self._lock: self._inflight -= 1
+
+    def stats(self):
+        st = self.state
+        return {"enabled": self.enabled, "dir": self.dir, "ready": st is not None and self.model is not None,
+                "vectors": st[0].ntotal if st else 0, "generation": self.generation,
+                "budget_ms": self.budget_ms, "min_score": self.min_score, "inflight": self._inflight,
+                "last_ms": round(self.last_ms, 1), **self.counts}
+
+_SEM = None
+_SLOCK = threading.Lock()
+
+def get():
+    """One shared instance per worker; the first call starts loading in the background."""
+    global _SEM
+    if _SEM is None:
+        with _SLOCK:
+            if _SEM is None:
+                _SEM = GoldenSemantic()
+                _SEM.refresh()
+    return _SEM
+
+def search(prompt, k=3, budget_ms=None):
+    return get().search(prompt, k, budget_ms)
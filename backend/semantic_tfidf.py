@@ -0,0 +1,120 @@
+# /home/kmages/backend/semantic_tfidf.py
+# Sparse cosine lookup against semantic_prod.pkl ({"vectorizer","matrix","pairs"} from
+# build_semantic_index.py). Rows are L2-normalised TF-IDF, so one sparse mat-vec
+# (N x V) . (V x 1) gives the cosine of the prompt with every stored question.
+#
+# The pickle is loaded in a background thread when its mtime/size/inode changes (after
+# `build_semantic_index.py --promote`); requests keep using the previous matrix until
+# the new one is ready, and see nothing (not a stall) before the first load finishes.
+import os, pickle, threading, time, logging
+
+_log = logging.getLogger("semantic_tfidf")
+
+SEM_PROD   = "/home/kmages/backend/semantic_prod.pkl"
+MIN_SCORE  = float(os.getenv("SEM_TFIDF_MIN", "0.55"))
+CHECK_SECS = 5.0
+
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+class TfidfIndex:
+    def __init__(self, path=SEM_PROD, min_score=MIN_SCORE):
+        self.path, self.min_score = path, min_score
+        self.state = None          # (vectorizer, csr matrix, pairs, sig)
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._loading = False
+        self._checked = 0.0
+        self.counts = {"queries": 0, "hits": 0, "not_ready": 0, "errors": 0, "reloads": 0}
+        self.load_ms = 0.0
+        self.last_ms = 0.0
+
+    def _load(self, sig):
+        t0 = time.perf_counter()
+        try:
+            with open(self.path, "rb") as f:
+                obj = pickle.load(f)
+            X = obj["matrix"].tocsr()
+            pairs = obj.get("pairs") or []
+            if X.shape[0] != len(pairs): raise ValueError(f"{X.shape[0]} rows vs {len(pairs)} pairs")
+            self.state = (obj["vectorizer"], X, pairs, sig)
+            self.generation += 1; self.counts["reloads"] += 1
+            self.load_ms = (time.perf_counter() - t0) * 1000
+            _log.info("tfidf gen=%d rows=%d vocab=%d in %.0f ms", self.generation, X.shape[0], X.shape[1], self.load_ms)
+        except Exception as e:
+            self.counts["errors"] += 1
+            _log.warning("tfidf load failed: %s", e)
+        finally:
+            self._loading = False
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self._checked < CHECK_SECS and self.state is not None: return
+        self._checked = now
+        sig = _sig(self.path)
+        if sig is None or (self.state is not None and self.state[3] == sig): return
+        with self._lock:
+            if self._loading: return
+            self._loading = True
+        threading.Thread(target=self._load, args=(sig,), daemon=True).start()
+
+    def search(self, q, k=3):
+        """Top-k [(score, prompt, response)] above min_score, best first."""
+        if _np is None or not (q or "").strip(): return []
+        self.refresh()
+        self.counts["queries"] += 1
+        st = self.state
+        if st is None:
+            self.counts["not_ready"] += 1
+            return []
+        vec, X, pairs, _ = st
+        t0 = time.perf_counter()
+        try:
+            qv = vec.transform([q])
+            if not qv.nnz: return []
+            sims = (X @ qv.T).toarray().ravel()
+        except Exception as e:
+            self.counts["errors"] += 1
+            _log.warning("tfidf query failed: %s", e)
+            return []
+        finally:
+            self.last_ms = (time.perf_counter() - t0) * 1000
+        k = min(k, len(sims))
+        top = _np.argpartition(-sims, k - 1)[:k] if k < len(sims) else _np.arange(len(sims))
+        out = [(float(sims[i]), *pairs[i]) for i in top if sims[i] >= self.min_score]
+        out.sort(key=lambda x: -x[0])
+        if out: self.counts["hits"] += 1
+        return out
+
+    def best(self, q):
+        hits = self.search(q, 1)
+        return hits[0][2] if hits else None
+
+    def stats(self):
+        st = self.state
+        return {"path": self.path, "ready": st is not None, "rows": st[1].shape[0] if st else 0,
+                "vocab": st[1].shape[1] if st else 0, "generation": self.generation,
+                "load_ms": round(self.load_ms, 1), "last_ms": round(self.last_ms, 2),
+                "min_score": self.min_score, **self.counts}
+
+_IX = None
+_ILOCK = threading.Lock()
+
+def get(path=SEM_PROD):
+    """One shared index per worker; the first call starts the background load."""
+    global _IX
+    if _IX is None:
+        with _ILOCK:
+            if _IX is None:
+                _IX = TfidfIndex(path)
+                _IX.refresh()
+    return _IX
@@ -0,0 +1,26 @@
+# /home/kmages/backend/shared.py
+# Stdlib-only modules of the main tree (~/tullman/app: rule_engine.py, llm.py) for this
+# directory, which has its own app.py and so cannot `import app.x`. Each file is loaded
+# by path once per process and registered as tullman_<name>, so every module here that
+# asks for it gets the same instance (one rule registry, one pooled LLM client).
+import importlib.util, sys
+from pathlib import Path
+
+ROOTS = (Path(__file__).resolve().parents[1] / "app", Path.home() / "tullman" / "app")
+
+def load(name):
+    key = f"tullman_{name}"
+    mod = sys.modules.get(key)
+    if mod is not None: return mod
+    for d in ROOTS:
+        p = d / f"{name}.py"
+        if p.exists():
+            spec = importlib.util.spec_from_file_location(key, p)
+            mod = importlib.util.module_from_spec(spec)
+            sys.modules[key] = mod
+            try:
+                spec.loader.exec_module(mod)
+            except BaseException:
+                sys.modules.pop(key, None); raise
+            return mod
+    raise ImportError(f"app/{name}.py not found")
@@ -2,7 +2,7 @@
 from flask import Flask, jsonify, request, send_from_directory
 from pathlib import Path
 from collections import OrderedDict, deque
-import os, json, re, unicodedata, uuid
+import os, json, re, unicodedata, uuid, importlib.util
 
 BASE     = Path.home() / "tullman"
 FRONTEND = BASE / "frontend"
@@ -13,38 +13,27 @@ CONTENT  = DATA / "content" / "content.jsonl"
 app = Flask(__name__)
 
 # ---------- tiny corpus loader ----------
-def iter_jsonl(path: Path, limit: int | None = None) -> list[dict]:
-    if not path.exists(): return []
-    out=[]
-    with path.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            try:
-                out.append(json.loads(line))
-                if limit and len(out) >= limit: break
-            except: pass
-    return out
+def iter_jsonl(path: Path, limit: int | None = None):
+    """First `limit` rows as a compact corpus_store.CorpusStore (rows read like dicts)."""
+    return corpus_store.load(path, limit)
 
 def normalize(s: str) -> str:
     if not s: return ""
     s = unicodedata.normalize("NFKD", s)
     return "".join(ch for ch in s if ord(ch) < 0x0300).lower()
 
+# shared BM25 engine and compact corpus store from the main tree (this file is app.py, so load them by path)
+def _load_module(name, fname):
+    spec = importlib.util.spec_from_file_location(name, BASE / "app" / fname)
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+bm25 = _load_module("tullman_bm25", "bm25.py")
+corpus_store = _load_module("tullman_corpus_store", "corpus_store.py")
+
 def search_corpus(prompt: str, k: int = 6) -> tuple[str, list[dict]]:
     """Return concatenated context + URL-only sources (if present in JSON)."""
-    rows = iter_jsonl(CONTENT, limit=50000)
-    q = normalize(prompt)
-    terms = set(re.findall(r"[a-zA-Z]{3,}", q))
-    scored = []
-    for r in rows:
-        txt = (r.get("text") or "")
-        low = txt.lower()
-        # prefer Tullman material
-        base = 5 if "tullman" in ((r.get("source_name") or "") + " " + low) else 0
-        sc = base + sum(low.count(t) for t in terms)
-        if sc > 0:
-            scored.append((sc, r))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = [r for _, r in scored[:k]]
+    top = [r for _, r in bm25.corpus(CONTENT, limit=50000, prior=bm25.tullman_prior, load=corpus_store.load).search(prompt, k)]
 
     ctx = []
     sources = []
@@ -121,11 +110,7 @@ CONTEXT:
 # ---------- routes ----------
 @app.get("/health")
 def health():
-    rows = iter_jsonl(CONTENT, limit=500000)
-    counts={}
-    for r in rows:
-        t=r.get("source_type","unknown")
-        counts[t]=counts.get(t,0)+1
+    counts = iter_jsonl(CONTENT, limit=500000).count("source_type", "unknown")
     return jsonify({"ok": True, "total": sum(counts.values()), "counts": counts})
 
 @app.get("/assets/<path:fname>")
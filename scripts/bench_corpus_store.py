@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Memory per corpus row: content.jsonl held as a list of dicts (what load_rows/_load_rows/
+# _load_corpus/iter_jsonl kept) vs app/corpus_store.py, measured with tracemalloc, plus
+# load time, a row-by-row equality check and the cost of reading fields through a view:
+# get_us/row reads text, source_name and url once; text3_us/row reads text three times from
+# one view, as the snippet, public-flag and sentence code do for a search hit.
+# Rows come from --jsonl when given, else --rows synthetic ingest-shaped rows (1200-char
+# chunks, flags and sentence offsets stored, ~8 chunks per source).
+# Usage: python scripts/bench_corpus_store.py [--jsonl PATH] [--rows 100000]
+import argparse, gc, hashlib, json, random, sys, tempfile, time, tracemalloc, uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import bm25, corpus_store, public_flags, sentences   # noqa: E402
+
+WORDS = ("we ship small wins then scale what works founders hire for speed and candor chicago teams "
+         "measure honestly markets reward execution over theater the board wants results tullman "
+         "1871 kendall college operators investors growth").split()
+
+def synthetic(path, n, rnd=random.Random(3)):
+    with open(path, "w", encoding="utf-8") as f:
+        src, i = 0, 0
+        while i < n:
+            title = " ".join(rnd.choice(WORDS) for _ in range(4)).title() + f" {src}"
+            url = f"https://tullman.blogspot.com/2019/{src % 12 + 1:02d}/post-{src}.html" if src % 3 else None
+            for part in range(1, rnd.randint(4, 12) + 1):
+                text = " ".join(" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(6, 22))).capitalize() + "."
+                                for _ in range(12))[:1200]
+                h = hashlib.sha256(f"{title}::{part}::{text[:400]}".encode()).hexdigest()
+                rec = {"id": str(uuid.UUID(int=rnd.getrandbits(128))), "title": f"{title} chunk {part}",
+                       "source_path": url or f"/data/docs/{title}.pdf", "source_name": title,
+                       "source_type": "blog" if url else "pdf", "part": f"chunk_{part}", "text": text,
+                       "tags": ["tullman_ai"], "hash": h}
+                if url: rec["url"] = url
+                f.write(json.dumps(sentences.annotate(public_flags.annotate(rec)), ensure_ascii=False) + "\n")
+                i += 1
+                if i >= n: break
+            src += 1
+
+def measure(fn):
+    gc.collect()
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0            # timed without tracemalloc's per-allocation overhead
+    gc.collect(); tracemalloc.start()
+    obj = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size, dt
+
+def read_fields(rows):
+    t0 = time.perf_counter()
+    for r in rows:
+        r.get("text"); r.get("source_name"); r.get("url")
+    return (time.perf_counter() - t0) * 1e6 / max(1, len(rows))
+
+def read_text3(rows):
+    t0 = time.perf_counter()
+    for r in rows:
+        r.get("text"); r.get("text"); r.get("text")
+    return (time.perf_counter() - t0) * 1e6 / max(1, len(rows))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jsonl")
+    ap.add_argument("--rows", type=int, default=100000)
+    a = ap.parse_args()
+    tmp = None
+    if a.jsonl:
+        path = Path(a.jsonl)
+    else:
+        tmp = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False); tmp.close()
+        path = Path(tmp.name); synthetic(path, a.rows)
+    try:
+        dicts, d_bytes, d_s = measure(lambda: bm25.read_rows(path, a.rows))
+        store, s_bytes, s_s = measure(lambda: corpus_store.load(path, a.rows))
+        n = len(dicts)
+        strip = lambda r: {k: v for k, v in r.items() if v is not None}
+        bad = sum(strip(d) != {k: (list(v) if k in corpus_store.SENT_COLS else v) for k, v in r.items()}
+                  for d, r in zip(dicts, store))
+        print(f"[corpus] {n} rows, {path.stat().st_size / n:.0f} bytes/row of JSONL; "
+              f"rows differing after round trip: {bad}; interned {store.stats()['interned']}")
+        print(f"{'variant':16} {'bytes/row':>10} {'total_MB':>9} {'load_s':>7} {'get_us/row':>11} {'text3_us/row':>13}")
+        for name, rows, b, s in (("list of dicts", dicts, d_bytes, d_s), ("corpus_store", store, s_bytes, s_s)):
+            print(f"{name:16} {b / n:10.0f} {b / 2**20:9.1f} {s:7.2f} {read_fields(rows):11.2f} {read_text3(rows):13.2f}")
+        print(f"reduction {d_bytes / s_bytes:.1f}x")
+    finally:
+        if tmp: Path(tmp.name).unlink()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# One chunk by hash / id / (source_name, part): a scan of content.jsonl from the start (what
+# ingest dedupe and chunk fetches had to do) vs the app/offset_index.py sidecar (mmap probe
+# + one pread). Also times the sidecar rebuild, an append-only update and verify.
+# Usage: python scripts/bench_offset_index.py [--jsonl PATH] [--rows 50000] [--lookups 200]
+import argparse, json, random, shutil, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import offset_index   # noqa: E402
+from bench_corpus_store import synthetic   # noqa: E402
+
+def scan(path, field, value):
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try: r = json.loads(line)
+            except Exception: continue
+            if r.get(field) == value: return r
+    return None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jsonl")
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--lookups", type=int, default=200)
+    a = ap.parse_args()
+    tmpdir = Path(tempfile.mkdtemp())
+    try:
+        path = tmpdir / "content.jsonl"
+        if a.jsonl: shutil.copyfile(a.jsonl, path)
+        else: synthetic(path, a.rows)
+        lines = path.read_text(encoding="utf-8").splitlines()
+        head, tail = lines[:-1000], lines[-1000:]
+        path.write_text("\n".join(head) + "\n", encoding="utf-8")
+        built = offset_index.rebuild(path)
+        with path.open("a", encoding="utf-8") as f: f.write("\n".join(tail) + "\n")
+        upd = offset_index.update(path)
+        ver = offset_index.verify(path)
+        print(f"[index] rebuild {built['secs']}s for {built['entries']} keys; update of 1000 rows {upd['secs']}s; "
+              f"verify ok={ver['ok']} in {ver['secs']}s")
+        rnd = random.Random(11)
+        rows = [json.loads(l) for l in rnd.sample(lines, min(a.lookups, len(lines)))]
+        ix = offset_index.OffsetIndex(path)
+        n_scan = max(1, len(rows) // 20)
+        t0 = time.perf_counter()
+        for r in rows[:n_scan]: scan(path, "hash", r["hash"])
+        t_scan = (time.perf_counter() - t0) * 1e6 / n_scan
+        t0 = time.perf_counter()
+        ok = sum(ix.by_hash(r["hash"]) == r for r in rows)
+        t_ix = (time.perf_counter() - t0) * 1e6 / len(rows)
+        t0 = time.perf_counter()
+        for r in rows: ix.lookup("src", f"{r['source_name']}\x1f{r['part']}")
+        t_lk = (time.perf_counter() - t0) * 1e6 / len(rows)
+        print(f"{'variant':28} {'us/lookup':>11}")
+        print(f"{'scan from start (by hash)':28} {t_scan:11.0f}")
+        print(f"{'sidecar get (by hash)':28} {t_ix:11.1f}   ({ok}/{len(rows)} rows identical)")
+        print(f"{'sidecar offset only (src)':28} {t_lk:11.1f}")
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Microbenchmark: per-module prompt scans (lowercase + re.search / any(k in q) per rule, as
+# _R_BLOCK/_ident/_lifespan_stub, intent.ROUTES, REFLECTIVE_TOPICS and is_political did)
+# vs one app/rule_engine.py pass, uncached and memoized.
+# Usage: python scripts/bench_rule_engine.py [--rounds 200]
+import argparse, ast, re, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from app import rule_engine, intent, policy   # noqa: E402  (importing registers their rules)
+try:
+    from app import composer                   # noqa: F401  (reflective topics; needs bs4)
+except Exception as e:
+    print(f"[warn] composer not loaded ({e.__class__.__name__}); reflective topics skipped")
+
+PROMPTS = [
+    "Who is Howard Tullman?", "Why do I need an AI strategy for my company?",
+    "How has Kendall changed under your leadership?", "Explain relativity to a ten year old",
+    "How long do dogs live?", "What do you believe about the afterlife?",
+    "What is the meaning of life?", "How do you define success?",
+    "What do you think about the election and Gaza?", "Tell me about 1871 and the Chicago startup scene",
+    "What advice would you give your younger self about hiring and firing?",
+    "Give me a 12-month roadmap for automation in a mid-size logistics business with thin margins " * 3,
+]
+
+def backend_tables():
+    # rule tables from backend/app.py (read with ast; importing it needs Flask)
+    want = {"BLOCK", "IDENTITY_OVERRIDES", "TOPIC_OVERRIDES", "LIFESPAN_STUBS"}
+    out = {}
+    for node in ast.parse((ROOT / "backend" / "app.py").read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and getattr(node.targets[0], "id", None) in want:
+            val = ast.literal_eval(node.value)
+            for row in ([val] if node.targets[0].id == "BLOCK" else val):
+                out[row[0]] = row[1]
+    return out
+
+def legacy_scan(rules, text):
+    # what each consumer did on its own: lowercase again, then scan its own table
+    hit = set()
+    for rid, (kind, v) in rules.items():
+        t = (text or "").lower()
+        if kind == "re":
+            if re.search(v, t, re.I): hit.add(rid)
+        elif any(k in t for k in v):
+            hit.add(rid)
+    return frozenset(hit)
+
+def bench(fn, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for p in PROMPTS: fn(p)
+    return (time.perf_counter() - t0) * 1e6 / (rounds * len(PROMPTS))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=200)
+    a = ap.parse_args()
+    rule_engine.register(backend_tables())
+    eng = rule_engine.engine()
+    rules = {rid: rule_engine._registry[rid] for rid in eng.ids if rid in rule_engine._registry}
+    bad = [p for p in PROMPTS if legacy_scan(rules, p) != eng._scan(p.lower())]
+    print(f"[rules] {eng.stats()['rules']} rules, {len(eng.kw_ids)} keywords, {len(eng.regex)} regex; "
+          f"mismatches vs legacy: {len(bad)}")
+    legacy = bench(lambda p: legacy_scan(rules, p), a.rounds)
+    cold = bench(lambda p: eng._scan(p.lower()), a.rounds)
+    warm = bench(eng.match, a.rounds)
+    print(f"{'variant':24} {'us/prompt':>10} {'speedup':>8}")
+    for name, us in (("per-module scans", legacy), ("engine (one pass)", cold), ("engine (memoized)", warm)):
+        print(f"{name:24} {us:10.1f} {legacy / us:7.1f}x")
+
+if __name__ == "__main__":
+    main()
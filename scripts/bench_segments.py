@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Memory per worker: every worker loading content.jsonl into its own corpus store + BM25
+# index (what load_rows/_load_rows did per process) vs all workers mapping one
+# app/segments.py segment. Each worker loads, answers a few searches and touches every row,
+# then reports its private bytes and PSS (shared pages split across the processes that map
+# them) from /proc/self/smaps_rollup.
+# Usage: python scripts/bench_segments.py [--jsonl PATH] [--rows 50000] [--workers 4]
+import argparse, multiprocessing as mp, shutil, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import bm25, corpus_store, segments   # noqa: E402
+from bench_corpus_store import synthetic   # noqa: E402
+
+QUERIES = ("founders hire for speed", "kendall college growth", "tullman chicago teams")
+
+def _mem():
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            k, _, v = line.partition(":")
+            if k in ("Rss", "Pss", "Private_Clean", "Private_Dirty"): out[k] = int(v.split()[0]) * 1024
+    return out
+
+def worker(mode, path, rows, start, q):
+    base = _mem()
+    if mode == "in-process":
+        ix = bm25.BM25Index(corpus_store.load(path, rows))
+    else:
+        ix = segments.index(path, rows)
+    hits = [len(ix.search(x, 8)) for x in QUERIES]
+    chars = sum(len(r.get("text") or "") for r in ix.rows)
+    start.wait()                      # every worker is loaded before anyone measures
+    m = _mem()
+    q.put((m["Pss"] - base["Pss"], m["Private_Clean"] + m["Private_Dirty"] - base["Private_Clean"] - base["Private_Dirty"],
+           sum(hits), chars))
+    start.wait()
+
+def run(mode, path, rows, n):
+    ctx = mp.get_context("fork")
+    start, q = ctx.Barrier(n), ctx.Queue()
+    ps = [ctx.Process(target=worker, args=(mode, path, rows, start, q)) for _ in range(n)]
+    t0 = time.perf_counter()
+    for p in ps: p.start()
+    res = [q.get() for _ in ps]
+    for p in ps: p.join()
+    return res, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jsonl")
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--workers", type=int, default=4)
+    a = ap.parse_args()
+    tmpdir = Path(tempfile.mkdtemp())
+    try:
+        path = tmpdir / "content.jsonl"
+        if a.jsonl: shutil.copyfile(a.jsonl, path)
+        else: synthetic(path, a.rows)
+        built = segments.build(path, a.rows)
+        print(f"[segment] {built['rows']} rows, {built['terms']} terms, {built['bytes'] / 2**20:.1f} MB, "
+              f"built in {built['secs']} s")
+        print(f"{'variant':12} {'workers':>7} {'PSS_MB/worker':>14} {'private_MB/worker':>18} {'sum_PSS_MB':>11} {'wall_s':>7}")
+        for mode in ("in-process", "segment"):
+            for n in (1, a.workers):
+                res, dt = run(mode, path, a.rows, n)
+                pss = sum(r[0] for r in res); priv = sum(r[1] for r in res)
+                print(f"{mode:12} {n:7d} {pss / n / 2**20:14.1f} {priv / n / 2**20:18.1f} {pss / 2**20:11.1f} {dt:7.1f}")
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
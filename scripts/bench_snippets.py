@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Snippet assembly on 12-chunk sets: the per-request regex split + merged_low substring
+# dedupe server_stable.coalesce_snippets / composer._facts_from used to do, vs a merge over
+# sentence offsets/hashes stored at ingest (app/sentences.py).
+# Chunks come from content.jsonl when present, else from synthetic overlapping chunks.
+# Usage: python scripts/bench_snippets.py [--jsonl PATH] [--sets 500] [--chunks 12]
+import argparse, copy, json, random, re, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import sentences   # noqa: E402
+
+SPLIT = re.compile(r'(?<=[.!?])\s+')
+CLEAN_START = re.compile(r'^[\"“\(\'\[]?[A-Z0-9]')
+
+def legacy_coalesce(rows, max_sent=12):
+    out=[]; seen=set(); merged_low=""
+    for r in rows:
+        txt=(r.get("text") or "").strip().replace("\n"," ")
+        for s in [re.sub(r"\s+"," ",x).strip() for x in SPLIT.split(txt)]:
+            if not s: continue
+            if not out and not re.match(r'^[\"“\(\'\[]?[A-Z0-9]', s): continue
+            key=s.lower()
+            if key in seen or (len(merged_low)>=50 and key in merged_low): continue
+            seen.add(key); out.append(s); merged_low=(merged_low+" "+key).strip()
+            if len(out)>=max_sent: break
+        if len(out)>=max_sent: break
+    return out
+
+def legacy_facts(rows, max_facts=8):
+    facts=[]; seen=set()
+    for r in rows:
+        for s in re.split(r'(?<=[.!?])\s+', r.get("text") or "")[:2]:
+            s=s.strip()
+            if not s or s in seen: continue
+            seen.add(s); facts.append(s)
+            if len(facts)>=max_facts: return facts
+    return facts
+
+def facts(rows, max_facts=8):
+    out=[]; seen=set()
+    for r in rows:
+        t=r.get("text") or ""
+        for a,b,_ in sentences.spans(r)[:2]:
+            s=t[a:b]
+            if s in seen: continue
+            seen.add(s); out.append(s)
+            if len(out)>=max_facts: return out
+    return out
+
+def synthetic(n_docs=200, rnd=random.Random(5)):
+    words="we ship small wins then scale what works founders hire for speed and candor chicago teams " \
+          "measure honestly markets reward execution over theater the board wants results".split()
+    rows=[]
+    for d in range(n_docs):
+        text=" ".join(" ".join(rnd.choice(words) for _ in range(rnd.randint(6,24))).capitalize()+rnd.choice(".!?")
+                      for _ in range(60))
+        at, i = 0, 1
+        while at < len(text):                     # 1200-char chunks, 120-char overlap
+            rows.append({"source_name": f"doc{d}", "part": f"chunk_{i}", "text": text[at:at+1200]})
+            at += 1080; i += 1
+    return rows
+
+def timed(fn, sets, rounds=3):
+    best=None
+    for _ in range(rounds):
+        t0=time.perf_counter()
+        for s in sets: fn(s)
+        dt=(time.perf_counter()-t0)*1e6/len(sets)
+        best=dt if best is None else min(best, dt)
+    return best
+
+def main():
+    ap=argparse.ArgumentParser()
+    ap.add_argument("--jsonl")
+    ap.add_argument("--sets", type=int, default=500)
+    ap.add_argument("--chunks", type=int, default=12)
+    a=ap.parse_args()
+    if a.jsonl:
+        with open(a.jsonl, encoding="utf-8") as f:
+            rows=[r for r in map(json.loads, f) if isinstance(r, dict) and r.get("text")]
+    else:
+        rows=synthetic()
+    rnd=random.Random(7)
+    sets=[]
+    for _ in range(a.sets):                       # consecutive chunks of one source, like FTS hits
+        i=rnd.randrange(max(1, len(rows)-a.chunks))
+        sets.append([{k: r[k] for k in ("source_name","part","text") if k in r} for r in rows[i:i+a.chunks]])
+    t_seg=time.perf_counter()
+    pre=[[sentences.annotate(copy.copy(r)) for r in s] for s in sets]          # ingest-time work
+    t_seg=(time.perf_counter()-t_seg)*1e6/(len(sets)*a.chunks)
+    same=sum(legacy_coalesce(s)==sentences.merge(p, 12, CLEAN_START.match) for s,p in zip(sets,pre))
+    print(f"[sets] {len(sets)} x {a.chunks} chunks; segmentation at ingest {t_seg:.1f} us/chunk; "
+          f"identical coalesce output {same}/{len(sets)}")
+    print(f"{'step':22} {'legacy_us':>10} {'stored_us':>10} {'speedup':>8}")
+    for name, old, new in (("coalesce (12 sent)", lambda s: legacy_coalesce(s), lambda p: sentences.merge(p, 12, CLEAN_START.match)),
+                           ("facts (8)", lambda s: legacy_facts(s), lambda p: facts(p))):
+        lo, ne = timed(old, sets), timed(new, pre)
+        print(f"{name:22} {lo:10.1f} {ne:10.1f} {lo/ne:7.1f}x")
+
+if __name__ == "__main__":
+    main()
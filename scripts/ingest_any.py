@@ -11,7 +11,7 @@ Writes:
 """
 import argparse, json, uuid, hashlib, zipfile, re, sys
 from pathlib import Path
-from typing import Iterable, List, Set
+from typing import Iterable, List
 
 # Lightweight parsers
 from bs4 import BeautifulSoup
@@ -20,6 +20,9 @@ from docx import Document
 from pptx import Presentation
 import chardet
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import fts_index, offset_index, public_flags, sentences   # content.db/.idx update + row flags/sentences
+
 BASE = Path("~/tullman").expanduser()
 RAW_DIR = BASE / "data" / "raw"
 CONTENT_JSONL = BASE / "data" / "content" / "content.jsonl"
@@ -32,20 +35,15 @@ def sha(s:str)->str:
     return hashlib.sha256(s.encode("utf-8","ignore")).hexdigest()
 
 def write_jsonl(path:Path, obj:dict):
+    if path == CONTENT_JSONL:   # public-safety flags + sentence offsets stored with the row
+        public_flags.annotate(obj); sentences.annotate(obj)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "a", encoding="utf-8") as f:
+    with public_flags.open_append(path) as f:   # shared lock vs. public_flags backfill
         f.write(json.dumps(obj, ensure_ascii=False) + "\n")
 
-def load_seen(path:Path)->Set[str]:
-    seen=set()
-    if path.exists():
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    j=json.loads(line); h=j.get("hash")
-                    if h: seen.add(h)
-                except: pass
-    return seen
+def load_seen(path:Path):
+    # hashes already in content.jsonl come from the offset sidecar (only the tail is read)
+    return offset_index.Seen(path)
 
 def read_bytes(p:Path)->bytes:
     with open(p, "rb") as f: return f.read()
@@ -176,7 +174,7 @@ def scan_dir(d:Path)->Iterable[Path]:
     for p in d.rglob("*"):
         if p.is_file(): yield p
 
-def process_file(p:Path, seen:Set[str], counters:dict, args):
+def process_file(p:Path, seen:offset_index.Seen, counters:dict, args):
     ext = p.suffix.lower()
     base_title = p.name
 
@@ -308,6 +306,9 @@ def main():
 
     print(f"[done] new content entries: {counters['content']}", flush=True)
     print(f"[done] media files harvested: {counters['media']}", flush=True)
+    if counters["content"]:
+        print(f"[fts] {fts_index.try_update(CONTENT_JSONL)}", flush=True)
+        print(f"[offsets] {offset_index.try_update(CONTENT_JSONL)}", flush=True)
     print(f"[paths] content: {CONTENT_JSONL}", flush=True)
     print(f"[paths] media manifest: {MEDIA_MANIFEST}", flush=True)
     print(f"[paths] media dir: {MEDIA_DIR}", flush=True)
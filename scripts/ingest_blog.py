@@ -5,6 +5,9 @@ from pathlib import Path
 import feedparser
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import fts_index, offset_index, public_flags, sentences   # content.db/.idx update + row flags/sentences
+
 BASE = Path.home() / "tullman"
 OUT  = BASE / "data" / "content" / "content.jsonl"
 TAG  = "tullman_blog"
@@ -33,15 +36,8 @@ def chunk(text:str, max_chars=1200, overlap=120):
     return out
 
 def load_seen(path:Path):
-    seen=set()
-    if path.exists():
-        with open(path,"r",encoding="utf-8") as f:
-            for line in f:
-                try:
-                    j=json.loads(line); h=j.get("hash")
-                    if h: seen.add(h)
-                except: pass
-    return seen
+    # hashes already in content.jsonl come from the offset sidecar (only the tail is read)
+    return offset_index.Seen(path)
 
 def fetch_page(start_index:int, page_size:int)->feedparser.FeedParserDict:
     feed=f"https://tullman.blogspot.com/feeds/posts/default?alt=atom&start-index={start_index}&max-results={page_size}"
@@ -57,7 +53,7 @@ def main():
     seen=load_seen(OUT)
 
     new=0; total=0
-    with open(OUT,"a",encoding="utf-8") as out:
+    with public_flags.open_append(OUT) as out:   # shared lock vs. public_flags backfill
         for page in range(args.max_pages):
             start=page*args.page_size+1
             d=fetch_page(start,args.page_size)
@@ -76,7 +72,7 @@ def main():
                     h=sha(f"{url}::chunk::{i}::{ck[:400]}")
                     if h in seen: continue
                     seen.add(h)
-                    out.write(json.dumps({
+                    out.write(json.dumps(sentences.annotate(public_flags.annotate({
                         "id": h,
                         "title": f"{title} chunk {i}",
                         "source_path": url,        # canonical URL
@@ -89,10 +85,13 @@ def main():
                         "url": url,                # public can cite this
                         "tags": ["tullman_ai", TAG],
                         "hash": h
-                    }, ensure_ascii=False)+"\n")
+                    })), ensure_ascii=False)+"\n")
                     new+=1
             if len(entries) < args.page_size:
                 break
     print(f"[blog] scanned {total} posts, added {new} chunks -> {OUT}")
+    if new:
+        print(f"[fts] {fts_index.try_update(OUT)}")
+        print(f"[offsets] {offset_index.try_update(OUT)}")
 if __name__=="__main__":
     main()
@@ -9,6 +9,10 @@ from docx import Document
 from pptx import Presentation
 from bs4 import BeautifulSoup
 import chardet
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import offset_index, public_flags, sentences
 
 def sha(s): return hashlib.sha256(s.encode("utf-8","ignore")).hexdigest()
 def rd(p): return open(p,"rb").read()
@@ -37,17 +41,13 @@ def chunk(s, maxc=1200, ov=120):
         out.append(s[i:cut].strip()); i=max(cut-ov,cut)
     return [x for x in out if x]
 def write_jsonl(path, obj):
+    if "text" in obj:   # content rows carry public-safety flags + sentence offsets
+        public_flags.annotate(obj); sentences.annotate(obj)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path,"a",encoding="utf-8") as f: f.write(json.dumps(obj,ensure_ascii=False)+"\n")
+    with public_flags.open_append(path) as f: f.write(json.dumps(obj,ensure_ascii=False)+"\n")   # shared lock vs. backfill
 def load_seen(path):
-    seen=set()
-    if path.exists():
-        for line in open(path,"r",encoding="utf-8"):
-            try:
-                h=json.loads(line).get("hash"); 
-                if h: seen.add(h)
-            except: pass
-    return seen
+    # hashes already in content.jsonl come from the offset sidecar (only the tail is read)
+    return offset_index.Seen(path)
 def harvest_ppt_media(pptx_path, media_dir, manifest):
     saved=0
     with zipfile.ZipFile(str(pptx_path),"r") as z:
@@ -147,6 +147,7 @@ def main():
                     "hash": h
                 }); newc+=1
     print(f"[done] new content: {newc} | media saved: {media_ct}")
+    if newc: print(f"[offsets] {offset_index.try_update(content)}")
     print(f"[paths] {content}\n[paths] {manifest}\n[paths] {media}")
 
 if __name__=="__main__":
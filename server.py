@@ -8,9 +8,10 @@ from collections import deque, OrderedDict
 from fastapi.responses import FileResponse
 from fastapi import UploadFile, File
 from app.tuning import router as tune_router
+from app import bm25, corpus_store, llm, segments, semantic_cache, sse
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # --------- Config ---------
@@ -65,37 +66,21 @@ def get_session(sid: Optional[str]) -> Tuple[str, deque]:
     return sid, hist
 
 # --------- JSONL retriever ---------
-_ROWS: Optional[List[Dict]] = None
-def load_rows(limit:int=20000)->List[Dict]:
-    global _ROWS
-    if _ROWS is not None: return _ROWS
-    rows=[]
-    if CONTENT.exists():
-        with CONTENT.open("r", encoding="utf-8") as f:
-            for i,line in enumerate(f):
-                t=line.strip()
-                if not t: continue
-                try: rows.append(json.loads(t))
-                except: pass
-                if i>=limit: break
-    _ROWS=rows; log.info("jsonl rows=%d (%s)", len(rows), CONTENT)
-    return _ROWS
-
-def _score(q: str, text: str)->int:
-    ql=(q or "").lower(); tl=(text or "").lower()
-    if not tl: return 0
-    terms=set(re.findall(r"[a-z0-9]{4,}", ql))
-    return sum(tl.count(t) for t in terms)
+# Rows and BM25 postings live in a segment file every worker maps read-only (app/segments.py);
+# rows appended to content.jsonl are tail-read into it, a rewrite maps a new generation.
+ROWS_LIMIT = 20000
+def load_rows(limit:int=ROWS_LIMIT)->corpus_store.CorpusStore:
+    """content.jsonl rows of the live segment (compact, dict-style rows)."""
+    return segments.corpus(CONTENT, limit+1)
+
+def bm25_index()->bm25.BM25Index:
+    """BM25 over the live segment; the postings are shared by all workers."""
+    return segments.index(CONTENT, ROWS_LIMIT+1)
 
 def weave_from_json(prompt:str,k:int=6,max_chars:int=1800)->Tuple[str,List[Dict]]:
-    rows=load_rows(); scored=[]
-    for r in rows:
-        t=r.get("text") or ""
-        s=_score(prompt,t)
-        if s>0: scored.append((s,r))
-    scored.sort(key=lambda x:x[0], reverse=True)
+    scored=bm25_index().search(prompt, k)
     parts=[]; links=[]; total=0
-    for _,r in scored[:k]:
+    for _,r in scored:
         txt=(r.get("text") or "").strip()
         if not txt: continue
         snip=re.sub(r"\s+"," ",txt)[:400]
@@ -109,38 +94,55 @@ def weave_from_json(prompt:str,k:int=6,max_chars:int=1800)->Tuple[str,List[Dict]
     return "\n".join(parts), links[:4]
 
 # --------- OpenAI draft (with fallbacks) ---------
+def gpt_models()->List[str]:
+    models = [OPENAI_MODEL] if OPENAI_MODEL else []
+    return models + ["gpt-5-thinking","gpt-4o","gpt-4o-mini"]
+
+def gpt_messages(prompt:str, prior:str, weave:str, links:List[Dict])->List[Dict]:
+    link_md = "\n".join(f"- {l.get('title','').strip()}: {l.get('url','').strip()}"
+                        for l in (links or []) if l.get("url"))
+    user = ("PRIOR_CONTEXT:\n" + (prior or "(none)")
+            + "\n\nPROMPT:\n" + (prompt or "")
+            + ("\n\nWEAVE:\n"+weave if weave else "")
+            + ("\n\nLINKS:\n"+link_md if link_md else ""))
+    return llm.messages(VOICEPRINT, user)
+
 def call_gpt(prompt:str, prior:str, weave:str, links:List[Dict])->str:
     try:
-        import openai
-        openai.api_key = OPENAI_API_KEY
-        models = [OPENAI_MODEL] if OPENAI_MODEL else []
-        models += ["gpt-5-thinking","gpt-4o","gpt-4o-mini"]
-        link_md = "\n".join(f"- {l.get('title','').strip()}: {l.get('url','').strip()}"
-                            for l in (links or []) if l.get("url"))
-        sysmsg = VOICEPRINT
-        user = ("PRIOR_CONTEXT:\n" + (prior or "(none)")
-                + "\n\nPROMPT:\n" + (prompt or "")
-                + ("\n\nWEAVE:\n"+weave if weave else "")
-                + ("\n\nLINKS:\n"+link_md if link_md else ""))
+        if not OPENAI_API_KEY: raise llm.LLMUnavailable("OPENAI_API_KEY missing")
+        msgs = gpt_messages(prompt, prior, weave, links)
         last=None
-        for m in models:
+        for m in llm.chain(gpt_models()):
             try:
                 log.info("gpt model=%s", m)
-                resp = openai.ChatCompletion.create(
-                    model=m,
-                    messages=[{"role":"system","content":sysmsg},
-                              {"role":"user","content":user}],
-                    temperature=0.2,
-                )
-                text=(resp["choices"][0]["message"]["content"] or "").strip()
+                text=llm.chat(msgs, model=m, temperature=0.2)
                 if text: return text
             except Exception as e:
                 last=e; log.warning("gpt fail %s: %s", m, e.__class__.__name__)
         if last: log.error("gpt unavailable: %s", last.__class__.__name__)
     except Exception as e:
-        log.error("gpt import/call error: %s", e.__class__.__name__)
+        log.error("gpt unavailable: %s", e.__class__.__name__)
     return ""  # failure
 
+def call_gpt_stream(prompt:str, prior:str, weave:str, links:List[Dict]):
+    """call_gpt() yielding chunks; the next model is tried only while nothing was sent,
+    and a stream cut after that raises (a partial answer is never finalized or cached)."""
+    if not OPENAI_API_KEY:
+        log.error("gpt unavailable: LLMUnavailable"); return
+    msgs = gpt_messages(prompt, prior, weave, links)
+    last=None
+    for m in llm.chain(gpt_models()):
+        sent=False
+        try:
+            log.info("gpt stream model=%s", m)
+            for d in llm.stream(msgs, model=m, temperature=0.2):
+                sent=True; yield d
+            if sent: return
+        except Exception as e:
+            if sent: log.error("gpt stream cut %s: %s", m, e.__class__.__name__); raise
+            last=e; log.warning("gpt fail %s: %s", m, e.__class__.__name__)
+    if last: log.error("gpt unavailable: %s", last.__class__.__name__)
+
 # --------- Kenifier (no-op placeholder) ---------
 def kenify_markdown(prompt:str, md:str, sources:List[Dict])->str:
     return md
@@ -175,38 +177,77 @@ def finalize(prompt:str, md:str, links:List[Dict])->Tuple[str,List[Dict]]:
     return t, filter_chips(prompt, links or [], max_links=2)
 
 # --------- Pipeline ---------
+GPT_DOWN = "I’m having trouble generating a response right now — please try again."
+
 def pipeline(prompt:str, prior:str)->Tuple[str,List[Dict]]:
     weave, links = weave_from_json(prompt)
     draft = call_gpt(prompt, prior, weave, links)
     if not draft:
-        return ("I’m having trouble generating a response right now — please try again.", [] )
+        return (GPT_DOWN, [] )
     md = kenify_markdown(prompt, draft, links)
     return finalize(prompt, md, links)
 
+def pipeline_stream(prompt:str, prior:str):
+    """pipeline() as ("delta", chunk) events and a last ("done", (md, links))."""
+    weave, links = weave_from_json(prompt)
+    parts=[]
+    for d in call_gpt_stream(prompt, prior, weave, links):
+        parts.append(d); yield "delta", d
+    draft = "".join(parts).strip()
+    if not draft:
+        yield "done", (GPT_DOWN, []); return
+    yield "done", finalize(prompt, kenify_markdown(prompt, draft, links), links)
+
 # --------- Routes ---------
 @app.get("/health")
 def health():
-    rows=load_rows(); counts={}
-    for r in rows:
-        t=r.get("source_type") or "unknown"
-        counts[t]=counts.get(t,0)+1
-    return JSONResponse({"ok":True,"total":sum(counts.values()),"counts":counts})
+    counts={}
+    for t,c in load_rows().count("source_type").items():
+        t=t or "unknown"
+        counts[t]=counts.get(t,0)+c
+    return JSONResponse({"ok":True,"total":sum(counts.values()),"counts":counts,"llm":llm.stats()})
 
 @app.post("/chat")
-def chat(req: ChatRequest):
+def chat(req: ChatRequest, request: Request):
     q=(req.prompt or "").strip()
     sid, hist = get_session(req.session_id)
     if not q:
         return JSONResponse(ChatResponse(answer="Ask a question first.", session_id=sid, sources=[]).dict())
     prior = " ".join(f"{r}: {c}" for r,c in list(hist)[-8:])
+    if sse.wants_stream(request.headers.get("accept"), request.query_params.get("stream")):
+        return StreamingResponse(chat_events(q, sid, hist, prior), media_type=sse.MIMETYPE, headers=sse.HEADERS)
     try:
-        md, links = pipeline(q, prior)
+        hit = semantic_cache.lookup(q, prior)           # first turns only (prior is empty)
+        if hit:
+            md, links = hit[0]["answer"], hit[0]["sources"]
+        else:
+            md, links = pipeline(q, prior)
+            if md != GPT_DOWN: semantic_cache.store(q, {"answer": md, "sources": links}, prior)
     except Exception:
         log.exception("chat_error")
         return JSONResponse(ChatResponse(answer="Sorry - server error. Please try again.", session_id=sid, sources=[]).dict())
     hist.append(("user", q)); hist.append(("assistant", md))
     return JSONResponse(ChatResponse(answer=md, session_id=sid, sources=links).dict())
 
+def chat_events(q:str, sid:str, hist:deque, prior:str):
+    """/chat as SSE: deltas while GPT writes, then "done" with the JSON body of chat()."""
+    try:
+        hit = semantic_cache.lookup(q, prior)
+        if hit:
+            md, links = hit[0]["answer"], hit[0]["sources"]
+            yield sse.delta(md)
+        else:
+            for kind, v in pipeline_stream(q, prior):
+                if kind == "delta": yield sse.delta(v)
+                else: md, links = v
+            if md != GPT_DOWN: semantic_cache.store(q, {"answer": md, "sources": links}, prior)
+    except Exception:
+        log.exception("chat_error")
+        yield sse.done(ChatResponse(answer="Sorry - server error. Please try again.", session_id=sid, sources=[]).dict())
+        return
+    hist.append(("user", q)); hist.append(("assistant", md))
+    yield sse.done(ChatResponse(answer=md, session_id=sid, sources=links).dict())
+
 @app.get("/")
 def root():
     return JSONResponse({"ok":True,"msg":"Tullman.ai API up"})
@@ -244,6 +285,7 @@ def get_voiceprint():
 def set_voiceprint(body: VoiceBody):
     vp=(body.voiceprint or "").strip()
     save_voiceprint(vp); apply_voiceprint(vp)
+    semantic_cache.purge()                        # cached answers are in the old voice
     return JSONResponse({"ok": True})
 
 @app.post("/admin/upload")
@@ -263,6 +305,21 @@ def ingest_now():
     subprocess.Popen(shlex.split(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return JSONResponse({"ok": True, "msg": "Ingest started"})
 
+@app.get("/admin/corpus")
+def corpus_cache():
+    """Corpus cache generation of this worker: segment, byte offset followed, tail rows."""
+    load_rows()                                   # let a pending append/rewrite be picked up
+    return JSONResponse({"ok": True, **segments.stats(CONTENT)})
+
+@app.get("/admin/semantic-cache")
+def semantic_cache_stats():
+    return JSONResponse({"ok": True, **semantic_cache.stats()})
+
+@app.post("/admin/semantic-cache/purge")
+def semantic_cache_purge():
+    """Forget every cached answer (all workers drop their index on their next sync)."""
+    return JSONResponse({"ok": True, "purged": semantic_cache.purge()})
+
 
 # === strict chip filter (Howard-only + relevance) ===
 def _filter_chips_strict(prompt: str, links, max_links: int = 2):
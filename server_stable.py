@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 from pathlib import Path
-import os, json, re, sqlite3, unicodedata, uuid, logging
+import os, json, re, sqlite3, threading, time, unicodedata, uuid, logging
 from collections import deque, OrderedDict
 import requests
 from bs4 import BeautifulSoup
+from app import llm, public_flags, sentences, sse
 
 # ----- paths -----
 BASE = Path.home() / "tullman"
@@ -41,7 +42,7 @@ def apply_tone_local(s: str) -> str:
     s = s.replace("—","-")
     return re.sub(r"\s{2,}"," ",s).strip()
 
-# ----- FTS (optional, used if present) -----
+# ----- FTS (optional, used if present; built by `python -m app.fts_index`) -----
 def fts_available() -> bool: return FTS_DB.exists()
 
 def build_match(q: str) -> str:
@@ -53,15 +54,62 @@ def build_match(q: str) -> str:
     terms=list(dict.fromkeys(terms))
     return " OR ".join(terms) if terms else "*"
 
+FTS_SQL = """SELECT d.title,d.source_name,d.source_type,d.part,d.text,d.url,d.public_ok,d.flags_v,
+                    d.sents,d.sent_h,d.sents_v,bm25(content) AS score
+             FROM content JOIN docs d ON d.rowid=content.rowid
+             WHERE content MATCH ? ORDER BY score LIMIT ?"""
+FTS_MMAP  = int(os.getenv("FTS_MMAP_MB", "256")) * 1024 * 1024
+FTS_CACHE = int(os.getenv("FTS_CACHE_MB", "64")) * 1024      # KiB; negative cache_size below
+_fts_local = threading.local()
+_fts_lock = threading.Lock()
+_fts_stats = {"opened": 0, "reopened": 0, "queries": 0, "errors": 0, "ms_total": 0.0, "ms_max": 0.0}
+
+def _fts_ino():
+    try: return FTS_DB.stat().st_ino
+    except OSError: return None
+
+def _fts_conn() -> sqlite3.Connection:
+    """One read-only connection per worker thread; reopened if content.db is replaced."""
+    con=getattr(_fts_local, "con", None); ino=_fts_ino()
+    if con is not None and _fts_local.ino == ino: return con
+    if con is not None:
+        con.close()
+        with _fts_lock: _fts_stats["reopened"]+=1
+    # cached_statements keeps the prepared MATCH statement alive between requests
+    con=sqlite3.connect(f"file:{FTS_DB}?mode=ro", uri=True, check_same_thread=False, cached_statements=32)
+    con.row_factory=sqlite3.Row
+    con.execute(f"PRAGMA mmap_size={FTS_MMAP}")
+    con.execute(f"PRAGMA cache_size=-{FTS_CACHE}")
+    con.execute("PRAGMA query_only=1")
+    _fts_local.con=con; _fts_local.ino=ino
+    with _fts_lock: _fts_stats["opened"]+=1
+    return con
+
+def fts_pool_stats() -> dict:
+    with _fts_lock: st=dict(_fts_stats)
+    st["ms_avg"]=round(st["ms_total"]/st["queries"], 2) if st["queries"] else 0.0
+    st["ms_total"]=round(st["ms_total"], 1); st["ms_max"]=round(st["ms_max"], 2)
+    st["mmap_bytes"]=FTS_MMAP; st["cache_kib"]=FTS_CACHE
+    return st
+
 def fts_query(q: str, k: int = 8) -> list[sqlite3.Row]:
-    con=sqlite3.connect(str(FTS_DB)); con.row_factory=sqlite3.Row
-    rows=con.execute("""SELECT title,source_name,source_type,part,text,bm25(content) AS score
-                        FROM content WHERE content MATCH ? ORDER BY score LIMIT ?""",
-                     (build_match(q), k*4)).fetchall()
-    con.close(); return rows
+    t0=time.perf_counter()
+    try:
+        rows=_fts_conn().execute(FTS_SQL, (build_match(q), k*4)).fetchall()
+    except sqlite3.Error:
+        with _fts_lock: _fts_stats["errors"]+=1
+        con=getattr(_fts_local, "con", None)
+        if con is not None: con.close(); _fts_local.con=None
+        raise
+    ms=(time.perf_counter()-t0)*1000
+    with _fts_lock:
+        _fts_stats["queries"]+=1; _fts_stats["ms_total"]+=ms
+        if ms>_fts_stats["ms_max"]: _fts_stats["ms_max"]=ms
+    return rows
 
 # ----- coalescer -----
-SPLIT = re.compile(r'(?<=[.!?])\s+')
+# sentence offsets + normalized hashes come precomputed with the rows (app/sentences.py)
+CLEAN_START = re.compile(r'^[\"“\(\'\[]?[A-Z0-9]')
 def chunk_index(part: str | None) -> int:
     if not part: return 0
     m=re.search(r'(\d+)$', part); return int(m.group(1)) if m else 0
@@ -70,17 +118,7 @@ def coalesce_snippets(rows: list[dict], max_sent=12, max_chars=1400) -> tuple[st
     if not rows: return "", []
     same = len(rows)>=2 and all((r.get("source_name") or "").lower()==(rows[0].get("source_name") or "").lower() for r in rows)
     ordered = sorted(rows, key=lambda r: chunk_index(r.get("part"))) if same else rows
-    out=[]; seen=set(); merged_low=""
-    for r in ordered:
-        txt=(r.get("text") or "").strip().replace("\n"," ")
-        for s in [re.sub(r"\s+"," ",x).strip() for x in SPLIT.split(txt)]:
-            if not s: continue
-            if not out and not re.match(r'^[\"“\(\'\[]?[A-Z0-9]', s): continue
-            key=s.lower()
-            if key in seen or (len(merged_low)>=50 and key in merged_low): continue
-            seen.add(key); out.append(s); merged_low=(merged_low+" "+key).strip()
-            if len(out)>=max_sent: break
-        if len(out)>=max_sent: break
+    out=sentences.merge(ordered, max_sent, first_ok=CLEAN_START.match)
     merged=' '.join(out).strip()
     if len(merged)>max_chars: merged=merged[:max_chars].rsplit(' ',1)[0].strip()
     return merged, ordered
@@ -99,7 +137,9 @@ def retrieve_from_corpus(q: str, want_k: int = 12) -> list[dict]:
             ranked.append((score,r))
         ranked.sort(key=lambda x:x[0])
         for _,r in ranked[:want_k]:
-            rows.append({"title":r["title"],"source_name":r["source_name"],"part":r["part"],"text":r["text"],"url":r.get("url")})
+            rows.append({"title":r["title"],"source_name":r["source_name"],"part":r["part"],"text":r["text"],"url":r["url"],
+                         "public_ok":bool(r["public_ok"]),"flags_v":r["flags_v"],
+                         "sents":r["sents"],"sent_h":r["sent_h"],"sents_v":r["sents_v"]})
     else:
         items=iter_jsonl(CONTENT_JSONL, limit=25000)
         qwords=set(re.findall(r"[a-zA-Z]{4,}", q.lower()))
@@ -110,25 +150,18 @@ def retrieve_from_corpus(q: str, want_k: int = 12) -> list[dict]:
         hits.sort(key=lambda x:x[0], reverse=True)
         for _,r in hits[:want_k]:
             rows.append({"title":r.get("title"),"source_name":r.get("source_name"),
-                         "part":r.get("part"),"text":r.get("text"),"url":r.get("url")})
+                         "part":r.get("part"),"text":r.get("text"),"url":r.get("url"),
+                         **{f:r[f] for f in public_flags.FLAGS+("flags_v","sents","sent_h","sents_v") if f in r}})
     return rows
 
 # ----- public filters (no Ken/JustKen/email) -----
 EMAILY_HDR = re.compile(r'(?im)^(from|to|cc|bcc|subject|date):.*$')
 EMAIL_ADDR = re.compile(r'\b[\w\.-]+@[\w\.-]+\.\w+\b')
-BAD_TERMS = ['gmail','my thoughts','kmages','ken mages','avatarbuddy','trincity','eyelevel','just ken','newsletter','on infinity']
-GOOD_HINTS= ['tullman','howard tullman','hat ',' 1871 ','kendall college','tribeca flashpoint','chicagoland entrepreneurial center']
-
 def looks_like_email(text: str) -> bool: return bool(EMAILY_HDR.search(text or ''))
 
 def is_public_tullman_ok(rec: dict) -> bool:
-    name=(rec.get('source_name') or '').lower()
-    text=(rec.get('text') or '').lower()
-    if looks_like_email(text): return False
-    if any(b in name or b in text for b in BAD_TERMS): return False
-    if any(g in name for g in GOOD_HINTS): return True
-    if any(g in text for g in GOOD_HINTS): return True
-    return False
+    # flags are precomputed at ingest (app/public_flags.py) and carried by FTS rows
+    return public_flags.public_ok(rec)
 
 def sanitize_public_excerpt(s: str) -> str:
     s = EMAILY_HDR.sub('', s or '')
@@ -196,32 +229,46 @@ def curated_first_person(prompt: str, woven_text: str) -> str:
                 "I believe AI is now table stakes for every business and for individuals, so I push teams to run small, smart experiments and ship real results.")
     return woven_text or ""
 
+KENIFY_SYS = ("You are Howard Tullman. Speak in first person (I, my). "
+              "Be warm, candid, direct, optimistic, and concise. "
+              "Return clean Markdown. Do not add a heading like '# Answer'.")
+
+def kenify_messages(prompt: str, woven_text: str) -> list[dict]:
+    """The one request both /chat modes send, so they also share the llm response cache."""
+    return llm.messages(KENIFY_SYS, f"{prompt}\n\nCONTENT:\n{woven_text}")
+
 def kenify_markdown(prompt: str, woven_text: str, sources: list[dict]) -> str:
     """ALWAYS use GPT-5 if key present; fallback to curated first-person."""
-    import openai
     model = os.getenv("OPENAI_MODEL", "gpt-5-thinking")
-    key = os.getenv("OPENAI_API_KEY","")
-    if key:
+    body = ""
+    if os.getenv("OPENAI_API_KEY",""):
         try:
-            openai.api_key = key
-            sysmsg = ("You are Howard Tullman. Speak in first person (I, my). "
-                      "Be warm, candid, direct, optimistic, and concise. "
-                      "Return clean Markdown. Do not add a heading like '# Answer'.")
-            user = f"{prompt}\n\nCONTENT:\n{woven_text}"
             app.logger.info(f"kenifier model={model} remote=True")
-            resp = openai.ChatCompletion.create(
-                model=model,
-                messages=[{"role":"system","content":sysmsg},
-                          {"role":"user","content":user}],
-                temperature=0.2,
-            )
-            body = resp["choices"][0]["message"]["content"].strip()
+            body = llm.chat(kenify_messages(prompt, woven_text),
+                            model=model, temperature=0.2)
         except Exception as e:
             app.logger.warning(f"kenifier remote failed: {e}")
-            body = curated_first_person(prompt, woven_text)
-    else:
-        body = curated_first_person(prompt, woven_text)
+    return finish_markdown(prompt, body or curated_first_person(prompt, woven_text), sources)
 
+def kenify_stream(prompt: str, woven_text: str, sources: list[dict]):
+    """kenify_markdown() as ("delta", chunk) events while GPT writes and a last
+    ("done", md); the Sources block and tone pass need the whole body, so they run at the end."""
+    model = os.getenv("OPENAI_MODEL", "gpt-5-thinking")
+    parts = []
+    if os.getenv("OPENAI_API_KEY",""):
+        try:
+            app.logger.info(f"kenifier model={model} remote=True stream=True")
+            for d in llm.stream(kenify_messages(prompt, woven_text),
+                                model=model, temperature=0.2):
+                parts.append(d); yield "delta", d
+        except Exception as e:
+            app.logger.warning(f"kenifier remote failed: {e}")
+            if parts: raise                  # cut mid-answer: the caller reports an error
+    body = "".join(parts).strip() or curated_first_person(prompt, woven_text)
+    if not parts: yield "delta", body
+    yield "done", finish_markdown(prompt, body, sources)
+
+def finish_markdown(prompt: str, body: str, sources: list[dict]) -> str:
     md = body
     urls=[s for s in sources if s.get("url")]
     if not urls and "howard tullman" in (prompt or "").lower():
@@ -250,7 +297,8 @@ def health():
     counts={}
     for x in items:
         t=x.get("source_type","unknown"); counts[t]=counts.get(t,0)+1
-    return jsonify({"ok": True, "total": sum(counts.values()), "counts": counts, "fts": fts_available()})
+    return jsonify({"ok": True, "total": sum(counts.values()), "counts": counts, "fts": fts_available(),
+                    "fts_pool": fts_pool_stats()})
 
 @app.get("/")
 def home():
@@ -282,6 +330,10 @@ def ask():
     md = kenify_markdown(q, excerpt, sources)
     return jsonify({"answer": md, "sources": [s for s in sources if s.get("url")]})
 
+PERSONA = ("You are Howard Tullman. Speak in first person (I, my). "
+           "Be warm, candid, direct, and optimistic. You believe AI is critical for every business and individual. "
+           "STYLE_HINT: first person.")
+
 @app.post("/chat")
 def chat():
     j=request.get_json(force=True, silent=True) or {}
@@ -290,12 +342,12 @@ def chat():
     if not q: return jsonify({"session_id": j.get("session_id"), "answer":"Ask a question first.","sources":[]})
     sid,hist=get_session(j.get("session_id"))
     ctx=" ".join(f"{r}: {c}" for r,c in list(hist)[-8:])
+    if sse.wants_stream(request.headers.get("Accept"), request.args.get("stream")):
+        return Response(stream_with_context(chat_events(q, public, sid, hist, ctx)),
+                        mimetype=sse.MIMETYPE, headers=sse.HEADERS)
     if public:
         text,srcs=weave_tull_json_first(f"{q}\n\nContext: {ctx}")
-        persona = ("You are Howard Tullman. Speak in first person (I, my). "
-                   "Be warm, candid, direct, and optimistic. You believe AI is critical for every business and individual. "
-                   "STYLE_HINT: first person.")
-        md = kenify_markdown(persona + "\n\nUSER_PROMPT:\n" + q, text, srcs)
+        md = kenify_markdown(PERSONA + "\n\nUSER_PROMPT:\n" + q, text, srcs)
         srcs=[s for s in srcs if s.get("url")]
     else:
         text,srcs=weave_public_first(f"{q}\n\nContext: {ctx}")
@@ -303,5 +355,25 @@ def chat():
     hist.append(("user", q)); hist.append(("assistant", md))
     return jsonify({"session_id": sid, "answer": md, "sources": srcs})
 
+def chat_events(q: str, public: bool, sid: str, hist, ctx: str):
+    """/chat as SSE: deltas while GPT writes, then "done" with the JSON body of chat()."""
+    try:
+        if public:
+            text,srcs=weave_tull_json_first(f"{q}\n\nContext: {ctx}")
+            prompt=PERSONA + "\n\nUSER_PROMPT:\n" + q
+        else:
+            text,srcs=weave_public_first(f"{q}\n\nContext: {ctx}")
+            prompt=q
+        for kind,v in kenify_stream(prompt, text, srcs):
+            if kind=="delta": yield sse.delta(v)
+            else: md=v
+        if public: srcs=[s for s in srcs if s.get("url")]
+    except Exception:
+        app.logger.exception("chat_stream_error")
+        yield sse.done({"session_id": sid, "answer": "Sorry - server error. Please try again.", "sources": []})
+        return
+    hist.append(("user", q)); hist.append(("assistant", md))
+    yield sse.done({"session_id": sid, "answer": md, "sources": srcs})
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)